@@ -3,7 +3,9 @@ set -e
 
 if [ "$1" = "start-server" ]; then
     echo "Starting server on port 8000..."
-    exec uwsgi --http 0.0.0.0:8000 --master -p 4 -w src.uwsgi:app
+    # apps are loaded in each worker after the fork, so its database pool and decision log
+    # writer threads are its own, and threads started by the app are run
+    exec uwsgi --http 0.0.0.0:8000 --master -p 4 --lazy-apps --enable-threads -w src.uwsgi:app
 
 # tests
 elif [ "$1" = "test" ]; then
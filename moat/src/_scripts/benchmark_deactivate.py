@@ -0,0 +1,105 @@
+"""
+Compares the deactivation statements on synthetic resources
+
+Each size loads that many active resources plus as many inactive ones, and stages
+99% of the active ones, so 1% are deactivated. The EXCEPT statement used before
+is timed against the current anti-join. Everything runs in one transaction which is
+rolled back, so the script can be pointed at a development database
+
+usage: PYTHONPATH=moat/src python moat/src/_scripts/benchmark_deactivate.py [sizes...]
+"""
+
+import sys
+import time
+from textwrap import dedent
+
+from database import Database
+from models import ResourceDbo, ResourceStagingDbo
+from repositories import RepositoryBase
+from sqlalchemy.sql import text
+
+DEFAULT_SIZES: list[int] = [100_000, 1_000_000, 5_000_000]
+INGESTION_PROCESS_ID: int = -1
+
+EXCEPT_STATEMENT: str = dedent(
+    f"""
+        update resources tgt
+        set ingestion_process_id = {INGESTION_PROCESS_ID}, active = false
+        from (
+            select fq_name from resources
+            except
+            select fq_name from resources_stg
+            where ingestion_process_id = {INGESTION_PROCESS_ID}
+        ) src
+        where tgt.fq_name = src.fq_name and tgt.active is not false
+        """
+)
+
+
+def load(session, size: int) -> None:
+    session.execute(text("delete from resources"))
+    session.execute(text("delete from resources_stg"))
+    session.execute(
+        text(
+            """
+            insert into resources (fq_name, platform, object_type, active)
+            select 'datalake.bench.t' || i, 'bench', 'table', i <= :size
+            from generate_series(1, :size * 2) i
+            """
+        ),
+        {"size": size},
+    )
+    session.execute(
+        text(
+            """
+            insert into resources_stg (ingestion_process_id, fq_name, platform, object_type)
+            select :ingestion_process_id, 'datalake.bench.t' || i, 'bench', 'table'
+            from generate_series(1, :size) i
+            where i % 100 <> 0
+            """
+        ),
+        {"size": size, "ingestion_process_id": INGESTION_PROCESS_ID},
+    )
+    session.execute(text("analyze resources"))
+    session.execute(text("analyze resources_stg"))
+
+
+def time_statement(session, statement: str) -> tuple[float, int]:
+    # each statement runs against the same data, its changes are undone by the savepoint
+    savepoint = session.begin_nested()
+    start_time: float = time.perf_counter()
+    row_count: int = session.execute(text(statement)).rowcount
+    seconds: float = time.perf_counter() - start_time
+    savepoint.rollback()
+    return seconds, row_count
+
+
+def benchmark(sizes: list[int]) -> None:
+    db: Database = Database()
+    db.connect()
+    anti_join_statement: str = RepositoryBase._get_merge_deactivate_statement(
+        source_model=ResourceStagingDbo,
+        target_model=ResourceDbo,
+        merge_keys=ResourceStagingDbo.MERGE_KEYS,
+        ingestion_process_id=INGESTION_PROCESS_ID,
+    )
+
+    print(f"{'rows':>10} {'except (s)':>12} {'anti-join (s)':>14} {'deactivated':>12}")
+    for size in sizes:
+        with db.Session.begin() as session:
+            load(session=session, size=size)
+            except_seconds, except_count = time_statement(
+                session=session, statement=EXCEPT_STATEMENT
+            )
+            anti_join_seconds, anti_join_count = time_statement(
+                session=session, statement=anti_join_statement
+            )
+            assert except_count == anti_join_count
+            print(
+                f"{size:>10} {except_seconds:>12.2f} {anti_join_seconds:>14.2f} {anti_join_count:>12}"
+            )
+            session.rollback()
+
+
+if __name__ == "__main__":
+    benchmark(sizes=[int(s) for s in sys.argv[1:]] or DEFAULT_SIZES)
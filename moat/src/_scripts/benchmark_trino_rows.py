@@ -0,0 +1,210 @@
+"""
+Compares extracting resources from dict records with extracting them from row batches
+
+A fake cursor returns synthetic rows of fq_name, object_type, attribute_key and attribute_value,
+so no Trino server is needed. Both paths end with the staging rows which the resource controller
+copies into resources_stg, so they do the same work from cursor to COPY:
+* dict: the connector's loop before row batches were added. select_async builds a dict per row,
+  get_resources builds a second dict per row into a list of the whole result, then a ResourceDio
+  per dict, and the staging rows are read from the DIOs
+* row: the connector's get_resource_batches, with the staging rows zipped from each DioBatch
+
+CPU time is measured without tracing. A second run measures the peak traced memory with tracemalloc,
+and the peak number of allocated memory blocks. Blocks are counted with sys.getallocatedblocks, which
+is cheap enough to sample as each batch is fetched and every fetch size staging rows, where a
+tracemalloc snapshot per sample would take longer than the run
+
+usage: CONFIG_FILE_PATH=moat/config/config.unittest.yaml PYTHONPATH=moat/src \
+    python moat/src/_scripts/benchmark_trino_rows.py [rows] [fetch_sizes...]
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Generator, Iterator
+from unittest import mock
+
+from clients import TrinoClient
+from ingestor.connectors.dbapi_connector import DBAPIConnector
+from ingestor.ingestion_controller.src.base_ingestion_controller import (
+    BaseIngestionController,
+)
+from ingestor.models import ResourceDio
+from trino.dbapi import Cursor
+
+DEFAULT_ROWS: int = 1_000_000
+DEFAULT_FETCH_SIZES: list[int] = [1_000, 10_000]
+COLUMNS: list[str] = ["fq_name", "object_type", "attribute_key", "attribute_value"]
+STAGING_FIELDS: list[str] = ["fq_name", "platform", "object_type"]
+
+
+def make_rows(row_count: int) -> list[list]:
+    return [
+        [f"datalake.bench.t{i}", "table", "owner", f"team{i % 10}"]
+        for i in range(row_count)
+    ]
+
+
+def baseline_select_async(
+    trino_client: TrinoClient, query: str, batch_size: int = 1000
+) -> Generator[list[dict[str, Any]], Any, None]:
+    # TrinoClient.select_async before row batches were added
+    cursor: Cursor = trino_client._get_cursor()
+    trino_client._execute(cursor=cursor, query=query)
+
+    schema: list[str] = trino_client._get_schema(cursor=cursor)
+
+    for batch in trino_client._fetchmany(cursor=cursor, batch_size=batch_size):
+        if not isinstance(batch[0], list):
+            batch = [batch]
+
+        dict_records: list[dict[str, Any]] = []
+        for record in batch:
+            dict_records.append(dict(zip(schema, record)))
+        yield dict_records
+
+
+def baseline_get_resources(
+    connector: DBAPIConnector, fetch_size: int
+) -> list[ResourceDio]:
+    # DBAPIConnector.get_resources before row batches were added
+    tables: list[dict[str, str] | None] = []
+    for batch in baseline_select_async(
+        trino_client=connector.trino_client,
+        query=connector.config.data_object_table_column_query,
+        batch_size=fetch_size,
+    ):
+        tables.extend(
+            [
+                {
+                    "fq_name": record.get(connector.config.fq_name_key),
+                    "object_type": record.get(connector.config.object_type_key),
+                    "platform": connector.platform,
+                }
+                for record in batch
+            ]
+        )
+    return [ResourceDio(**t) for t in tables]
+
+
+def dict_path(connector: DBAPIConnector, fetch_size: int) -> Iterator[tuple]:
+    return BaseIngestionController.get_staging_rows(
+        ingestion_process_id=0,
+        dio_batches=[
+            baseline_get_resources(connector=connector, fetch_size=fetch_size)
+        ],
+        fields=STAGING_FIELDS,
+    )
+
+
+def row_path(connector: DBAPIConnector, fetch_size: int) -> Iterator[tuple]:
+    connector.trino_client.fetch_size = fetch_size
+    return BaseIngestionController.get_staging_rows(
+        ingestion_process_id=0,
+        dio_batches=connector.get_resource_batches(),
+        fields=STAGING_FIELDS,
+    )
+
+
+class BlockSampler:
+    """
+    The most memory blocks allocated at once since start, among the samples taken
+    """
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.start_blocks: int = 0
+        self.peak_blocks: int = 0
+
+    def start(self) -> None:
+        self.enabled = True
+        self.start_blocks = sys.getallocatedblocks()
+        self.peak_blocks = 0
+
+    def sample(self) -> None:
+        if self.enabled:
+            self.peak_blocks = max(
+                self.peak_blocks, sys.getallocatedblocks() - self.start_blocks
+            )
+
+    def stop(self) -> int:
+        self.enabled = False
+        return self.peak_blocks
+
+
+def count_rows(
+    staging_rows: Iterator[tuple], fetch_size: int, sampler: BlockSampler
+) -> int:
+    row_count: int = 0
+    for _ in staging_rows:
+        row_count += 1
+        if row_count % fetch_size == 0:
+            sampler.sample()
+    return row_count
+
+
+def measure(
+    path: Callable, connector: DBAPIConnector, fetch_size: int, sampler: BlockSampler
+) -> tuple:
+    start_time: float = time.process_time()
+    row_count: int = count_rows(
+        staging_rows=path(connector=connector, fetch_size=fetch_size),
+        fetch_size=fetch_size,
+        sampler=sampler,
+    )
+    cpu_seconds: float = time.process_time() - start_time
+
+    tracemalloc.start()
+    sampler.start()
+    count_rows(
+        staging_rows=path(connector=connector, fetch_size=fetch_size),
+        fetch_size=fetch_size,
+        sampler=sampler,
+    )
+    peak_blocks: int = sampler.stop()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return row_count, cpu_seconds, peak_bytes / 1024 / 1024, peak_blocks
+
+
+def benchmark(row_count: int, fetch_sizes: list[int]) -> None:
+    rows: list[list] = make_rows(row_count=row_count)
+    sampler: BlockSampler = BlockSampler()
+
+    def fetchmany(cursor, batch_size: int):
+        for i in range(0, len(rows), batch_size):
+            sampler.sample()
+            yield rows[i : i + batch_size]
+        sampler.sample()
+
+    with (
+        mock.patch.object(TrinoClient, "_get_cursor"),
+        mock.patch.object(TrinoClient, "_execute"),
+        mock.patch.object(TrinoClient, "_get_schema", return_value=COLUMNS),
+        mock.patch.object(TrinoClient, "_fetchmany", side_effect=fetchmany),
+    ):
+        connector: DBAPIConnector = DBAPIConnector()
+        connector.acquire_data(platform="bench")
+
+        print(
+            f"{'fetch size':>10} {'path':>6} {'rows':>10} {'cpu (s)':>9} {'peak (MB)':>10} {'peak blocks':>12}"
+        )
+        for fetch_size in fetch_sizes:
+            for name, path in [("dict", dict_path), ("row", row_path)]:
+                measured_rows, cpu_seconds, peak_mb, peak_blocks = measure(
+                    path=path,
+                    connector=connector,
+                    fetch_size=fetch_size,
+                    sampler=sampler,
+                )
+                assert measured_rows == row_count
+                print(
+                    f"{fetch_size:>10} {name:>6} {measured_rows:>10} {cpu_seconds:>9.2f} {peak_mb:>10.1f} {peak_blocks:>12}"
+                )
+
+
+if __name__ == "__main__":
+    benchmark(
+        row_count=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS,
+        fetch_sizes=[int(s) for s in sys.argv[2:]] or DEFAULT_FETCH_SIZES,
+    )
@@ -0,0 +1,40 @@
+"""makes staging tables unlogged
+
+Revision ID: d35ce0938c5a
+Revises: 2e5d3f8502ac
+Create Date: 2026-10-18 14:30:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd35ce0938c5a'
+down_revision: Union[str, Sequence[str], None] = '2e5d3f8502ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# staged rows are only kept until their merge commits, so they are not written
+# to the WAL or replicated. Postgres empties unlogged tables after a crash,
+# which only loses the staging of runs that were in flight
+STAGING_TABLES: list[str] = [
+    'principals_staging',
+    'principal_attributes_stg',
+    'resources_stg',
+    'resource_attributes_stg',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in STAGING_TABLES:
+        op.execute(f'alter table {table_name} set unlogged')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in STAGING_TABLES:
+        op.execute(f'alter table {table_name} set logged')
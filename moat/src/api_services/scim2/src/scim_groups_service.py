@@ -2,6 +2,7 @@ from typing import Tuple
 import re
 
 from app_logger import Logger, get_logger
+from sqlalchemy.orm import Query
 from models import PrincipalGroupDbo
 from .scim_config import ScimConfig
 from .scim_service_base import ScimServiceBase
@@ -23,14 +24,11 @@ class ScimGroupsService(ScimServiceBase):
         Returns all groups which were defined by SCIM
         We cant return others because they might be deleted by SCIM and we won't have the payload anyway
         """
-        total_count: int = session.query(PrincipalGroupDbo).count()
-        groups: list[PrincipalGroupDbo] = (
-            session.query(PrincipalGroupDbo)
-            .filter(PrincipalGroupDbo.source_type == ScimServiceBase.SOURCE_TYPE)
-            .offset(offset)
-            .limit(count)
-            .all()
+        query: Query = session.query(PrincipalGroupDbo).filter(
+            PrincipalGroupDbo.source_type == ScimServiceBase.SOURCE_TYPE
         )
+        total_count: int = query.count()
+        groups: list[PrincipalGroupDbo] = query.offset(offset).limit(count).all()
         return total_count, groups
 
     @staticmethod
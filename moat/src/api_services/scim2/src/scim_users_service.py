@@ -1,6 +1,7 @@
 from typing import Tuple
 import copy
 from app_logger import Logger, get_logger
+from sqlalchemy.orm import Query
 from models import PrincipalDbo, PrincipalAttributeDbo
 from .scim_config import ScimConfig
 from .scim_service_base import ScimServiceBase
@@ -21,14 +22,11 @@ class ScimUsersService(ScimServiceBase):
         Returns all groups which were defined by SCIM
         We cant return others because they might be deleted by SCIM and we won't have the payload anyway
         """
-        total_count: int = session.query(PrincipalDbo).count()
-        groups: list[PrincipalDbo] = (
-            session.query(PrincipalDbo)
-            .filter(PrincipalDbo.source_type == ScimServiceBase.SOURCE_TYPE)
-            .offset(offset)
-            .limit(count)
-            .all()
+        query: Query = session.query(PrincipalDbo).filter(
+            PrincipalDbo.source_type == ScimServiceBase.SOURCE_TYPE
         )
+        total_count: int = query.count()
+        groups: list[PrincipalDbo] = query.offset(offset).limit(count).all()
         return total_count, groups
 
     @staticmethod
@@ -88,9 +86,11 @@ class ScimUsersService(ScimServiceBase):
             scim_payload, scim_config.principal_source_uid_jsonpath
         )
 
-        principal.active = ScimServiceBase._get_jsonpath_attribute(
+        # active is optional in SCIM, a user is active unless the payload says otherwise
+        active: bool | None = ScimServiceBase._get_jsonpath_attribute(
             scim_payload, scim_config.principal_active_jsonpath
         )
+        principal.active = True if active is None else active
 
         principal.source_type = ScimUsersService.SOURCE_TYPE
         principal.scim_payload = scim_payload
@@ -1,27 +1,50 @@
 from app_logger import Logger, get_logger
-from flask import send_from_directory
+from flask import Response, make_response, request
 from flask_pydantic import validate
 from apis.common import authenticate
 from apis.models import ApiConfig
 
 from flask import Blueprint, g
-from opa import BundleGenerator
+from opa import BundleCache, BundleGenerator, CachedBundle
+from repositories import BundleRevisionRepository
 
 logger: Logger = get_logger("opa.bundle_api")
 bp = Blueprint("opa_bundle", __name__, url_prefix="/api/v1/opa/bundle")
 api_config: ApiConfig = ApiConfig.load_by_api_name(api_name="opa")
 
 
+def build_bundle(session, platform: str, revision: str) -> bytes:
+    with BundleGenerator(
+        session=session, platform=platform, bundle_name="trino", revision=revision
+    ) as bundle:
+        return bundle.read()
+
+
 @bp.route("/<platform>", methods=["GET"])
 @validate()
 @authenticate(api_config=api_config)
 def index(platform: str):
+    bundle_cache: BundleCache = g.bundle_cache
+
     with g.database.Session.begin() as session:
-        with BundleGenerator(
-            session=session, platform=platform, bundle_name="trino"
-        ) as bundle:
-            return send_from_directory(
-                directory=bundle.directory,
-                path=bundle.filename,
-                mimetype="application/octet-stream",
-            )
+        revision: int = BundleRevisionRepository.get_current_revision(session=session)
+        etag: str = bundle_cache.get_etag(platform=platform, revision=revision)
+
+        # OPA sends back the etag of the bundle it holds, nothing to do if it is current
+        if request.if_none_match.contains(etag):
+            response: Response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        cached_bundle: CachedBundle = bundle_cache.get_or_build(
+            platform=platform,
+            revision=revision,
+            build=lambda: build_bundle(
+                session=session, platform=platform, revision=etag
+            ),
+        )
+
+    response: Response = make_response(cached_bundle.content)
+    response.mimetype = "application/octet-stream"
+    response.set_etag(cached_bundle.etag)
+    return response
@@ -4,7 +4,8 @@ import json
 from app_logger import Logger, get_logger
 from apis.common import authenticate
 from apis.models import ApiConfig
-from flask import Blueprint, g, request
+from flask import Blueprint, abort, g, request
+from opa import DecisionLogSpool, DecisionLogSpoolFullError
 from repositories import DecisionLogRepository
 
 logger: Logger = get_logger("opa.decision_log_api")
@@ -15,9 +16,27 @@ api_config: ApiConfig = ApiConfig.load_by_api_name(api_name="opa")
 @bp.route("", methods=["POST"])
 @authenticate(api_config=api_config)
 def create():
-    body = gzip.decompress(request.data)
-    logger.info(f"request: {body}")
-    decision_logs: list[dict] = json.loads(body.decode("utf-8"))
+    try:
+        body = gzip.decompress(request.data)
+        decision_logs: list[dict] = json.loads(body.decode("utf-8"))
+    except (OSError, EOFError, ValueError) as e:
+        abort(400, f"Invalid decision log upload: {e}")
+    if not isinstance(decision_logs, list):
+        abort(400, "Invalid decision log upload: expected a list of decision logs")
+    logger.debug("request: %s", body)
+
+    # with a spool, uploads are written to the database in the background,
+    # so OPA's uploader does not wait on the database
+    decision_log_spool: DecisionLogSpool | None = g.decision_log_spool
+    if decision_log_spool:
+        try:
+            decision_log_spool.put(payload=request.data)
+        except DecisionLogSpoolFullError as e:
+            # OPA keeps the batch and retries with backoff
+            logger.warning(str(e))
+            abort(429, "Decision log spool is full")
+        return "ok"
+
     with g.database.Session.begin() as session:
         DecisionLogRepository.create_bulk(session=session, decision_logs=decision_logs)
         session.commit()
@@ -1,4 +1,6 @@
+from database import Database
 from flask.testing import FlaskClient
+from repositories import BundleRevisionRepository
 
 
 def test_index(flask_test_client: FlaskClient):
@@ -16,3 +18,38 @@ def test_index(flask_test_client: FlaskClient):
         "/api/v1/opa/bundle/trino", headers={"Authorization": "Bearer bearer-token"}
     )
     assert response.status_code == 200
+
+
+def test_index_etag(flask_test_client: FlaskClient, database_empty: Database):
+    headers: dict = {"Authorization": "Bearer bearer-token"}
+
+    response = flask_test_client.get("/api/v1/opa/bundle/trino", headers=headers)
+    assert response.status_code == 200
+    etag: str = response.headers["ETag"]
+    assert etag.startswith('"trino-')
+
+    # OPA holds the current bundle
+    response = flask_test_client.get(
+        "/api/v1/opa/bundle/trino", headers=headers | {"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.data == b""
+
+    # the data changes, so the bundle is rebuilt
+    with database_empty.Session.begin() as session:
+        BundleRevisionRepository.create(session=session, source="test")
+        session.commit()
+
+    response = flask_test_client.get(
+        "/api/v1/opa/bundle/trino", headers=headers | {"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    # etags are per platform
+    response = flask_test_client.get(
+        "/api/v1/opa/bundle/postgres", headers=headers | {"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"postgres-')
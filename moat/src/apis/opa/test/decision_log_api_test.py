@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+from unittest import mock
+
+from app import create_app
+from database import Database
+from flask.testing import FlaskClient
+from models import DecisionLogDbo
+from opa.decision_log_spool.src.decision_log_spool_config import (
+    DecisionLogSpoolConfig,
+)
+
+HEADERS: dict = {"Authorization": "Bearer bearer-token"}
+
+
+def make_upload(decision_ids: list[str]) -> bytes:
+    return gzip.compress(
+        json.dumps(
+            [
+                {
+                    "decision_id": decision_id,
+                    "path": "moat/trino/allow",
+                    "input": {
+                        "action": {"operation": "ExecuteQuery"},
+                        "context": {"identity": {"user": "alice"}},
+                    },
+                    "result": True,
+                    "timestamp": "2025-09-04T22:53:16.320877389Z",
+                }
+                for decision_id in decision_ids
+            ]
+        ).encode("utf-8")
+    )
+
+
+def test_create(flask_test_client: FlaskClient, database_empty: Database):
+    response = flask_test_client.post(
+        "/api/v1/opa/decision", data=make_upload(["api-1", "api-2"])
+    )
+    assert response.status_code == 401
+
+    # without a spool, decision logs are written within the request
+    response = flask_test_client.post(
+        "/api/v1/opa/decision", data=make_upload(["api-1", "api-2"]), headers=HEADERS
+    )
+    assert response.status_code == 200
+    with database_empty.Session.begin() as session:
+        assert session.get(DecisionLogDbo, "api-1").username == "alice"
+
+    # OPA retries a batch it did not see accepted, the decision logs already stored are skipped
+    response = flask_test_client.post(
+        "/api/v1/opa/decision", data=make_upload(["api-2", "api-3"]), headers=HEADERS
+    )
+    assert response.status_code == 200
+    with database_empty.Session.begin() as session:
+        assert session.get(DecisionLogDbo, "api-3").username == "alice"
+
+    response = flask_test_client.post(
+        "/api/v1/opa/decision", data=b"not gzip", headers=HEADERS
+    )
+    assert response.status_code == 400
+
+
+def test_create_spooled(database_empty: Database, tmp_path):
+    config: DecisionLogSpoolConfig = DecisionLogSpoolConfig()
+    config.directory = str(tmp_path)
+    config.writer_threads = "0"
+    upload: bytes = make_upload(["spooled-1"])
+    config.max_bytes = str(len(upload))
+
+    with mock.patch.object(DecisionLogSpoolConfig, "load", return_value=config):
+        flask_test_client: FlaskClient = create_app(
+            database=database_empty
+        ).test_client()
+
+        # the upload is spooled rather than written
+        response = flask_test_client.post(
+            "/api/v1/opa/decision", data=upload, headers=HEADERS
+        )
+        assert response.status_code == 200
+        assert len(os.listdir(os.path.join(str(tmp_path), "ready"))) == 1
+        with database_empty.Session.begin() as session:
+            assert session.get(DecisionLogDbo, "spooled-1") is None
+
+        # until it is drained, further uploads are pushed back
+        response = flask_test_client.post(
+            "/api/v1/opa/decision", data=upload, headers=HEADERS
+        )
+        assert response.status_code == 429
+        assert response.json == {
+            "detail": "Decision log spool is full",
+            "status": "429",
+        }
@@ -5,7 +5,7 @@ from apis.common import authenticate
 
 from apis.models import ApiConfig
 
-from repositories import PrincipalRepository
+from repositories import BundleRevisionRepository, PrincipalRepository
 from models import PrincipalDbo
 from api_services.scim2 import ScimUsersService
 
@@ -98,6 +98,7 @@ def create_user():
             scim_payload: dict = ScimUsersService().create_user(
                 session=session, scim_payload=scim_payload
             )
+            BundleRevisionRepository.create(session=session, source="scim")
             session.commit()
             response: Response = make_response(jsonify(scim_payload), 201)
     response.headers["Content-Type"] = "application/scim+json"
@@ -135,6 +136,7 @@ def update_user(user_id):
             response: Response = make_response(
                 jsonify(principal.scim_payload),
             )
+            BundleRevisionRepository.create(session=session, source="scim")
             session.commit()
     response.headers["Content-Type"] = "application/scim+json"
     return response
@@ -161,6 +163,7 @@ def delete_user(user_id):
             response.status_code = 404
         else:
             session.delete(principal)
+            BundleRevisionRepository.create(session=session, source="scim")
             session.commit()
             response: Response = make_response()
             response.status_code = 204
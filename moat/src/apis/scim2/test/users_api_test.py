@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from database import Database
 from models import PrincipalDbo
+from repositories import PrincipalRepository
 
 
 def test_auth_failure(flask_test_client: FlaskClient):
@@ -268,3 +269,50 @@ def test_delete_user_not_found(flask_test_client: FlaskClient):
         "detail": f"User with ID c0835e00-1859-4927-8293-e2fd064fda0a not found",
         "status": 404,
     }
+
+
+def test_create_user_without_active(
+    flask_test_client: FlaskClient, database_empty: Database
+):
+    # active is optional, a user without it is active and is published in bundles
+    user_data = {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+        "userName": "vincent.furnier",
+        "name": {"givenName": "Vincent", "familyName": "Furnier"},
+        "emails": [{"value": "vincent.furnier@moat.io", "primary": True}],
+    }
+
+    with patch(
+        "apis.scim2.src.users_api.create_id",
+        return_value="87654321-4321-8765-4321-876543218765",
+    ):
+        response = flask_test_client.post(
+            "/api/scim/v2/Users",
+            data=json.dumps(user_data),
+            content_type="application/json",
+            headers={"Authorization": "Bearer scim-token"},
+        )
+    assert response.status_code == 201
+
+    # a full replace which leaves out active keeps the user active
+    response = flask_test_client.put(
+        "/api/scim/v2/Users/87654321-4321-8765-4321-876543218765",
+        data=json.dumps(user_data),
+        content_type="application/json",
+        headers={"Authorization": "Bearer scim-token"},
+    )
+    assert response.status_code == 200
+
+    with database_empty.Session.begin() as session:
+        principal: PrincipalDbo = (
+            session.query(PrincipalDbo)
+            .filter(PrincipalDbo.source_uid == "87654321-4321-8765-4321-876543218765")
+            .one()
+        )
+        assert principal.active is True
+        assert principal.principal_id in [
+            row.principal_id
+            for row in PrincipalRepository.stream_all_with_attributes(
+                session=session, page_size=100
+            )
+        ]
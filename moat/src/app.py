@@ -14,6 +14,7 @@ from app_config import AppConfigModelBase
 from app_logger import Logger, get_logger
 from database import Database
 from flask import Flask, g, request, jsonify
+from opa import BundleCache, DecisionLogSpool, DecisionLogSpoolWriter
 from werkzeug.exceptions import HTTPException
 
 logger: Logger = get_logger("app")
@@ -42,6 +43,17 @@ def create_app(database: Database | None = None) -> Flask:
     database: Database = Database()
     database.connect()
 
+    # OPA bundles, shared by all requests to this app
+    bundle_cache: BundleCache = BundleCache()
+
+    # decision logs are spooled to disk and written by background threads, when a spool is configured
+    # the threads belong to this process, so uWSGI must create the app after forking (--lazy-apps)
+    decision_log_spool: DecisionLogSpool | None = None
+    if DecisionLogSpool.is_enabled():
+        decision_log_spool = DecisionLogSpool()
+        for _ in range(int(decision_log_spool.config.writer_threads)):
+            DecisionLogSpoolWriter(spool=decision_log_spool, database=database).start()
+
     # enable APIs
     flask_app.register_blueprint(bundle_api_bp)
     flask_app.register_blueprint(decision_log_api_bp)
@@ -75,6 +87,8 @@ def create_app(database: Database | None = None) -> Flask:
     def before_request():
         # connect DB
         g.database = database
+        g.bundle_cache = bundle_cache
+        g.decision_log_spool = decision_log_spool
 
     @flask_app.after_request
     def after_request(response):
@@ -1,6 +1,13 @@
+import statistics
+
 import click
+from database import Database
 from ingestor import IngestionController
-from models import ObjectTypeEnum
+from models import IngestionProcessDbo, ObjectTypeEnum
+from opa import DecisionLogSpool, DecisionLogSpoolWriter
+from repositories import IngestionProcessRepository
+
+STATS_PHASES: list[str] = ["acquire", "retrieve", "stage", "merge", "deactivate"]
 
 
 @click.group()
@@ -13,18 +20,29 @@ def cli():
 @click.option(
     "--object-type",
     type=click.Choice([e.value for e in ObjectTypeEnum]),
-    help="Type of object to ingest",
+    multiple=True,
+    required=True,
+    help="Type of object to ingest, repeat to ingest several types from one pass over the source",
 )
 @click.option(
     "--platform",
     help="Name of the source platform, in case of multiple sources for the same object type",
 )
-def ingest(connector_name: str, object_type: str, platform: str):
+@click.option(
+    "--delta",
+    is_flag=True,
+    default=False,
+    help="Only ingest records changed since the last completed run, without deactivating omitted records",
+)
+def ingest(
+    connector_name: str, object_type: tuple[str, ...], platform: str, delta: bool
+):
     ingestion_controller = IngestionController()
     ingestion_controller.ingest(
         connector_name=connector_name,
         platform=platform,
-        object_type=ObjectTypeEnum(object_type),
+        object_types=[ObjectTypeEnum(o) for o in object_type],
+        delta=delta,
     )
 
 
@@ -43,31 +61,132 @@ def ingest_all():
     ingestion_controller.ingest(
         connector_name="ldap",
         platform="ad",
-        object_type=ObjectTypeEnum.PRINCIPAL,
-    )
-
-    os.environ["CONFIG_FILE_PATH"] = "moat/config/config.principal_ingestion.yaml"
-    ingestion_controller.ingest(
-        connector_name="ldap",
-        platform="ad",
-        object_type=ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+        object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
     )
 
     os.environ["CONFIG_FILE_PATH"] = "moat/config/config.resource_ingestion.yaml"
     ingestion_controller.ingest(
         connector_name="dbapi",
         platform="trino",
-        object_type=ObjectTypeEnum.RESOURCE,
+        object_types=[ObjectTypeEnum.RESOURCE, ObjectTypeEnum.RESOURCE_ATTRIBUTE],
     )
 
-    os.environ["CONFIG_FILE_PATH"] = (
-        "moat/config/config.resource_attribute_ingestion.yaml"
+
+def format_ingestion_stats(ingestion_processes: list[IngestionProcessDbo]) -> list[str]:
+    """
+    One line per ingestion process, oldest first, with its phase timings in seconds,
+    staged rows per second overall and peak RSS, followed by the median of each column
+    """
+    header: list[str] = (
+        ["id", "started_at", "source", "platform", "object_types", "status"]
+        + STATS_PHASES
+        + ["total", "rows", "rows/s", "rss_mb"]
     )
-    ingestion_controller.ingest(
-        connector_name="dbapi",
-        platform="trino",
-        object_type=ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+    rows: list[list[str]] = []
+    medians: dict[str, list[float]] = {column: [] for column in header}
+
+    for ingestion_process in reversed(ingestion_processes):
+        metrics: dict = ingestion_process.metrics or {}
+        phases: dict = metrics.get("phases", {})
+        staged: int = sum(
+            o.get("staged", 0) for o in metrics.get("object_types", {}).values()
+        )
+        values: dict[str, float | None] = {
+            phase: phases[phase]["seconds"] if phase in phases else None
+            for phase in STATS_PHASES
+        }
+        values["total"] = sum(p["seconds"] for p in phases.values()) if phases else None
+        values["rows"] = staged if metrics else None
+        values["rows/s"] = staged / values["total"] if values["total"] else None
+        values["rss_mb"] = metrics.get("peak_rss_mb")
+
+        for column, value in values.items():
+            if value is not None and ingestion_process.status == "complete":
+                medians[column].append(value)
+
+        rows.append(
+            [
+                str(ingestion_process.ingestion_process_id),
+                f"{ingestion_process.started_at:%Y-%m-%d %H:%M}",
+                ingestion_process.source or "",
+                ingestion_process.platform or "",
+                ingestion_process.object_type or "",
+                ingestion_process.status or "",
+            ]
+            + [_format_stat(values[column]) for column in header[6:]]
+        )
+
+    # completed runs only, failed runs would skew the trend
+    rows.append(
+        ["median", "", "", "", "", "complete"]
+        + [
+            _format_stat(
+                statistics.median(medians[column]) if medians[column] else None
+            )
+            for column in header[6:]
+        ]
+    )
+
+    widths: list[int] = [
+        max(len(row[i]) for row in [header] + rows) for i in range(len(header))
+    ]
+    return [
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in [header] + rows
+    ]
+
+
+def _format_stat(value: float | None) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.0f}" if value >= 100 else f"{value:.2f}"
+
+
+@cli.command()
+@click.option(
+    "--limit", default=20, show_default=True, help="Number of recent runs to show"
+)
+@click.option("--source", help="Only show runs of this connector")
+@click.option("--platform", help="Only show runs of this platform")
+def ingestion_stats(limit: int, source: str, platform: str):
+    """
+    Shows the phase timings, throughput and peak memory of recent ingestion runs
+    """
+    database: Database = Database()
+    database.connect()
+    with database.Session.begin() as session:
+        ingestion_processes: list[IngestionProcessDbo] = (
+            IngestionProcessRepository.get_recent(
+                session=session, limit=limit, source=source, platform=platform
+            )
+        )
+        for line in format_ingestion_stats(ingestion_processes=ingestion_processes):
+            click.echo(line)
+
+
+@cli.command()
+@click.option(
+    "--once",
+    is_flag=True,
+    default=False,
+    help="Exit once the spool is empty, rather than polling it",
+)
+def drain_decision_logs(once: bool):
+    """
+    Writes spooled decision logs to the database, for API servers with decision_log_spool.writer_threads of 0
+    """
+    if not DecisionLogSpool.is_enabled():
+        raise click.UsageError("decision_log_spool.directory is not configured")
+
+    database: Database = Database()
+    database.connect()
+    writer: DecisionLogSpoolWriter = DecisionLogSpoolWriter(
+        spool=DecisionLogSpool(), database=database
     )
+    if once:
+        click.echo(f"Wrote {writer.run_once()} decision logs")
+    else:
+        writer.run()
 
 
 if __name__ == "__main__":
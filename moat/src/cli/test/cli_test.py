@@ -0,0 +1,96 @@
+import datetime
+
+from click.testing import CliRunner, Result
+from models import IngestionProcessDbo
+
+from ..src.cli import format_ingestion_stats, ingest
+
+
+def get_ingestion_process(
+    ingestion_process_id: int, status: str, merge_seconds: float | None
+) -> IngestionProcessDbo:
+    metrics: dict | None = None
+    if merge_seconds is not None:
+        metrics = {
+            "phases": {
+                "retrieve": {"seconds": 1.0, "row_count": 100, "rows_per_second": 100},
+                "merge": {
+                    "seconds": merge_seconds,
+                    "row_count": 100,
+                    "rows_per_second": 100,
+                },
+            },
+            "object_types": {"principal": {"staged": 100}},
+            "peak_rss_mb": 150.5,
+        }
+    return IngestionProcessDbo(
+        ingestion_process_id=ingestion_process_id,
+        source="ldap",
+        platform="ad",
+        object_type="principal",
+        status=status,
+        started_at=datetime.datetime(2026, 1, ingestion_process_id, 2, 0),
+        metrics=metrics,
+    )
+
+
+def test_format_ingestion_stats():
+    # newest first, as returned by IngestionProcessRepository.get_recent
+    lines: list[str] = format_ingestion_stats(
+        ingestion_processes=[
+            get_ingestion_process(3, "failed", merge_seconds=None),
+            get_ingestion_process(2, "complete", merge_seconds=3.0),
+            get_ingestion_process(1, "complete", merge_seconds=1.0),
+        ]
+    )
+
+    assert lines[0].split() == [
+        "id",
+        "started_at",
+        "source",
+        "platform",
+        "object_types",
+        "status",
+        "acquire",
+        "retrieve",
+        "stage",
+        "merge",
+        "deactivate",
+        "total",
+        "rows",
+        "rows/s",
+        "rss_mb",
+    ]
+    # oldest first, then the median of the completed runs
+    assert [line.split()[0] for line in lines[1:]] == ["1", "2", "3", "median"]
+    # started_at is split into date and time
+    assert lines[1].split()[7:] == [
+        "-",
+        "1.00",
+        "-",
+        "1.00",
+        "-",
+        "2.00",
+        "100",
+        "50.00",
+        "150",
+    ]
+    assert lines[3].split()[6:] == ["failed"] + ["-"] * 9
+    assert lines[4].split()[1:] == [
+        "complete",
+        "-",
+        "1.00",
+        "-",
+        "2.00",
+        "-",
+        "3.00",
+        "100",
+        "37.50",
+        "150",
+    ]
+
+
+def test_ingest_requires_object_type():
+    result: Result = CliRunner().invoke(ingest, ["--connector-name", "ldap"])
+    assert result.exit_code == 2
+    assert "Missing option '--object-type'" in result.output
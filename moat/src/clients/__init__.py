@@ -1,2 +1,2 @@
 from .ldap_client import LdapClient
-from .trino_client import TrinoClient
+from .trino_client import RowBatch, TrinoClient
@@ -1,5 +1,8 @@
+from typing import Any, Generator
+
 from ldap3 import ALL, Connection, Server
 from ldap3.core.exceptions import LDAPBindError, LDAPException
+from ldap3.utils.ciDict import CaseInsensitiveDict
 
 from .ldap_client_config import LdapClientConfig
 
@@ -45,3 +48,40 @@ class LdapClient:
             return [e.entry_attributes_as_dict for e in entries]
         except LDAPException as e:
             raise e
+
+    def list_users_paged(
+        self,
+        user_search_base: str,
+        user_search_filter: str,
+        attributes: list[str],
+        page_size: int = None,
+    ) -> Generator[CaseInsensitiveDict, Any, None]:
+        """
+        Same as list_users, but uses the simple paged results control so that
+        large directories are not limited by the server size limit
+        Users are yielded as each page arrives, only one page is held in memory
+        """
+        page_size = page_size or int(self._config.page_size)
+
+        try:
+            entries = self._connection.extend.standard.paged_search(
+                search_base=user_search_base,
+                search_filter=user_search_filter,
+                attributes=attributes,
+                paged_size=page_size,
+                generator=True,
+            )
+            for entry in entries:
+                # skip search result references
+                if entry.get("type") != "searchResEntry":
+                    continue
+
+                # same format as entry_attributes_as_dict, values are always lists
+                yield CaseInsensitiveDict(
+                    {
+                        key: value if isinstance(value, list) else [value]
+                        for key, value in entry["attributes"].items()
+                    }
+                )
+        except LDAPException as e:
+            raise e
@@ -9,3 +9,4 @@ class LdapClientConfig(AppConfigModelBase):
     password: str = None
     base_dn: str = None
     user_base_dn: str = None
+    page_size: str = "500"
@@ -1,3 +1,40 @@
+from unittest import mock
+
+from ldap3 import MOCK_SYNC, OFFLINE_SLAPD_2_4, Connection, Server
+
+from ..src.ldap_client import LdapClient
+
+ADMIN_DN: str = "uid=admin,ou=people,dc=example,dc=com"
+
+
+def get_mock_connection(user_count: int) -> Connection:
+    server: Server = Server("mock_ldap", get_info=OFFLINE_SLAPD_2_4)
+    connection: Connection = Connection(
+        server, user=ADMIN_DN, password="changeme", client_strategy=MOCK_SYNC
+    )
+    connection.strategy.add_entry(
+        ADMIN_DN,
+        {"uid": "admin", "userPassword": "changeme", "objectClass": "person"},
+    )
+    for i in range(user_count):
+        connection.strategy.add_entry(
+            f"uid=user{i},ou=people,dc=example,dc=com",
+            {
+                "uid": f"user{i}",
+                "givenName": f"User{i}",
+                "sn": "Example",
+                "mail": f"user{i}@example.com",
+                "memberOf": [
+                    "cn=moat_users_gl,ou=groups,dc=example,dc=com",
+                    f"cn=team_{i % 2}_gl,ou=groups,dc=example,dc=com",
+                ],
+                "objectClass": "person",
+            },
+        )
+    connection.bind()
+    return connection
+
+
 def test_list_users_with_groups():
     # client: LdapClient = LdapClient()
     # client.connect()
@@ -9,3 +46,52 @@ def test_list_users_with_groups():
     # with open("ldap_users.json", "w") as f:
     #     json.dump(users, f)
     pass
+
+
+def test_list_users_paged():
+    client: LdapClient = LdapClient()
+    client._connection = get_mock_connection(user_count=7)
+
+    with mock.patch.object(
+        client._connection, "search", wraps=client._connection.search
+    ) as mock_search:
+        users = client.list_users_paged(
+            user_search_base="ou=people,dc=example,dc=com",
+            user_search_filter="(uid=user*)",
+            attributes=["uid", "givenname", "sn", "mail", "memberOf"],
+            page_size=3,
+        )
+
+        # nothing is searched until the generator is consumed
+        assert mock_search.call_count == 0
+        users: list[dict] = list(users)
+
+        # 7 users in pages of 3
+        assert mock_search.call_count == 3
+
+    assert sorted(u["uid"][0] for u in users) == [f"user{i}" for i in range(7)]
+
+    user: dict = next(u for u in users if u["uid"] == ["user1"])
+    assert user["givenname"] == ["User1"]
+    assert user["mail"] == ["user1@example.com"]
+    assert user["memberOf"] == [
+        "cn=moat_users_gl,ou=groups,dc=example,dc=com",
+        "cn=team_1_gl,ou=groups,dc=example,dc=com",
+    ]
+
+
+def test_list_users_paged_matches_list_users():
+    client: LdapClient = LdapClient()
+    client._connection = get_mock_connection(user_count=5)
+    search_args: dict = {
+        "user_search_base": "ou=people,dc=example,dc=com",
+        "user_search_filter": "(uid=user*)",
+        "attributes": ["uid", "givenname", "sn", "mail", "memberOf"],
+    }
+
+    users: list[dict] = client.list_users(**search_args)
+    paged_users: list[dict] = list(client.list_users_paged(**search_args, page_size=2))
+
+    assert sorted([dict(u) for u in paged_users], key=lambda u: u["uid"]) == sorted(
+        users, key=lambda u: u["uid"]
+    )
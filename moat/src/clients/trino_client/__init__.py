@@ -1 +1 @@
-from .src.trino_client import TrinoClient
+from .src.trino_client import RowBatch, TrinoClient
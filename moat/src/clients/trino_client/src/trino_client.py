@@ -1,4 +1,10 @@
-from typing import Any, Generator
+import operator
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Callable, Generator, Iterator, Sequence
 
 from app_logger import Logger, get_logger
 from trino.dbapi import Cursor, connect
@@ -7,12 +13,43 @@ from .trino_client_config import TrinoClientConfig
 
 logger: Logger = get_logger("clients.trino_client")
 
+# put on the batch queue by a worker when its query has no more batches
+_QUERY_DONE = object()
+
+
+@dataclass
+class RowBatch:
+    """
+    A batch of rows as the cursor returned them, with the query's column names
+    Rows are not copied into dicts, consumers look up each column's index once per batch
+    """
+
+    columns: list[str]
+    rows: list[Sequence]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def getter(self, column: str) -> Callable[[Sequence], Any]:
+        """
+        Returns a function which gets the column's value from a row,
+        or None when the query did not return the column
+        """
+        if column not in self.columns:
+            return lambda row: None
+        return operator.itemgetter(self.columns.index(column))
+
+    def column(self, column: str) -> list:
+        getter: Callable[[Sequence], Any] = self.getter(column)
+        return [getter(row) for row in self.rows]
+
 
 class TrinoClient:
     trino_connection = None
 
     def __init__(self):
         config: TrinoClientConfig = TrinoClientConfig.load()
+        self.fetch_size: int = int(config.fetch_size)
         self.trino_connection = connect(
             host=config.host,
             port=config.port,
@@ -20,25 +57,102 @@ class TrinoClient:
             # auth=BasicAuthentication(config.username, config.password),
         )
 
+    def select_rows(
+        self, query: str, batch_size: int = None
+    ) -> Generator[RowBatch, Any, None]:
+        """
+        Yields each batch of rows as returned by the cursor, batch_size defaults to trino_client.fetch_size
+        The query is cancelled when the generator is closed before its last batch
+        """
+        cursor: Cursor = self._get_cursor()
+        try:
+            self._execute(cursor=cursor, query=query)
+            logger.info(f"Executing query {query} with id: {cursor.query_id}")
+
+            schema: list[str] = self._get_schema(cursor=cursor)
+
+            # Process each batch of results
+            for batch in self._fetchmany(
+                cursor=cursor, batch_size=batch_size or self.fetch_size
+            ):
+                # a single column record or row gives us a stupid result
+                if not isinstance(batch[0], list):
+                    batch = [batch]
+                yield RowBatch(columns=schema, rows=batch)
+        finally:
+            cursor.close()
+
     def select_async(
-        self, query: str, batch_size: int = 1000
+        self, query: str, batch_size: int = None
     ) -> Generator[list[dict[str, Any]], Any, None]:
-        cursor: Cursor = self._get_cursor()
-        self._execute(cursor=cursor, query=query)
-        logger.info(f"Executing query {query} with id: {cursor.query_id}")
+        for batch in self.select_rows(query=query, batch_size=batch_size):
+            yield [dict(zip(batch.columns, row)) for row in batch.rows]
+
+    @staticmethod
+    def select_parallel(
+        queries: list[str], max_workers: int, batch_size: int = None
+    ) -> Iterator[RowBatch]:
+        """
+        Runs the queries on at most max_workers threads, each with its own connection and cursor,
+        and yields their batches in the order they arrive, so a slow query does not hold up the others
+        Batches are handed over through a bounded queue, so workers wait for the consumer rather
+        than buffering whole results. The first error stops the other queries and is raised
+        Workers check for a stop between fetches, cancel their query and close their connection
+        """
+        batch_queue: queue.Queue = queue.Queue(maxsize=max_workers * 2)
+        stopped: threading.Event = threading.Event()
+
+        def put(item) -> bool:
+            # gives up once the consumer has stopped, so a worker never blocks forever
+            while not stopped.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def run(query: str) -> None:
+            if stopped.is_set():
+                return
+            trino_client: TrinoClient | None = None
+            try:
+                trino_client = TrinoClient()
+                with closing(
+                    trino_client.select_rows(query=query, batch_size=batch_size)
+                ) as batches:
+                    for batch in batches:
+                        if stopped.is_set() or not put(batch):
+                            return
+                put(_QUERY_DONE)
+            except Exception as e:
+                put(e)
+            finally:
+                if trino_client is not None:
+                    trino_client.close()
 
-        schema: list[str] = self._get_schema(cursor=cursor)
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="trino_client"
+        ) as executor:
+            for query in queries:
+                executor.submit(run, query)
 
-        # Process each batch of results
-        for batch in self._fetchmany(cursor=cursor, batch_size=batch_size):
-            # a single column record or row gives us a stupid result
-            if not isinstance(batch[0], list):
-                batch = [batch]
+            remaining: int = len(queries)
+            try:
+                while remaining:
+                    item = batch_queue.get()
+                    if item is _QUERY_DONE:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stopped.set()
+                executor.shutdown(wait=False, cancel_futures=True)
 
-            dict_records: list[dict[str, Any]] = []
-            for record in batch:
-                dict_records.append(dict(zip(schema, record)))
-            yield dict_records
+    def close(self) -> None:
+        self.trino_connection.close()
 
     def _get_cursor(self) -> Cursor:
         return self.trino_connection.cursor()
@@ -46,8 +160,11 @@ class TrinoClient:
     def _execute(self, cursor: Cursor, query: str) -> None:
         cursor.execute(query)
 
-    def _fetchmany(self, cursor: Cursor, batch_size: int) -> list[list]:
-        return cursor.fetchmany(size=batch_size)
+    def _fetchmany(
+        self, cursor: Cursor, batch_size: int
+    ) -> Generator[list[list], Any, None]:
+        while batch := cursor.fetchmany(size=batch_size):
+            yield batch
 
     def _get_schema(self, cursor: Cursor) -> list[str]:
         return [c.name for c in cursor.description]
@@ -7,3 +7,4 @@ class TrinoClientConfig(AppConfigModelBase):
     port: int = None
     username: str = None
     password: str = None
+    fetch_size: str = "1000"
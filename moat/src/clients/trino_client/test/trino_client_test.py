@@ -1,8 +1,11 @@
+import threading
+from typing import Iterator
 from unittest import mock
 
+import pytest
 from pytest import fixture
 
-from ..src.trino_client import TrinoClient
+from ..src.trino_client import RowBatch, TrinoClient
 from ..src.trino_client_config import TrinoClientConfig
 
 
@@ -129,3 +132,121 @@ def test_execute_query_multi_column(
     mock_get_cursor.assert_called_once()
     mock_get_schema.assert_called_once()
     mock_fetchmany.assert_called_once()
+
+
+@mock.patch.object(TrinoClient, "_get_cursor")
+@mock.patch.object(TrinoClient, "_execute")
+@mock.patch.object(TrinoClient, "_fetchmany", side_effect=mock_fetchmany_multi_column)
+@mock.patch.object(
+    TrinoClient,
+    "_get_schema",
+    return_value=["fq_name", "attribute_key", "attribute_value"],
+)
+def test_select_rows(
+    mock_get_schema: mock.MagicMock,
+    mock_fetchmany: mock.MagicMock,
+    mock_get_cursor: mock.MagicMock,
+    mock_execute: mock.MagicMock,
+    config: TrinoClientConfig,
+):
+    trino_client: TrinoClient = TrinoClient()
+
+    batches: list[RowBatch] = list(
+        trino_client.select_rows(query="select fq_name, attribute_key, attribute_value")
+    )
+
+    # rows are passed through as the cursor returned them, fetched in batches of fetch_size
+    assert mock_fetchmany.call_args.kwargs["batch_size"] == int(config.fetch_size)
+    assert [len(batch) for batch in batches] == [1, 2]
+    assert batches[1].rows[0] == ["datalake.logistics.regions", "finance", "restricted"]
+
+    # columns are looked up by index, missing columns are None
+    get_attribute_value = batches[1].getter("attribute_value")
+    assert [get_attribute_value(row) for row in batches[1].rows] == [
+        "restricted",
+        "commercial",
+    ]
+    assert batches[0].column("fq_name") == ["datalake.logistics.shippers"]
+    assert batches[0].column("object_type") == [None]
+
+
+def test_fetchmany(config: TrinoClientConfig):
+    cursor: mock.MagicMock = mock.MagicMock()
+    cursor.fetchmany.side_effect = [[["a"], ["b"]], [["c"]], []]
+
+    trino_client: TrinoClient = TrinoClient()
+    batches: list[list] = list(trino_client._fetchmany(cursor=cursor, batch_size=2))
+
+    # fetches until the cursor is exhausted
+    assert batches == [[["a"], ["b"]], [["c"]]]
+    assert cursor.fetchmany.call_count == 3
+
+
+def test_select_parallel(config: TrinoClientConfig):
+    slow_query_started: threading.Event = threading.Event()
+    fast_query_done: threading.Event = threading.Event()
+
+    def mock_select_rows(query: str, batch_size: int):
+        if query == "slow":
+            slow_query_started.set()
+            # the slow query only returns once the fast one has been read
+            assert fast_query_done.wait(timeout=5)
+            yield RowBatch(columns=["catalog"], rows=[["slow"]])
+        else:
+            yield RowBatch(columns=["catalog"], rows=[["fast1"]])
+            yield RowBatch(columns=["catalog"], rows=[["fast2"]])
+
+    with mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows):
+        batches: list[RowBatch] = []
+        for batch in TrinoClient.select_parallel(
+            queries=["slow", "fast"], max_workers=2
+        ):
+            batches.append(batch)
+            if len(batches) == 2:
+                fast_query_done.set()
+
+    assert slow_query_started.is_set()
+    assert [batch.column("catalog") for batch in batches] == [
+        ["fast1"],
+        ["fast2"],
+        ["slow"],
+    ]
+
+
+def test_select_parallel_error(config: TrinoClientConfig):
+    def mock_select_rows(query: str, batch_size: int):
+        if query == "broken":
+            raise ValueError("catalog is unavailable")
+        yield RowBatch(columns=["catalog"], rows=[[query]])
+
+    with mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows):
+        with pytest.raises(ValueError, match="catalog is unavailable"):
+            list(
+                TrinoClient.select_parallel(queries=["a", "broken", "b"], max_workers=2)
+            )
+
+
+def test_select_parallel_stop(config: TrinoClientConfig):
+    closed_queries: list[str] = []
+
+    def mock_select_rows(query: str, batch_size: int):
+        try:
+            while True:
+                yield RowBatch(columns=["catalog"], rows=[[query]])
+        finally:
+            closed_queries.append(query)
+
+    with mock.patch.object(
+        TrinoClient, "select_rows", side_effect=mock_select_rows
+    ), mock.patch.object(TrinoClient, "close") as mock_close:
+        batches: Iterator[RowBatch] = TrinoClient.select_parallel(
+            queries=["a", "b", "c"], max_workers=2
+        )
+        next(batches)
+        # stopping the consumer stops the endless queries, instead of waiting on them
+        batches.close()
+
+    # each query which was started is cancelled and its connection closed,
+    # the query which was still waiting for a worker is not started
+    assert len(closed_queries) == mock_close.call_count
+    assert closed_queries and set(closed_queries) <= {"a", "b"}
@@ -99,7 +99,7 @@ class DatabaseSeeder:
                 IngestionProcessDbo, ingestion_process_id
             )
             ingestion_process_dbo.completed_at = datetime.utcnow()
-            ingestion_process_dbo.status = "completed"
+            ingestion_process_dbo.status = "complete"
             session.commit()
 
     def seed(self):
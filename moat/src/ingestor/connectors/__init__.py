@@ -1,4 +1,6 @@
 from .connector_base import ConnectorBase
+from .columnar_file_connector import ColumnarFileConnector, ColumnarFileConnectorConfig
 from .connector_factory import ConnectorFactory
 from .dbapi_connector import DBAPIConnector, DBAPIConnectorConfig
+from .json_file_connector import JsonFileConnector, JsonFileConnectorConfigModel
 from .ldap_connector import LdapConnector, LdapConnectorConfig
@@ -0,0 +1,2 @@
+from .src.columnar_file_connector import ColumnarFileConnector
+from .src.columnar_file_connector_config import ColumnarFileConnectorConfig
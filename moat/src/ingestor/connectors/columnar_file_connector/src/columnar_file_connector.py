@@ -0,0 +1,187 @@
+from typing import Iterator
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from app_logger import Logger, get_logger
+from ingestor.connectors.connector_base import ConnectorBase
+from ingestor.models import BaseDio, DioBatch, ResourceAttributeDio, ResourceDio
+from models import ObjectTypeEnum
+
+from .columnar_file_connector_config import ColumnarFileConnectorConfig
+
+logger: Logger = get_logger("ingestor.connectors.columnar_file_connector")
+
+
+class ColumnarFileConnector(ConnectorBase):
+    """
+    Loads resources and their attributes from Parquet or CSV files, e.g catalog exports
+    Files have the same shape as the dbapi connector's query: one row per resource attribute,
+    or a single row with null attribute columns for a resource without attributes
+
+    Files are read as Arrow record batches of BATCH_SIZE rows, and only the configured
+    columns are read, so memory is bounded by the batch size rather than the file size
+    """
+
+    CONNECTOR_NAME: str = "columnar_file"
+    FILE_FORMATS: list[str] = ["parquet", "csv"]
+    # CSV files are read in blocks of this many bytes
+    CSV_BLOCK_SIZE: int = 16 * 1024 * 1024
+
+    def __init__(self):
+        super().__init__()
+        self.config: ColumnarFileConnectorConfig = ColumnarFileConnectorConfig.load()
+        logger.info("Created columnar file connector")
+
+    def _get_file_format(self) -> str:
+        # gzipped CSV files are decompressed by arrow
+        file_format: str = (
+            self.config.file_format
+            or self.config.file_path.removesuffix(".gz").rsplit(".", 1)[-1]
+        ).lower()
+        if file_format not in self.FILE_FORMATS:
+            raise ValueError(
+                f"File format {file_format} is not supported, use one of {self.FILE_FORMATS}"
+            )
+        return file_format
+
+    def _read_record_batches(self, columns: list[str]) -> Iterator[pa.RecordBatch]:
+        """
+        Reads the columns of the file in record batches
+        """
+        if not self.config.file_path:
+            raise ValueError(
+                "No file path is configured for the columnar file connector"
+            )
+
+        if self._get_file_format() == "parquet":
+            parquet_file: pq.ParquetFile = pq.ParquetFile(self.config.file_path)
+            yield from parquet_file.iter_batches(
+                batch_size=self.BATCH_SIZE, columns=columns
+            )
+            return
+
+        # every column is read as a string, so e.g numeric tag values are not converted
+        reader: pa_csv.CSVStreamingReader = pa_csv.open_csv(
+            self.config.file_path,
+            read_options=pa_csv.ReadOptions(block_size=self.CSV_BLOCK_SIZE),
+            parse_options=pa_csv.ParseOptions(delimiter=self.config.csv_delimiter),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=columns,
+                column_types={column: pa.string() for column in columns},
+                strings_can_be_null=True,
+            ),
+        )
+        for record_batch in reader:
+            # CSV blocks are sized in bytes, so they are re-sliced into batches of rows
+            for offset in range(0, record_batch.num_rows, self.BATCH_SIZE):
+                yield record_batch.slice(offset, self.BATCH_SIZE)
+
+    @staticmethod
+    def _to_strings(record_batch: pa.RecordBatch, column: str) -> list[str | None]:
+        return record_batch.column(column).cast(pa.string()).to_pylist()
+
+    def get_batches(
+        self, object_types: list[ObjectTypeEnum]
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        """
+        Resources and their attributes are read from the same record batches, so the file
+        is read once whichever of them are requested. A resource with several attributes
+        has several rows, so it is only kept once per record batch, and repeats across
+        batches are removed by the merge
+        """
+        resource_object_types: list[ObjectTypeEnum] = [
+            o
+            for o in [ObjectTypeEnum.RESOURCE, ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+            if o in object_types
+        ]
+        yield from super().get_batches(
+            object_types=[o for o in object_types if o not in resource_object_types]
+        )
+        if not resource_object_types:
+            return
+
+        # column projection, only the columns which are needed are read
+        columns: list[str] = [self.config.fq_name_column]
+        if ObjectTypeEnum.RESOURCE in resource_object_types:
+            columns.append(self.config.object_type_column)
+        if ObjectTypeEnum.RESOURCE_ATTRIBUTE in resource_object_types:
+            columns += [
+                self.config.attribute_key_column,
+                self.config.attribute_value_column,
+            ]
+
+        row_count: int = 0
+        resource_count: int = 0
+        try:
+            for record_batch in self._read_record_batches(columns=columns):
+                row_count += record_batch.num_rows
+                batches: dict[ObjectTypeEnum, DioBatch] = {}
+
+                if ObjectTypeEnum.RESOURCE in resource_object_types:
+                    resources: DioBatch[ResourceDio] = DioBatch(dio_type=ResourceDio)
+                    fq_names: set[str] = set()
+                    for fq_name, object_type in zip(
+                        self._to_strings(record_batch, self.config.fq_name_column),
+                        self._to_strings(record_batch, self.config.object_type_column),
+                    ):
+                        if fq_name is not None and fq_name not in fq_names:
+                            fq_names.add(fq_name)
+                            resources.append(fq_name, self.platform, object_type)
+                    resource_count += len(resources)
+                    batches[ObjectTypeEnum.RESOURCE] = resources
+
+                if ObjectTypeEnum.RESOURCE_ATTRIBUTE in resource_object_types:
+                    # rows without an attribute key are resources without attributes
+                    attribute_batch: pa.RecordBatch = record_batch.filter(
+                        pc.is_valid(
+                            record_batch.column(self.config.attribute_key_column)
+                        )
+                    )
+                    # the columns are used as they are, no object is built per row
+                    batches[ObjectTypeEnum.RESOURCE_ATTRIBUTE] = DioBatch(
+                        dio_type=ResourceAttributeDio,
+                        columns={
+                            "fq_name": self._to_strings(
+                                attribute_batch, self.config.fq_name_column
+                            ),
+                            "platform": [self.platform] * attribute_batch.num_rows,
+                            "attribute_key": self._to_strings(
+                                attribute_batch, self.config.attribute_key_column
+                            ),
+                            "attribute_value": self._to_strings(
+                                attribute_batch, self.config.attribute_value_column
+                            ),
+                        },
+                    )
+                yield batches
+
+            logger.info(
+                f"Read {row_count} rows from {self.config.file_path} ({resource_count} resources)"
+            )
+        except Exception as e:
+            self._log_error(str(e))
+            raise
+
+    def get_resource_batches(self) -> Iterator[DioBatch[ResourceDio]]:
+        for batches in self.get_batches(object_types=[ObjectTypeEnum.RESOURCE]):
+            yield batches[ObjectTypeEnum.RESOURCE]
+
+    def get_resource_attribute_batches(
+        self,
+    ) -> Iterator[DioBatch[ResourceAttributeDio]]:
+        for batches in self.get_batches(
+            object_types=[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+        ):
+            yield batches[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+
+    def get_resources(self) -> list[ResourceDio]:
+        return [resource for batch in self.get_resource_batches() for resource in batch]
+
+    def get_resource_attributes(self) -> list[ResourceAttributeDio]:
+        return [
+            resource_attribute
+            for batch in self.get_resource_attribute_batches()
+            for resource_attribute in batch
+        ]
@@ -0,0 +1,12 @@
+from app_config import AppConfigModelBase
+
+
+class ColumnarFileConnectorConfig(AppConfigModelBase):
+    CONFIG_PREFIX: str = "columnar_file_connector"
+    file_path: str = None
+    file_format: str = None  # parquet or csv, by default from the file extension
+    csv_delimiter: str = ","
+    fq_name_column: str = "fq_name"
+    object_type_column: str = "object_type"
+    attribute_key_column: str = "attribute_key"
+    attribute_value_column: str = "attribute_value"
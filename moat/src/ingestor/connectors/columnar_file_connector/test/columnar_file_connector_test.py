@@ -0,0 +1,130 @@
+import gzip
+from pathlib import Path
+from unittest import mock
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from ingestor.models import ResourceAttributeDio, ResourceDio
+from models import ObjectTypeEnum
+
+from ..src.columnar_file_connector import ColumnarFileConnector
+
+rows: dict[str, list] = {
+    "fq_name": [
+        "datalake.hr.employees",
+        "datalake.hr.employees",
+        "datalake.hr.employees.salary",
+        "datalake.sales.orders",
+    ],
+    "object_type": ["table", "table", "column", "table"],
+    "attribute_key": ["classification", "owner", "classification", None],
+    "attribute_value": ["PII", "hr", "Restricted", None],
+    "description": ["not", "read", "by", "moat"],
+}
+
+
+def get_connector(file_path: Path) -> ColumnarFileConnector:
+    connector: ColumnarFileConnector = ColumnarFileConnector()
+    connector.config.file_path = str(file_path)
+    connector.BATCH_SIZE = 3
+    connector.acquire_data(platform="catalog")
+    return connector
+
+
+def test_parquet(tmp_path: Path):
+    file_path: Path = tmp_path / "tags.parquet"
+    pq.write_table(pa.table(rows), file_path, row_group_size=2)
+    connector: ColumnarFileConnector = get_connector(file_path=file_path)
+
+    with mock.patch.object(
+        connector, "_read_record_batches", wraps=connector._read_record_batches
+    ) as mock_read_record_batches:
+        batches: list[dict] = list(
+            connector.get_batches(
+                object_types=[
+                    ObjectTypeEnum.RESOURCE,
+                    ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+                ]
+            )
+        )
+    # the file is read once, and the description column is not read
+    mock_read_record_batches.assert_called_once_with(
+        columns=["fq_name", "object_type", "attribute_key", "attribute_value"]
+    )
+
+    resources: list = [r for b in batches for r in b[ObjectTypeEnum.RESOURCE]]
+    assert resources == [
+        ResourceDio(
+            fq_name="datalake.hr.employees", object_type="table", platform="catalog"
+        ),
+        ResourceDio(
+            fq_name="datalake.hr.employees.salary",
+            object_type="column",
+            platform="catalog",
+        ),
+        ResourceDio(
+            fq_name="datalake.sales.orders", object_type="table", platform="catalog"
+        ),
+    ]
+    attributes: list = [
+        a for b in batches for a in b[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+    ]
+    assert attributes == [
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            attribute_key="classification",
+            attribute_value="PII",
+            platform="catalog",
+        ),
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            attribute_key="owner",
+            attribute_value="hr",
+            platform="catalog",
+        ),
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees.salary",
+            attribute_key="classification",
+            attribute_value="Restricted",
+            platform="catalog",
+        ),
+    ]
+
+
+def test_csv(tmp_path: Path):
+    file_path: Path = tmp_path / "tags.csv.gz"
+    with gzip.open(file_path, "wt") as f:
+        f.write(
+            "fq_name;tag;level;notes\n"
+            "datalake.hr.employees;classification;1;x\n"
+            "datalake.hr.employees;owner;;y\n"
+            "datalake.sales.orders;;;z\n"
+        )
+    connector: ColumnarFileConnector = get_connector(file_path=file_path)
+    connector.config.csv_delimiter = ";"
+    connector.config.attribute_key_column = "tag"
+    connector.config.attribute_value_column = "level"
+    connector.BATCH_SIZE = 2
+
+    assert connector.get_resource_attributes() == [
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            attribute_key="classification",
+            attribute_value="1",
+            platform="catalog",
+        ),
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            attribute_key="owner",
+            attribute_value=None,
+            platform="catalog",
+        ),
+    ]
+
+
+def test_unsupported_file_format(tmp_path: Path):
+    connector: ColumnarFileConnector = get_connector(file_path=tmp_path / "tags.xlsx")
+    with pytest.raises(ValueError, match="File format xlsx is not supported"):
+        connector.get_resources()
+    assert len(connector.errors) == 1
@@ -1,13 +1,20 @@
+from itertools import islice
+from typing import Callable, Iterable, Iterator, TypeVar
+
 from app_logger import Logger, get_logger
 from ingestor.models import (
+    BaseDio,
     PrincipalAttributeDio,
     PrincipalDio,
     ResourceAttributeDio,
     ResourceDio,
 )
+from models import ObjectTypeEnum
 
 logger: Logger = get_logger("ingestor.connectors.base")
 
+T = TypeVar("T")
+
 
 class ConnectorBase:
     """
@@ -25,11 +32,31 @@ class ConnectorBase:
     which executes a merge into the target table
 
     Possibly this will then create a hook which updates the bundle
+
+    The get_*_batches methods are what the ingestion controllers consume.
+    By default they split the get_* lists into batches of BATCH_SIZE; connectors
+    which can read their source incrementally override them to stream batches,
+    so memory is bounded by the batch size rather than the source size
+
+    get_batches feeds several object types from one acquisition. By default it
+    reads each object type's batches in turn; connectors which can produce
+    several object types from a single pass over their source override it
+
+    Connectors which support delta ingestion only return records changed since
+    since_watermark when it is set, and track the high_watermark of the records
+    they returned, which is stored for the next run. Connectors which re-pull
+    whole parts of the source on a delta set delta_scopes to the fq_name prefixes
+    they covered, so omitted records under those prefixes are still deactivated
     """
 
+    BATCH_SIZE: int = 10000
+
     def __init__(self):
         self.errors: list[str] = []
         self.platform: str = ""
+        self.since_watermark: str | None = None
+        self.high_watermark: str | None = None
+        self.delta_scopes: list[str] | None = None
 
     def _log_error(self, error: str) -> None:
         self.errors.append(error)
@@ -53,3 +80,43 @@ class ConnectorBase:
     def get_resource_attributes(self) -> list[ResourceAttributeDio]:
         logger.info("Skipping ingestion of resource attributes")
         return []
+
+    def get_principal_batches(self) -> Iterator[list[PrincipalDio]]:
+        return ConnectorBase.batched(self.get_principals(), self.BATCH_SIZE)
+
+    def get_principal_attribute_batches(
+        self,
+    ) -> Iterator[list[PrincipalAttributeDio]]:
+        return ConnectorBase.batched(self.get_principal_attributes(), self.BATCH_SIZE)
+
+    def get_resource_batches(self) -> Iterator[list[ResourceDio]]:
+        return ConnectorBase.batched(self.get_resources(), self.BATCH_SIZE)
+
+    def get_resource_attribute_batches(self) -> Iterator[list[ResourceAttributeDio]]:
+        return ConnectorBase.batched(self.get_resource_attributes(), self.BATCH_SIZE)
+
+    def get_batches(
+        self, object_types: list[ObjectTypeEnum]
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        """
+        Yields batches keyed by the object type they belong to
+        """
+        batch_getters: dict[ObjectTypeEnum, Callable[[], Iterator[list[BaseDio]]]] = {
+            ObjectTypeEnum.PRINCIPAL: self.get_principal_batches,
+            ObjectTypeEnum.PRINCIPAL_ATTRIBUTE: self.get_principal_attribute_batches,
+            ObjectTypeEnum.RESOURCE: self.get_resource_batches,
+            ObjectTypeEnum.RESOURCE_ATTRIBUTE: self.get_resource_attribute_batches,
+        }
+        for object_type in object_types:
+            if object_type not in batch_getters:
+                raise ValueError(
+                    f"Object type {object_type} is not supported by connectors"
+                )
+            for batch in batch_getters[object_type]():
+                yield {object_type: batch}
+
+    @staticmethod
+    def batched(items: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+        iterator: Iterator[T] = iter(items)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
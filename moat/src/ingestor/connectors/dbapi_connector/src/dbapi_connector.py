@@ -1,7 +1,11 @@
+import json
+from typing import Any, Callable, Iterator, Sequence
+
 from app_logger import Logger, get_logger
-from clients import TrinoClient
+from clients import RowBatch, TrinoClient
 from ingestor.connectors.connector_base import ConnectorBase
-from ingestor.models import ResourceAttributeDio, ResourceDio
+from ingestor.models import BaseDio, DioBatch, ResourceAttributeDio, ResourceDio
+from models import ObjectTypeEnum
 
 from .dbapi_connnector_config import DBAPIConnectorConfig
 
@@ -16,42 +20,220 @@ class DBAPIConnector(ConnectorBase):
         self.config: DBAPIConnectorConfig = DBAPIConnectorConfig.load()
         logger.info("Created DBAPI connector")
         self.tables: list[str] = []
+        self.changed_schemas: list[str] | None = None
 
         if not self.config.client_type == "trino":
             raise ValueError("Only trino clients are available")
 
         self.trino_client: TrinoClient = TrinoClient()
 
+    def acquire_data(self, platform: str) -> None:
+        """
+        When a schema fingerprint query is configured, fingerprints each schema and stores them
+        as the high_watermark. On a delta run only schemas whose fingerprint changed since the
+        since_watermark are re-pulled, and schemas which changed or disappeared are the delta_scopes.
+        With an attribute fingerprint query, a schema's attributes are part of its fingerprint.
+        Without both a fingerprint query and a schema query a delta run is a full run
+        """
+        self.platform = platform
+        self.changed_schemas = None
+
+        if not (
+            self.config.schema_fingerprint_query
+            and self.config.data_object_schema_query
+        ):
+            self._set_full_run()
+        if not self.config.schema_fingerprint_query:
+            return
+
+        fingerprints: dict[str, str] = self._get_schema_fingerprints(
+            query=self.config.schema_fingerprint_query
+        )
+        if self.config.attribute_fingerprint_query:
+            attribute_fingerprints: dict[str, str] = self._get_schema_fingerprints(
+                query=self.config.attribute_fingerprint_query
+            )
+            fingerprints = {
+                schema_name: f"{fingerprints.get(schema_name, '')}/"
+                f"{attribute_fingerprints.get(schema_name, '')}"
+                for schema_name in fingerprints.keys() | attribute_fingerprints.keys()
+            }
+        self.high_watermark = json.dumps(fingerprints, sort_keys=True)
+
+        if self.since_watermark:
+            previous_fingerprints: dict[str, str] = json.loads(self.since_watermark)
+            self.changed_schemas = sorted(
+                schema_name
+                for schema_name, fingerprint in fingerprints.items()
+                if previous_fingerprints.get(schema_name) != fingerprint
+            )
+            removed_schemas: list[str] = sorted(
+                set(previous_fingerprints) - set(fingerprints)
+            )
+            self.delta_scopes = [
+                f"{schema_name}."
+                for schema_name in self.changed_schemas + removed_schemas
+            ]
+            logger.info(
+                f"{len(self.changed_schemas)} of {len(fingerprints)} schemas changed, "
+                f"{len(removed_schemas)} removed since the last run"
+            )
+
+    def _set_full_run(self) -> None:
+        # without a since_watermark the controller merges and deactivates as for a full run
+        self.changed_schemas = None
+        self.since_watermark = None
+        self.delta_scopes = None
+
+    def _get_schema_fingerprints(self, query: str) -> dict[str, str]:
+        fingerprints: dict[str, str] = {}
+        for batch in self.trino_client.select_rows(query=query):
+            get_schema_name: Callable[[Sequence], Any] = batch.getter(
+                self.config.schema_name_key
+            )
+            get_fingerprint: Callable[[Sequence], Any] = batch.getter(
+                self.config.fingerprint_key
+            )
+            for row in batch.rows:
+                fingerprints[get_schema_name(row)] = str(get_fingerprint(row))
+        return fingerprints
+
+    def _get_catalogs(self) -> list[str]:
+        catalogs: list[str] = []
+        for batch in self.trino_client.select_rows(query=self.config.catalog_query):
+            catalogs += batch.column(self.config.catalog_name_key)
+        return catalogs
+
+    def _get_queries(self) -> list[str]:
+        """
+        The full query, one catalog query per catalog when catalogs are listed first,
+        or one schema query per changed schema on an incremental run
+        """
+        if self.changed_schemas is None:
+            if self.config.catalog_query and self.config.data_object_catalog_query:
+                catalogs: list[str] = self._get_catalogs()
+                logger.info(f"Extracting {len(catalogs)} catalogs")
+                return [
+                    self.config.data_object_catalog_query.replace(
+                        "{catalog}", catalog.replace("'", "''")
+                    )
+                    for catalog in catalogs
+                ]
+            return [self.config.data_object_table_column_query]
+
+        queries: list[str] = []
+        for schema_name in self.changed_schemas:
+            catalog, schema = schema_name.split(".", 1)
+            queries.append(
+                self.config.data_object_schema_query.replace(
+                    "{catalog}", catalog.replace("'", "''")
+                ).replace("{schema}", schema.replace("'", "''"))
+            )
+        return queries
+
+    def get_batches(
+        self, object_types: list[ObjectTypeEnum]
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        """
+        When resources and their attributes are both requested, the query runs once and feeds both:
+        each record is a resource, and also an attribute of it when its attribute key is set.
+        A resource with several attributes is returned once per attribute in consecutive records, as the
+        query is ordered by fq_name, so it is only kept when its fq_name differs from the previous record.
+        Memory is bounded by the batch size, and any repeat left, e.g across parallel queries, is
+        removed by the merge
+
+        Schema fingerprints only cover attributes when an attribute fingerprint query is configured,
+        otherwise a delta run which ingests attributes falls back to a full run
+        """
+        if (
+            ObjectTypeEnum.RESOURCE_ATTRIBUTE in object_types
+            and self.changed_schemas is not None
+            and not self.config.attribute_fingerprint_query
+        ):
+            logger.warning(
+                "No attribute fingerprint query is configured, running a full ingestion"
+            )
+            self._set_full_run()
+
+        resource_object_types: list[ObjectTypeEnum] = [
+            ObjectTypeEnum.RESOURCE,
+            ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+        ]
+        if not all(o in object_types for o in resource_object_types):
+            yield from super().get_batches(object_types=object_types)
+            return
+
+        yield from super().get_batches(
+            object_types=[o for o in object_types if o not in resource_object_types]
+        )
+
+        record_count: int = 0
+        resource_count: int = 0
+        previous_fq_name: str | None = None
+        try:
+            for batch in self._select_batches():
+                record_count += len(batch)
+                get_fq_name, get_object_type, get_attribute_key, get_attribute_value = (
+                    self._get_getters(batch=batch)
+                )
+                resources: DioBatch[ResourceDio] = DioBatch(dio_type=ResourceDio)
+                resource_attributes: DioBatch[ResourceAttributeDio] = DioBatch(
+                    dio_type=ResourceAttributeDio
+                )
+                for row in batch.rows:
+                    fq_name: str = get_fq_name(row)
+                    if fq_name != previous_fq_name:
+                        previous_fq_name = fq_name
+                        resources.append(fq_name, self.platform, get_object_type(row))
+                    attribute_key: str = get_attribute_key(row)
+                    if attribute_key is not None:
+                        resource_attributes.append(
+                            fq_name,
+                            self.platform,
+                            attribute_key,
+                            get_attribute_value(row),
+                        )
+                resource_count += len(resources)
+                yield {
+                    ObjectTypeEnum.RESOURCE: resources,
+                    ObjectTypeEnum.RESOURCE_ATTRIBUTE: resource_attributes,
+                }
+
+            logger.info(
+                f"Ingested {resource_count} resources from {record_count} table records"
+            )
+        except Exception as e:
+            self._log_error(str(e))
+            raise
+
     def get_resources(self) -> list[ResourceDio]:
+        return [resource for batch in self.get_resource_batches() for resource in batch]
+
+    def get_resource_batches(self) -> Iterator[DioBatch[ResourceDio]]:
         """
         The get tables function brings in all table objects from the source system e.g trino regardless of applied auth rules
         Query for the source system is supplied in the config
+        Each batch fetched from the source system is yielded as soon as it arrives
         """
-        # Get the SQL query from the config
-        query = self.config.data_object_table_column_query
-
-        # Execute the query and process the results
-        tables: list[dict[str, str] | None] = []
+        # Execute the queries from the config and process the results
+        record_count: int = 0
         try:
-            for batch in self.trino_client.select_async(query=query):
-                tables.extend(
-                    [
-                        {
-                            "fq_name": record.get(self.config.fq_name_key),
-                            "object_type": record.get(self.config.object_type_key),
-                            "platform": self.platform,
-                        }
-                        for record in batch
-                    ]
+            for batch in self._select_batches():
+                record_count += len(batch)
+                yield DioBatch(
+                    dio_type=ResourceDio,
+                    columns={
+                        "fq_name": batch.column(self.config.fq_name_key),
+                        "platform": [self.platform] * len(batch),
+                        "object_type": batch.column(self.config.object_type_key),
+                    },
                 )
 
-            logger.info(f"Ingested {len(tables)} table records")
+            logger.info(f"Ingested {record_count} table records")
         except Exception as e:
             self._log_error(str(e))
             raise
 
-        return [ResourceDio(**t) for t in tables]
-
     def get_resource_attributes(self) -> list[ResourceAttributeDio]:
         """
         Gets the attributes of a table and returns them as a list.
@@ -60,27 +242,72 @@ class DBAPIConnector(ConnectorBase):
         Returns:
             list[DataObjectAttributeDio]: A list of table attributes.
         """
-        resource_attrs: list[dict] = []
-        query = self.config.data_object_table_column_query
+        return [
+            resource_attribute
+            for batch in self.get_resource_attribute_batches()
+            for resource_attribute in batch
+        ]
+
+    def get_resource_attribute_batches(
+        self,
+    ) -> Iterator[DioBatch[ResourceAttributeDio]]:
+        """
+        Records without an attribute key are resources without attributes, e.g from a left join,
+        so they are skipped as in get_batches
+        """
+        record_count: int = 0
         try:
-            for batch in self.trino_client.select_async(query=query):
-                resource_attrs.extend(
-                    [
-                        {
-                            "fq_name": record.get(self.config.fq_name_key),
-                            "attribute_key": record.get(self.config.attribute_key_key),
-                            "attribute_value": record.get(
-                                self.config.attribute_value_key
-                            ),
-                            "platform": self.platform,
-                        }
-                        for record in batch
-                    ]
+            for batch in self._select_batches():
+                record_count += len(batch)
+                get_fq_name, _, get_attribute_key, get_attribute_value = (
+                    self._get_getters(batch=batch)
                 )
+                resource_attributes: DioBatch[ResourceAttributeDio] = DioBatch(
+                    dio_type=ResourceAttributeDio
+                )
+                for row in batch.rows:
+                    attribute_key: str = get_attribute_key(row)
+                    if attribute_key is not None:
+                        resource_attributes.append(
+                            get_fq_name(row),
+                            self.platform,
+                            attribute_key,
+                            get_attribute_value(row),
+                        )
+                yield resource_attributes
 
-            logger.info(f"Ingested {len(resource_attrs)} table records")
+            logger.info(f"Ingested {record_count} table records")
         except Exception as e:
             self._log_error(str(e))
             raise
 
-        return [ResourceAttributeDio(**ta) for ta in resource_attrs]
+    def _get_getters(self, batch: RowBatch) -> list[Callable[[Sequence], Any]]:
+        """
+        The fq_name, object_type, attribute_key and attribute_value getters for a batch's rows,
+        columns are mapped to indexes once per batch rather than looked up per row
+        """
+        return [
+            batch.getter(key)
+            for key in [
+                self.config.fq_name_key,
+                self.config.object_type_key,
+                self.config.attribute_key_key,
+                self.config.attribute_value_key,
+            ]
+        ]
+
+    def _select_batches(self) -> Iterator[RowBatch]:
+        """
+        With max_parallel_queries, several per-catalog or per-schema queries run at once,
+        each on its own connection, and their batches are streamed as they arrive
+        """
+        queries: list[str] = self._get_queries()
+        max_parallel_queries: int = int(self.config.max_parallel_queries)
+        if max_parallel_queries > 1 and len(queries) > 1:
+            yield from TrinoClient.select_parallel(
+                queries=queries, max_workers=max_parallel_queries
+            )
+            return
+
+        for query in queries:
+            yield from self.trino_client.select_rows(query=query)
@@ -9,3 +9,12 @@ class DBAPIConnectorConfig(AppConfigModelBase):
     object_type_key: str = "object_type"
     attribute_key_key: str = "attribute_key"
     attribute_value_key: str = "attribute_value"
+    schema_fingerprint_query: str = None
+    attribute_fingerprint_query: str = None
+    data_object_schema_query: str = None
+    schema_name_key: str = "schema_name"
+    fingerprint_key: str = "fingerprint"
+    catalog_query: str = None
+    catalog_name_key: str = "catalog_name"
+    data_object_catalog_query: str = None
+    max_parallel_queries: str = "1"
@@ -1,10 +1,11 @@
+import json
 from unittest import mock
 
-from clients import TrinoClient
+from clients import RowBatch, TrinoClient
 
 from ..src.dbapi_connector import DBAPIConnector
 from ingestor.models import ResourceDio, ResourceAttributeDio
-
+from models import ObjectTypeEnum
 
 # Create a list of 10 representative Trino table names with attributes
 mock_resources = [
@@ -81,13 +82,22 @@ mock_resources = [
 ]
 
 
-# Mock the select_async method to yield a batch of mock table names
-def mock_select_async_generator(*args, **kwargs):
-    yield mock_resources
+def to_row_batch(records: list[dict]) -> RowBatch:
+    # rows come back from the cursor as lists, in the order of the query's columns
+    columns: list[str] = list(records[0])
+    return RowBatch(
+        columns=columns,
+        rows=[[record.get(column) for column in columns] for record in records],
+    )
+
+
+# Mock the select_rows method to yield a batch of mock table names
+def mock_select_rows_generator(*args, **kwargs):
+    yield to_row_batch(mock_resources)
 
 
-@mock.patch.object(TrinoClient, "select_async", side_effect=mock_select_async_generator)
-def test_get_resources(mock_select_async):
+@mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows_generator)
+def test_get_resources(mock_select_rows):
     # Create an instance of DBAPIConnector
     dbapi_connector = DBAPIConnector()
     dbapi_connector.acquire_data(platform="trino")
@@ -95,8 +105,8 @@ def test_get_resources(mock_select_async):
     # Call the get_resources
     resources: list[ResourceDio] = dbapi_connector.get_resources()
 
-    # Assert that select_async was called with the expected query
-    mock_select_async.assert_called_once_with(
+    # Assert that select_rows was called with the expected query
+    mock_select_rows.assert_called_once_with(
         query=dbapi_connector.config.data_object_table_column_query
     )
 
@@ -119,8 +129,8 @@ def test_get_resources(mock_select_async):
     ]
 
 
-@mock.patch.object(TrinoClient, "select_async", side_effect=mock_select_async_generator)
-def test_get_resource_attributes(mock_select_async):
+@mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows_generator)
+def test_get_resource_attributes(mock_select_rows):
     # Create an instance of DBAPIConnector
     dbapi_connector = DBAPIConnector()
     dbapi_connector.acquire_data(platform="trino")
@@ -130,8 +140,8 @@ def test_get_resource_attributes(mock_select_async):
         dbapi_connector.get_resource_attributes()
     )
 
-    # Assert that select_async was called with the expected query
-    mock_select_async.assert_called_once_with(
+    # Assert that select_rows was called with the expected query
+    mock_select_rows.assert_called_once_with(
         query=dbapi_connector.config.data_object_table_column_query
     )
 
@@ -200,3 +210,281 @@ def test_get_resource_attributes(mock_select_async):
     ]
 
     assert resource_attributes == expected_attributes
+
+
+@mock.patch.object(
+    TrinoClient,
+    "select_rows",
+    side_effect=lambda *args, **kwargs: iter(
+        [
+            to_row_batch(
+                mock_resources[:2]
+                + [
+                    {
+                        "fq_name": "catalog1.schema1.untagged",
+                        "attribute_key": None,
+                        "attribute_value": None,
+                        "object_type": "table",
+                        "platform": "trino",
+                    }
+                ]
+            )
+        ]
+    ),
+)
+def test_get_resource_attributes_without_attributes(mock_select_rows):
+    dbapi_connector = DBAPIConnector()
+    dbapi_connector.acquire_data(platform="trino")
+
+    # a resource without attributes comes back from the left join with a null key
+    assert [
+        (a.fq_name, a.attribute_key)
+        for b in dbapi_connector.get_batches(
+            object_types=[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+        )
+        for a in b[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+    ] == [
+        ("catalog1.schema1.table1", "it"),
+        ("catalog1.schema1.table2", "department"),
+    ]
+
+
+def mock_select_rows_batches_generator(*args, **kwargs):
+    yield to_row_batch(mock_resources[:4])
+    yield to_row_batch(mock_resources[4:])
+
+
+@mock.patch.object(
+    TrinoClient, "select_rows", side_effect=mock_select_rows_batches_generator
+)
+def test_get_resource_batches(mock_select_rows):
+    dbapi_connector = DBAPIConnector()
+    dbapi_connector.acquire_data(platform="trino")
+
+    batches: list[list[ResourceDio]] = list(dbapi_connector.get_resource_batches())
+
+    # each batch from the client is passed straight through
+    assert [len(batch) for batch in batches] == [4, 6]
+    assert [r.fq_name for batch in batches for r in batch] == [
+        r["fq_name"] for r in mock_resources
+    ]
+
+
+def mock_select_rows_joined_generator(*args, **kwargs):
+    # a resource is returned once per attribute, or once without any
+    yield to_row_batch(
+        mock_resources[:2]
+        + [
+            {
+                "fq_name": "catalog1.schema1.table2",
+                "attribute_key": "pii",
+                "attribute_value": "true",
+                "object_type": "table",
+            }
+        ]
+    )
+    yield to_row_batch(
+        [
+            {
+                "fq_name": "catalog1.schema1.table3",
+                "attribute_key": None,
+                "attribute_value": None,
+                "object_type": "table",
+            }
+        ]
+    )
+
+
+@mock.patch.object(
+    TrinoClient, "select_rows", side_effect=mock_select_rows_joined_generator
+)
+def test_get_batches_resources_and_attributes(mock_select_rows):
+    dbapi_connector = DBAPIConnector()
+    dbapi_connector.acquire_data(platform="trino")
+
+    batches: list[dict] = list(
+        dbapi_connector.get_batches(
+            object_types=[ObjectTypeEnum.RESOURCE, ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+        )
+    )
+
+    # both object types are fed from a single run of the query
+    mock_select_rows.assert_called_once()
+    assert [r.fq_name for b in batches for r in b[ObjectTypeEnum.RESOURCE]] == [
+        "catalog1.schema1.table1",
+        "catalog1.schema1.table2",
+        "catalog1.schema1.table3",
+    ]
+    assert [
+        (a.fq_name, a.attribute_value)
+        for b in batches
+        for a in b[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+    ] == [
+        ("catalog1.schema1.table1", "commercial"),
+        ("catalog1.schema1.table2", "sales"),
+        ("catalog1.schema1.table2", "true"),
+    ]
+
+
+def test_get_resources_incremental():
+    query_results: dict[str, list[dict]] = {
+        "select fingerprints": [
+            {"schema_name": "datalake.sales", "fingerprint": "2:aaa"},
+            {"schema_name": "datalake.hr", "fingerprint": "1:ccc"},
+            {"schema_name": "datalake.marketing", "fingerprint": "1:ddd"},
+        ],
+        "datalake.hr": [
+            r for r in mock_resources if r["fq_name"].startswith("datalake.hr.")
+        ],
+        "datalake.marketing": [
+            r for r in mock_resources if r["fq_name"].startswith("datalake.marketing.")
+        ],
+    }
+
+    def mock_select_rows(query: str, *args, **kwargs):
+        yield to_row_batch(query_results[query])
+
+    with mock.patch.object(
+        TrinoClient, "select_rows", side_effect=mock_select_rows
+    ) as mock_select:
+        dbapi_connector = DBAPIConnector()
+        dbapi_connector.config.schema_fingerprint_query = "select fingerprints"
+        dbapi_connector.config.data_object_schema_query = "{catalog}.{schema}"
+
+        # hr changed, marketing is new, finance was removed, sales is unchanged
+        dbapi_connector.since_watermark = json.dumps(
+            {
+                "datalake.sales": "2:aaa",
+                "datalake.hr": "1:bbb",
+                "datalake.finance": "1:eee",
+            }
+        )
+        dbapi_connector.acquire_data(platform="trino")
+        resources: list[ResourceDio] = dbapi_connector.get_resources()
+
+    assert [r.fq_name for r in resources] == [
+        "datalake.hr.employees",
+        "datalake.marketing.campaigns",
+    ]
+    assert [c.kwargs["query"] for c in mock_select.call_args_list] == [
+        "select fingerprints",
+        "datalake.hr",
+        "datalake.marketing",
+    ]
+    assert dbapi_connector.delta_scopes == [
+        "datalake.hr.",
+        "datalake.marketing.",
+        "datalake.finance.",
+    ]
+    assert json.loads(dbapi_connector.high_watermark) == {
+        "datalake.sales": "2:aaa",
+        "datalake.hr": "1:ccc",
+        "datalake.marketing": "1:ddd",
+    }
+
+
+def test_get_batches_incremental_attributes():
+    query_results: dict[str, list[dict]] = {
+        "select fingerprints": [
+            {"schema_name": "datalake.sales", "fingerprint": "2:aaa"},
+            {"schema_name": "datalake.hr", "fingerprint": "1:ccc"},
+        ],
+        "select attribute fingerprints": [
+            {"schema_name": "datalake.sales", "fingerprint": "2:fff"},
+            {"schema_name": "datalake.hr", "fingerprint": "1:ggg"},
+        ],
+        "select all": mock_resources,
+        "datalake.sa''les": [
+            r for r in mock_resources if r["fq_name"].startswith("datalake.sales.")
+        ],
+    }
+
+    def mock_select_rows(query: str, *args, **kwargs):
+        yield to_row_batch(query_results[query])
+
+    object_types: list[ObjectTypeEnum] = [
+        ObjectTypeEnum.RESOURCE,
+        ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+    ]
+    with mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows):
+        dbapi_connector = DBAPIConnector()
+        dbapi_connector.config.data_object_table_column_query = "select all"
+        dbapi_connector.config.schema_fingerprint_query = "select fingerprints"
+        dbapi_connector.config.data_object_schema_query = "{catalog}.{schema}"
+
+        # without attribute fingerprints a tag change cannot be seen, so the run is full
+        dbapi_connector.since_watermark = json.dumps(
+            {"datalake.sales": "2:aaa", "datalake.hr": "1:ccc"}
+        )
+        dbapi_connector.acquire_data(platform="trino")
+        batches: list[dict] = list(dbapi_connector.get_batches(object_types))
+        assert dbapi_connector.since_watermark is None
+        assert dbapi_connector.delta_scopes is None
+        assert len([r for b in batches for r in b[ObjectTypeEnum.RESOURCE]]) == len(
+            mock_resources
+        )
+
+        # only the tags of sales changed, quotes in names are escaped
+        dbapi_connector.config.attribute_fingerprint_query = (
+            "select attribute fingerprints"
+        )
+        query_results["select fingerprints"][0]["schema_name"] = "datalake.sa'les"
+        query_results["select attribute fingerprints"][0][
+            "schema_name"
+        ] = "datalake.sa'les"
+        dbapi_connector.since_watermark = json.dumps(
+            {"datalake.sa'les": "2:aaa/2:eee", "datalake.hr": "1:ccc/1:ggg"}
+        )
+        dbapi_connector.acquire_data(platform="trino")
+        batches = list(dbapi_connector.get_batches(object_types))
+
+    assert dbapi_connector.delta_scopes == ["datalake.sa'les."]
+    assert [r.fq_name for b in batches for r in b[ObjectTypeEnum.RESOURCE]] == [
+        "datalake.sales.orders",
+        "datalake.sales.customers",
+    ]
+    assert json.loads(dbapi_connector.high_watermark) == {
+        "datalake.sa'les": "2:aaa/2:fff",
+        "datalake.hr": "1:ccc/1:ggg",
+    }
+
+
+def test_get_batches_parallel_catalogs():
+    catalogs: list[str] = ["catalog1", "catalog2", "datalake"]
+
+    def mock_select_rows(query: str, *args, **kwargs):
+        if query == "show catalogs":
+            yield to_row_batch([{"catalog_name": catalog} for catalog in catalogs])
+            return
+        catalog: str = query.removeprefix("select from ")
+        yield to_row_batch(
+            [r for r in mock_resources if r["fq_name"].startswith(f"{catalog}.")]
+        )
+
+    with mock.patch.object(
+        TrinoClient, "select_rows", side_effect=mock_select_rows
+    ) as mock_select:
+        dbapi_connector = DBAPIConnector()
+        dbapi_connector.config.catalog_query = "show catalogs"
+        dbapi_connector.config.data_object_catalog_query = "select from {catalog}"
+        dbapi_connector.config.max_parallel_queries = "2"
+        dbapi_connector.acquire_data(platform="trino")
+        batches: list[dict] = list(
+            dbapi_connector.get_batches(
+                object_types=[
+                    ObjectTypeEnum.RESOURCE,
+                    ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+                ]
+            )
+        )
+
+    # catalogs are listed, then extracted concurrently, in any order
+    assert mock_select.call_args_list[0].kwargs["query"] == "show catalogs"
+    assert sorted(c.kwargs["query"] for c in mock_select.call_args_list[1:]) == [
+        "select from catalog1",
+        "select from catalog2",
+        "select from datalake",
+    ]
+    assert sorted(r.fq_name for b in batches for r in b[ObjectTypeEnum.RESOURCE]) == (
+        sorted(r["fq_name"] for r in mock_resources)
+    )
@@ -0,0 +1,5 @@
+from .src.json_file_connector import JsonFileConnector
+from .src.json_file_connector_config_model import (
+    JsonFileConnectorConfigModel,
+    JsonFileResourcesConnectorConfigModel,
+)
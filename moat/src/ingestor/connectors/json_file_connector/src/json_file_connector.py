@@ -1,6 +1,272 @@
+import gzip
+import json
+from typing import IO, Iterable, Iterator
+
+from app_logger import Logger, get_logger
 from ingestor.connectors.connector_base import ConnectorBase
+from ingestor.models import (
+    BaseDio,
+    PrincipalAttributeDio,
+    PrincipalDio,
+    ResourceAttributeDio,
+    ResourceDio,
+)
+from models import ObjectTypeEnum
+
+from .json_file_connector_config_model import (
+    JsonFileConnectorConfigModel,
+    JsonFileResourcesConnectorConfigModel,
+)
+
+logger: Logger = get_logger("ingestor.connectors.json_file_connector")
+
+PRINCIPAL_OBJECT_TYPES: set[ObjectTypeEnum] = {
+    ObjectTypeEnum.PRINCIPAL,
+    ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+}
+RESOURCE_OBJECT_TYPES: set[ObjectTypeEnum] = {
+    ObjectTypeEnum.RESOURCE,
+    ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+}
 
 
 class JsonFileConnector(ConnectorBase):
-    def ingest(self):
-        pass
+    """
+    Loads principals and resources from JSON files, e.g exports from other catalogs
+    Each file is either a JSON array of records or NDJSON (one record per line), optionally gzipped.
+    Files are read incrementally, so memory is bounded by the batch size rather than the file size
+
+    Principal records:
+    {"fq_name": "...", "first_name": "...", "last_name": "...", "user_name": "...", "email": "...",
+     "attributes": {"ad_group": ["admins", "users"], "department": "Engineering"}}
+
+    Resource records:
+    {"fq_name": "datalake.hr.employees", "object_type": "table", "attributes": {"classification": "PII"}}
+    """
+
+    CONNECTOR_NAME: str = "json_file"
+    READ_SIZE: int = 1024 * 1024
+    # a JSON array element which is still incomplete at this size is treated as invalid
+    MAX_RECORD_SIZE: int = 64 * 1024 * 1024
+
+    DIO_OBJECT_TYPES: dict[type[BaseDio], ObjectTypeEnum] = {
+        PrincipalDio: ObjectTypeEnum.PRINCIPAL,
+        PrincipalAttributeDio: ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+        ResourceDio: ObjectTypeEnum.RESOURCE,
+        ResourceAttributeDio: ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.principals_config: JsonFileConnectorConfigModel = (
+            JsonFileConnectorConfigModel.load()
+        )
+        self.resources_config: JsonFileResourcesConnectorConfigModel = (
+            JsonFileResourcesConnectorConfigModel.load()
+        )
+        logger.info("Created JSON file connector")
+
+    def get_batches(
+        self, object_types: list[ObjectTypeEnum]
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        """
+        Records and their attributes are read from the same batch of records,
+        so each file is read once however many object types are requested from it
+        """
+        unsupported: set[ObjectTypeEnum] = set(object_types).difference(
+            PRINCIPAL_OBJECT_TYPES | RESOURCE_OBJECT_TYPES
+        )
+        if unsupported:
+            raise ValueError(
+                f"Object types {unsupported} are not supported by the JSON file connector"
+            )
+
+        for file_object_types, file_path, get_dios in [
+            (
+                PRINCIPAL_OBJECT_TYPES.intersection(object_types),
+                self.principals_config.file_path,
+                self._get_principal_dios,
+            ),
+            (
+                RESOURCE_OBJECT_TYPES.intersection(object_types),
+                self.resources_config.file_path,
+                self._get_resource_dios,
+            ),
+        ]:
+            if not file_object_types:
+                continue
+
+            record_count: int = 0
+            for records in ConnectorBase.batched(
+                self._read_records(file_path=file_path), self.BATCH_SIZE
+            ):
+                record_count += len(records)
+                batches: dict[ObjectTypeEnum, list[BaseDio]] = {
+                    object_type: [] for object_type in file_object_types
+                }
+                for record in records:
+                    for dio in get_dios(record=record):
+                        object_type: ObjectTypeEnum = self.DIO_OBJECT_TYPES[type(dio)]
+                        if object_type in batches:
+                            batches[object_type].append(dio)
+                yield batches
+            logger.info(f"Read {record_count} records from {file_path}")
+
+    def get_principal_batches(self) -> Iterator[list[PrincipalDio]]:
+        for batches in self.get_batches(object_types=[ObjectTypeEnum.PRINCIPAL]):
+            yield batches[ObjectTypeEnum.PRINCIPAL]
+
+    def get_principal_attribute_batches(self) -> Iterator[list[PrincipalAttributeDio]]:
+        for batches in self.get_batches(
+            object_types=[ObjectTypeEnum.PRINCIPAL_ATTRIBUTE]
+        ):
+            yield batches[ObjectTypeEnum.PRINCIPAL_ATTRIBUTE]
+
+    def get_resource_batches(self) -> Iterator[list[ResourceDio]]:
+        for batches in self.get_batches(object_types=[ObjectTypeEnum.RESOURCE]):
+            yield batches[ObjectTypeEnum.RESOURCE]
+
+    def get_resource_attribute_batches(self) -> Iterator[list[ResourceAttributeDio]]:
+        for batches in self.get_batches(
+            object_types=[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+        ):
+            yield batches[ObjectTypeEnum.RESOURCE_ATTRIBUTE]
+
+    def get_principals(self) -> list[PrincipalDio]:
+        return [dio for batch in self.get_principal_batches() for dio in batch]
+
+    def get_principal_attributes(self) -> list[PrincipalAttributeDio]:
+        return [
+            dio for batch in self.get_principal_attribute_batches() for dio in batch
+        ]
+
+    def get_resources(self) -> list[ResourceDio]:
+        return [dio for batch in self.get_resource_batches() for dio in batch]
+
+    def get_resource_attributes(self) -> list[ResourceAttributeDio]:
+        return [dio for batch in self.get_resource_attribute_batches() for dio in batch]
+
+    def _get_principal_dios(self, record: dict) -> Iterator[BaseDio]:
+        if not isinstance(record, dict) or not record.get("fq_name"):
+            self._log_error(f"Error ingesting principal record: {record}")
+            return
+        yield PrincipalDio(
+            fq_name=record["fq_name"],
+            first_name=record.get("first_name"),
+            last_name=record.get("last_name"),
+            user_name=record.get("user_name"),
+            email=record.get("email"),
+            platform=self.platform,
+        )
+        for attribute_key, attribute_value in self._get_attributes(record=record):
+            yield PrincipalAttributeDio(
+                fq_name=record["fq_name"],
+                attribute_key=attribute_key,
+                attribute_value=attribute_value,
+                platform=self.platform,
+            )
+
+    def _get_resource_dios(self, record: dict) -> Iterator[BaseDio]:
+        if not isinstance(record, dict) or not record.get("fq_name"):
+            self._log_error(f"Error ingesting resource record: {record}")
+            return
+        yield ResourceDio(
+            fq_name=record["fq_name"],
+            object_type=record.get("object_type"),
+            platform=self.platform,
+        )
+        for attribute_key, attribute_value in self._get_attributes(record=record):
+            yield ResourceAttributeDio(
+                fq_name=record["fq_name"],
+                attribute_key=attribute_key,
+                attribute_value=attribute_value,
+                platform=self.platform,
+            )
+
+    @staticmethod
+    def _get_attributes(record: dict) -> Iterator[tuple[str, str]]:
+        # a list value is multi-valued, e.g one ad_group attribute per group
+        for attribute_key, attribute_values in (record.get("attributes") or {}).items():
+            if not isinstance(attribute_values, list):
+                attribute_values = [attribute_values]
+            for attribute_value in attribute_values:
+                if attribute_value is not None:
+                    yield attribute_key, str(attribute_value)
+
+    @staticmethod
+    def _open(file_path: str) -> IO[str]:
+        if file_path.endswith(".gz"):
+            return gzip.open(file_path, mode="rt", encoding="utf-8")
+        return open(file_path, mode="r", encoding="utf-8")
+
+    def _read_records(self, file_path: str) -> Iterator:
+        """
+        Yields the records of a JSON array or NDJSON file, told apart by the first character
+        """
+        if not file_path:
+            raise ValueError("No file path is configured for the JSON file connector")
+
+        with self._open(file_path=file_path) as file:
+            head: str = file.read(self.READ_SIZE).lstrip()
+            if head.startswith("["):
+                yield from self._read_json_array(chunks=self._read_chunks(file, head))
+            else:
+                yield from self._read_ndjson(lines=self._read_lines(file, head))
+
+    def _read_chunks(self, file: IO[str], head: str) -> Iterator[str]:
+        yield head
+        while chunk := file.read(self.READ_SIZE):
+            yield chunk
+
+    @staticmethod
+    def _read_lines(file: IO[str], head: str) -> Iterator[str]:
+        # the head may end part way through a line
+        lines: list[str] = head.split("\n")
+        yield from lines[:-1]
+        yield lines[-1] + file.readline()
+        yield from file
+
+    @staticmethod
+    def _read_ndjson(lines: Iterable[str]) -> Iterator:
+        for line_number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+
+    def _read_json_array(self, chunks: Iterable[str]) -> Iterator:
+        """
+        Decodes the elements of a top level JSON array one at a time
+        The buffer holds about one element plus one chunk, so large files are never loaded whole
+        """
+        decoder: json.JSONDecoder = json.JSONDecoder()
+        iterator: Iterator[str] = iter(chunks)
+        buffer: str = next(iterator, "").lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("Expected a JSON array")
+        position: int = 1
+        end_of_file: bool = False
+
+        while True:
+            # skip to the next element, or the end of the array
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+
+            try:
+                if position == len(buffer):
+                    raise json.JSONDecodeError("Incomplete array", buffer, position)
+                element, position = decoder.raw_decode(buffer, position)
+                yield element
+            except json.JSONDecodeError:
+                # the element continues in the next chunk
+                if end_of_file or len(buffer) - position > self.MAX_RECORD_SIZE:
+                    raise ValueError(
+                        f"Invalid or truncated JSON array at character {position} of the buffer"
+                    )
+                chunk: str | None = next(iterator, None)
+                end_of_file = chunk is None
+                buffer = buffer[position:] + (chunk or "")
+                position = 0
@@ -0,0 +1,172 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from ingestor.connectors import ConnectorFactory
+from ingestor.models import (
+    PrincipalAttributeDio,
+    PrincipalDio,
+    ResourceAttributeDio,
+    ResourceDio,
+)
+from models import ObjectTypeEnum
+
+from ..src.json_file_connector import JsonFileConnector
+
+principal_records: list[dict] = [
+    {
+        "fq_name": "grace.hopper",
+        "first_name": "Grace",
+        "last_name": "Hopper",
+        "user_name": "grace",
+        "email": "grace@example.com",
+        "attributes": {"ad_group": ["admirals", "users"], "level": 7},
+    },
+    {
+        "fq_name": "ada.lovelace",
+        "first_name": 'Ada, "the" [first]',
+        "last_name": "Lovelace",
+        "user_name": "ada",
+        "email": None,
+    },
+]
+
+resource_records: list[dict] = [
+    {
+        "fq_name": "datalake.hr.employees",
+        "object_type": "table",
+        "attributes": {"classification": "PII"},
+    },
+    {"fq_name": "datalake.hr.employees.salary", "object_type": "column"},
+]
+
+
+def get_connector(
+    principals_path: Path = None, resources_path: Path = None
+) -> JsonFileConnector:
+    connector: JsonFileConnector = JsonFileConnector()
+    connector.principals_config.file_path = str(principals_path)
+    connector.resources_config.file_path = str(resources_path)
+    # small reads, so records span several chunks
+    connector.READ_SIZE = 16
+    connector.acquire_data(platform="catalog")
+    return connector
+
+
+def test_create_by_name():
+    assert (
+        type(ConnectorFactory.create_by_name(connector_name="json_file")).__name__
+        == "JsonFileConnector"
+    )
+
+
+def test_json_array(tmp_path: Path):
+    principals_path: Path = tmp_path / "principals.json"
+    principals_path.write_text(json.dumps(principal_records, indent=2))
+    connector: JsonFileConnector = get_connector(principals_path=principals_path)
+
+    assert connector.get_principals() == [
+        PrincipalDio(
+            fq_name="grace.hopper",
+            first_name="Grace",
+            last_name="Hopper",
+            user_name="grace",
+            email="grace@example.com",
+            platform="catalog",
+        ),
+        PrincipalDio(
+            fq_name="ada.lovelace",
+            first_name='Ada, "the" [first]',
+            last_name="Lovelace",
+            user_name="ada",
+            email=None,
+            platform="catalog",
+        ),
+    ]
+    assert connector.get_principal_attributes() == [
+        PrincipalAttributeDio(
+            fq_name="grace.hopper",
+            attribute_key="ad_group",
+            attribute_value="admirals",
+            platform="catalog",
+        ),
+        PrincipalAttributeDio(
+            fq_name="grace.hopper",
+            attribute_key="ad_group",
+            attribute_value="users",
+            platform="catalog",
+        ),
+        PrincipalAttributeDio(
+            fq_name="grace.hopper",
+            attribute_key="level",
+            attribute_value="7",
+            platform="catalog",
+        ),
+    ]
+
+
+def test_ndjson_gzip(tmp_path: Path):
+    resources_path: Path = tmp_path / "resources.ndjson.gz"
+    with gzip.open(resources_path, "wt") as f:
+        for record in resource_records:
+            f.write(json.dumps(record) + "\n\n")
+    connector: JsonFileConnector = get_connector(resources_path=resources_path)
+
+    assert connector.get_resources() == [
+        ResourceDio(
+            fq_name="datalake.hr.employees", object_type="table", platform="catalog"
+        ),
+        ResourceDio(
+            fq_name="datalake.hr.employees.salary",
+            object_type="column",
+            platform="catalog",
+        ),
+    ]
+    assert connector.get_resource_attributes() == [
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            attribute_key="classification",
+            attribute_value="PII",
+            platform="catalog",
+        )
+    ]
+
+
+def test_get_batches_single_pass(tmp_path: Path):
+    principals_path: Path = tmp_path / "principals.json"
+    principals_path.write_text(json.dumps(principal_records + [{"first_name": "x"}]))
+    connector: JsonFileConnector = get_connector(principals_path=principals_path)
+    connector.BATCH_SIZE = 2
+
+    batches: list[dict] = list(
+        connector.get_batches(
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE]
+        )
+    )
+
+    # both object types come from each batch of records
+    assert [
+        {object_type: len(dios) for object_type, dios in batch.items()}
+        for batch in batches
+    ] == [
+        {ObjectTypeEnum.PRINCIPAL: 2, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE: 3},
+        {ObjectTypeEnum.PRINCIPAL: 0, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE: 0},
+    ]
+    # the record without an fq_name is skipped
+    assert len(connector.errors) == 1
+
+
+def test_invalid_files(tmp_path: Path):
+    truncated_path: Path = tmp_path / "truncated.json"
+    truncated_path.write_text(json.dumps(principal_records)[:-10])
+    with pytest.raises(ValueError, match="Invalid or truncated JSON array"):
+        get_connector(principals_path=truncated_path).get_principals()
+
+    invalid_path: Path = tmp_path / "invalid.ndjson"
+    invalid_path.write_text('{"fq_name": "a"}\n{"fq_name": \n')
+    with pytest.raises(ValueError, match="Invalid JSON on line 2"):
+        get_connector(principals_path=invalid_path).get_principals()
+
+    with pytest.raises(ValueError, match="not supported"):
+        list(get_connector().get_batches(object_types=[ObjectTypeEnum.PRINCIPAL_GROUP]))
@@ -1,9 +1,13 @@
 import re
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
 
 from app_logger import Logger, get_logger
 from clients import LdapClient
+from ldap3.utils.conv import escape_filter_chars
 from ingestor.connectors.connector_base import ConnectorBase
-from ingestor.models import PrincipalAttributeDio, PrincipalDio
+from ingestor.models import BaseDio, PrincipalAttributeDio, PrincipalDio
+from models import ObjectTypeEnum
 
 from .ldap_connector_config import LdapConnectorConfig
 
@@ -16,26 +20,109 @@ class LdapConnector(ConnectorBase):
 
     def __init__(self):
         super().__init__()
-        self.ldap_users: list[dict] = []
+        self.ldap_client: LdapClient | None = None
         self.config: LdapConnectorConfig = LdapConnectorConfig.load()
         logger.info("Created LDAP connector")
 
     def acquire_data(self, platform: str) -> None:
+        """
+        Connects to the directory. Users are searched page by page when the principals
+        or attributes are requested, so the directory is never held in memory
+        """
         self.platform = platform
 
-        ldap_client: LdapClient = LdapClient()
-        ldap_client.connect()
-        self.ldap_users: list[dict] = ldap_client.list_users(
+        self.ldap_client = LdapClient()
+        self.ldap_client.connect()
+
+    def _list_ldap_users(self) -> Iterator[dict]:
+        """
+        Lists the users matching the search filter, or only those changed since the
+        since_watermark for delta ingestion, and tracks the latest change as the high_watermark
+        The delta attribute is modifyTimestamp by default, or e.g uSNChanged for AD
+        """
+        user_search_filter: str = self.config.user_search_filter
+        if self.since_watermark:
+            since_watermark: str = escape_filter_chars(self.since_watermark)
+            user_search_filter = f"(&{user_search_filter}({self.config.delta_attribute}>={since_watermark}))"
+
+        user_count: int = 0
+        for ldap_user in self.ldap_client.list_users_paged(
             user_search_base=self.config.user_search_base,
-            user_search_filter=self.config.user_search_filter,
-            attributes=self.config.attributes,
+            user_search_filter=user_search_filter,
+            attributes=self.config.attributes + [self.config.delta_attribute],
+        ):
+            user_count += 1
+            changed: list = ldap_user.get(self.config.delta_attribute) or []
+            if changed:
+                self.high_watermark = LdapConnector._get_max_watermark(
+                    self.high_watermark, LdapConnector._format_watermark(changed[0])
+                )
+            yield ldap_user
+
+        logger.info(f"Retrieved {user_count} LDAP users from ldap client")
+
+    @staticmethod
+    def _format_watermark(value) -> str:
+        # modifyTimestamp is parsed into a datetime, filters need generalized time
+        if isinstance(value, datetime):
+            # a naive datetime is already UTC, astimezone would treat it as local time
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value.astimezone(timezone.utc).strftime("%Y%m%d%H%M%SZ")
+        return str(value)
+
+    @staticmethod
+    def _get_max_watermark(current: str | None, value: str) -> str:
+        if current is None:
+            return value
+        # uSNChanged is numeric, generalized time in UTC compares as a string
+        if current.isdigit() and value.isdigit():
+            return max(current, value, key=int)
+        return max(current, value)
+
+    def get_batches(
+        self, object_types: list[ObjectTypeEnum]
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        """
+        Principals and their attributes are read from the same batch of users,
+        so the directory is searched once however many of them are requested
+        """
+        user_object_types: set[ObjectTypeEnum] = {
+            ObjectTypeEnum.PRINCIPAL,
+            ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+        }.intersection(object_types)
+        yield from super().get_batches(
+            object_types=[o for o in object_types if o not in user_object_types]
         )
-        logger.info(f"Retrieved {len(self.ldap_users)} LDAP users from ldap client")
+        if not user_object_types:
+            return
+
+        for ldap_users in ConnectorBase.batched(
+            self._list_ldap_users(), self.BATCH_SIZE
+        ):
+            batches: dict[ObjectTypeEnum, list[BaseDio]] = {}
+            if ObjectTypeEnum.PRINCIPAL in user_object_types:
+                batches[ObjectTypeEnum.PRINCIPAL] = list(
+                    self._get_principals(ldap_users=ldap_users)
+                )
+            if ObjectTypeEnum.PRINCIPAL_ATTRIBUTE in user_object_types:
+                batches[ObjectTypeEnum.PRINCIPAL_ATTRIBUTE] = list(
+                    self._get_principal_attributes(ldap_users=ldap_users)
+                )
+            yield batches
 
     def get_principals(self) -> list[PrincipalDio]:
-        principals: list[PrincipalDio] = []
+        return [
+            principal for batch in self.get_principal_batches() for principal in batch
+        ]
 
-        for ldap_user in self.ldap_users:
+    def get_principal_batches(self) -> Iterator[list[PrincipalDio]]:
+        return ConnectorBase.batched(
+            self._get_principals(ldap_users=self._list_ldap_users()), self.BATCH_SIZE
+        )
+
+    def _get_principals(self, ldap_users: Iterable[dict]) -> Iterator[PrincipalDio]:
+        for ldap_user in ldap_users:
             try:
                 principal: PrincipalDio = PrincipalDio(
                     fq_name=ldap_user.get(self.config.attr_user_id)[
@@ -47,15 +134,29 @@ class LdapConnector(ConnectorBase):
                     email=ldap_user.get(self.config.attr_email)[0],
                     platform=self.platform,
                 )
-                principals.append(principal)
+                yield principal
             except (KeyError, IndexError):
                 self._log_error(f"Error ingesting LDAP user: {ldap_user}")
-        return principals
 
     def get_principal_attributes(self) -> list[PrincipalAttributeDio]:
-        attributes: list[PrincipalAttributeDio] = []
+        return [
+            attribute
+            for batch in self.get_principal_attribute_batches()
+            for attribute in batch
+        ]
+
+    def get_principal_attribute_batches(
+        self,
+    ) -> Iterator[list[PrincipalAttributeDio]]:
+        return ConnectorBase.batched(
+            self._get_principal_attributes(ldap_users=self._list_ldap_users()),
+            self.BATCH_SIZE,
+        )
 
-        for ldap_user in self.ldap_users:
+    def _get_principal_attributes(
+        self, ldap_users: Iterable[dict]
+    ) -> Iterator[PrincipalAttributeDio]:
+        for ldap_user in ldap_users:
             try:
                 fq_name: str = ldap_user.get(self.config.attr_user_id)[0]
                 group_dns: list[str] = ldap_user.get(self.config.attr_groups)
@@ -71,7 +172,6 @@ class LdapConnector(ConnectorBase):
                         attribute_value=group_cn,
                         platform=self.platform,
                     )
-                    attributes.append(attribute)
+                    yield attribute
             except Exception as e:
                 self._log_error(f"Error ingesting LDAP user: {ldap_user}, {str(e)}")
-        return attributes
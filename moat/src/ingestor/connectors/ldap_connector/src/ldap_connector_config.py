@@ -24,3 +24,4 @@ class LdapConnectorConfig(AppConfigModelBase):
     attr_email: str = None
     attr_groups: str = None
     group_name_regex: str = r"(.*)"
+    delta_attribute: str = "modifyTimestamp"
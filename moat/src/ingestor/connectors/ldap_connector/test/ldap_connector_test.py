@@ -1,30 +1,45 @@
 import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
 from unittest import mock
 
 from clients import LdapClient
 
 from ..src.ldap_connector import LdapConnector
 from ingestor.models import PrincipalDio, PrincipalAttributeDio
+from models import ObjectTypeEnum
 
 with open("moat/src/ingestor/connectors/ldap_connector/test/ldap_users.json") as f:
     ldap_users: list[dict] = json.load(f)
 
 
 @mock.patch.object(LdapClient, "connect")
-@mock.patch.object(LdapClient, "list_users", return_value=ldap_users)
-def test_acquire_data(mock_list_users: mock.MagicMock, mock_connect: mock.MagicMock):
+@mock.patch.object(
+    LdapClient, "list_users_paged", side_effect=lambda **kwargs: iter(ldap_users)
+)
+def test_acquire_data(
+    mock_list_users_paged: mock.MagicMock, mock_connect: mock.MagicMock
+):
     ldap_connector: LdapConnector = LdapConnector()
     ldap_connector.acquire_data(platform="ad")
-
-    mock_list_users.assert_called_with(
-        user_search_base="ou=people,dc=example,dc=com",
-        user_search_filter="(&(uid=*)(memberof=cn=moat_users_gl,ou=groups,dc=example,dc=com))",
-        attributes=["uid", "uid", "givenname", "sn", "mail", "memberOf"],
-    )
     mock_connect.assert_called_once()
 
     # principals
     principals: list[PrincipalDio] = ldap_connector.get_principals()
+    mock_list_users_paged.assert_called_with(
+        user_search_base="ou=people,dc=example,dc=com",
+        user_search_filter="(&(uid=*)(memberof=cn=moat_users_gl,ou=groups,dc=example,dc=com))",
+        attributes=[
+            "uid",
+            "uid",
+            "givenname",
+            "sn",
+            "mail",
+            "memberOf",
+            "modifyTimestamp",
+        ],
+    )
     assert len(principals) == 198  # admin is ignored
     assert principals[0].fq_name == "abigail.hamilton"
     assert principals[0].first_name == "Abigail"
@@ -53,3 +68,103 @@ def test_acquire_data(mock_list_users: mock.MagicMock, mock_connect: mock.MagicM
     assert principal_attributes[3].attribute_value == "MARKETING_SUPERVISORS_GL"
 
     assert principal_attributes[5].fq_name == "ahmet.akyüz"
+
+
+@mock.patch.object(LdapClient, "connect")
+@mock.patch.object(
+    LdapClient, "list_users_paged", side_effect=lambda **kwargs: iter(ldap_users)
+)
+def test_get_principal_batches(
+    mock_list_users_paged: mock.MagicMock, mock_connect: mock.MagicMock
+):
+    ldap_connector: LdapConnector = LdapConnector()
+    ldap_connector.BATCH_SIZE = 50
+    ldap_connector.acquire_data(platform="ad")
+
+    batches: list[list[PrincipalDio]] = list(ldap_connector.get_principal_batches())
+    assert [len(batch) for batch in batches] == [50, 50, 50, 48]
+
+
+@mock.patch.object(LdapClient, "connect")
+@mock.patch.object(
+    LdapClient, "list_users_paged", side_effect=lambda **kwargs: iter(ldap_users)
+)
+def test_get_batches_principals_and_attributes(
+    mock_list_users_paged: mock.MagicMock, mock_connect: mock.MagicMock
+):
+    ldap_connector: LdapConnector = LdapConnector()
+    ldap_connector.BATCH_SIZE = 50
+    ldap_connector.acquire_data(platform="ad")
+
+    batches: list[dict] = list(
+        ldap_connector.get_batches(
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE]
+        )
+    )
+
+    # principals and attributes come from the same search
+    mock_list_users_paged.assert_called_once()
+    assert sum(len(b[ObjectTypeEnum.PRINCIPAL]) for b in batches) == 198
+    assert sum(len(b[ObjectTypeEnum.PRINCIPAL_ATTRIBUTE]) for b in batches) == 200
+
+
+@mock.patch.object(LdapClient, "connect")
+@mock.patch.object(LdapClient, "list_users_paged")
+def test_get_principals_delta(
+    mock_list_users_paged: mock.MagicMock, mock_connect: mock.MagicMock
+):
+    mock_list_users_paged.side_effect = lambda **kwargs: iter(
+        [
+            ldap_users[0] | {"modifyTimestamp": [datetime(2025, 3, 1, 12, 0, 5)]},
+            ldap_users[1] | {"modifyTimestamp": [datetime(2025, 3, 2, 8, 30, 0)]},
+        ]
+    )
+
+    ldap_connector: LdapConnector = LdapConnector()
+    ldap_connector.since_watermark = "20250301000000Z"
+    ldap_connector.acquire_data(platform="ad")
+
+    principals: list[PrincipalDio] = ldap_connector.get_principals()
+    assert len(principals) == 2
+
+    # only users changed since the watermark are requested
+    mock_list_users_paged.assert_called_with(
+        user_search_base="ou=people,dc=example,dc=com",
+        user_search_filter="(&(&(uid=*)(memberof=cn=moat_users_gl,ou=groups,dc=example,dc=com))(modifyTimestamp>=20250301000000Z))",
+        attributes=[
+            "uid",
+            "uid",
+            "givenname",
+            "sn",
+            "mail",
+            "memberOf",
+            "modifyTimestamp",
+        ],
+    )
+    assert ldap_connector.high_watermark == "20250302083000Z"
+
+
+def test_format_watermark():
+    # ldap3 returns naive datetimes in UTC, the local time zone must not shift them
+    try:
+        with mock.patch.dict(os.environ, {"TZ": "America/New_York"}):
+            time.tzset()
+            naive: str = LdapConnector._format_watermark(datetime(2025, 3, 1, 12, 0, 5))
+            aware: str = LdapConnector._format_watermark(
+                datetime(2025, 3, 1, 14, 0, 5, tzinfo=timezone(timedelta(hours=2)))
+            )
+    finally:
+        time.tzset()
+
+    assert naive == "20250301120005Z"
+    assert aware == "20250301120005Z"
+    assert LdapConnector._format_watermark("12345") == "12345"
+
+
+def test_get_max_watermark():
+    assert LdapConnector._get_max_watermark(None, "5") == "5"
+    assert LdapConnector._get_max_watermark("10", "9") == "10"
+    assert (
+        LdapConnector._get_max_watermark("20250101000000Z", "20250301000000Z")
+        == "20250301000000Z"
+    )
@@ -1,8 +1,11 @@
 from abc import abstractmethod
+from itertools import repeat
+from operator import attrgetter
+from typing import Iterable, Iterator
 
 from app_logger import Logger, get_logger
-from ingestor.connectors import ConnectorBase
-from ingestor.models import BaseDio
+from ingestor.models import BaseDio, DioBatch
+from repositories import KeyRange, MergeResult
 
 logger: Logger = get_logger("ingestor.controller.base")
 
@@ -12,16 +15,79 @@ class BaseIngestionController:
     def __init__(self):
         logger.info(f"Created controller of type {type(self)}")
 
+    @staticmethod
+    def get_staging_rows(
+        ingestion_process_id: int,
+        dio_batches: Iterable[list[BaseDio] | DioBatch],
+        fields: list[str],
+    ) -> Iterator[tuple]:
+        """
+        The ingestion process ID followed by the values of the fields, for each DIO in the batches
+        DioBatches are zipped column by column, without building a DIO per row
+        """
+        for dios in dio_batches:
+            if isinstance(dios, DioBatch):
+                yield from zip(
+                    repeat(ingestion_process_id), *(dios.column(f) for f in fields)
+                )
+            else:
+                get_values: attrgetter = attrgetter(*fields)
+                for dio in dios:
+                    yield ingestion_process_id, *get_values(dio)
+
+    @abstractmethod
+    def stage(
+        self,
+        session,
+        ingestion_process_id: int,
+        dio_batches: Iterable[list[BaseDio] | DioBatch],
+    ) -> int:
+        """
+        Bulk loads the DIOs into the staging tables under the ingestion process ID,
+        and returns the number of rows staged
+        """
+        pass
+
     @abstractmethod
-    def retrieve(self, connector: ConnectorBase) -> list[BaseDio]:
+    def get_merge_key_ranges(
+        self, session, ingestion_process_id: int, chunk_size: int
+    ) -> list[KeyRange]:
+        """
+        Splits the staged rows into key ranges of about chunk_size keys, to be marked one range at a time
+        """
         pass
 
     @abstractmethod
-    def stage(self, session, dios: list[BaseDio]) -> None:
+    def mark_changed(
+        self, session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        """
+        Marks the staged rows, or only those within key_range, which the merge would insert or update,
+        and returns the unchanged count
+        """
         pass
 
     @abstractmethod
     def merge(
-        self, session, ingestion_process_id: int, deactivate_omitted: bool = False
-    ) -> None:
+        self, session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        """
+        Merges staging into the main tables, or only the staged rows marked as changed,
+        and returns the inserted, updated and unchanged counts
+        """
+        pass
+
+    @abstractmethod
+    def deactivate(
+        self,
+        session,
+        ingestion_process_id: int,
+        deactivate_scopes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
+        """
+        Deactivates records missing from staging, limited to fq_names under deactivate_scopes
+        if given, and to records of the source and platform, and returns the number of records deactivated
+        """
         pass
@@ -1,4 +1,8 @@
-from dataclasses import dataclass
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Iterator
 
 from app_logger import Logger, get_logger
 from database import Database
@@ -10,11 +14,15 @@ from models import (
     ObjectTypeEnum,
 )
 from repositories import (
+    BundleRevisionRepository,
     IngestionProcessRepository,
+    KeyRange,
+    MergeResult,
     PrincipalRepository,
     ResourceRepository,
 )
 from .base_ingestion_controller import BaseIngestionController
+from .ingestion_controller_config import IngestionControllerConfig
 
 from .principal_ingestion_controller import PrincipalIngestionController
 from .principal_attribute_ingestion_controller import (
@@ -28,12 +36,64 @@ from .resource_attribute_ingestion_controller import (
 logger: Logger = get_logger("ingestor.controller")
 
 
+@dataclass
+class PhaseStats:
+    seconds: float = 0
+    row_count: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.row_count / self.seconds if self.seconds else 0
+
+
 @dataclass
 class IngestionStats:
-    principal_count: int = 0
-    principal_attribute_count: int = 0
-    resource_count: int = 0
-    resource_attribute_count: int = 0
+    """
+    Timings and row counts of an ingestion run, stored as the ingestion process's metrics
+    Phases are summed over the object types of the run:
+    * acquire: loading the source into the connector
+    * retrieve: pulling batches from the connector
+    * stage: writing batches to the staging tables
+    * merge: merging staging into the main tables
+    * deactivate: deactivating records omitted from the run
+    """
+
+    phases: dict[str, PhaseStats] = field(default_factory=dict)
+    staged_counts: dict[ObjectTypeEnum, int] = field(default_factory=dict)
+    merge_results: dict[ObjectTypeEnum, MergeResult] = field(default_factory=dict)
+
+    def add_phase(self, phase: str, start_time: float, row_count: int = 0) -> None:
+        phase_stats: PhaseStats = self.phases.setdefault(phase, PhaseStats())
+        phase_stats.seconds += time.perf_counter() - start_time
+        phase_stats.row_count += row_count
+
+    @staticmethod
+    def get_peak_rss_mb() -> float:
+        # ru_maxrss is in kilobytes on linux and in bytes on macOS
+        peak_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak_rss //= 1024
+        return round(peak_rss / 1024, 1)
+
+    def to_metrics(self) -> dict:
+        return {
+            "phases": {
+                phase: {
+                    "seconds": round(phase_stats.seconds, 3),
+                    "row_count": phase_stats.row_count,
+                    "rows_per_second": round(phase_stats.rows_per_second),
+                }
+                for phase, phase_stats in self.phases.items()
+            },
+            "object_types": {
+                object_type.value: {
+                    "staged": staged_count,
+                    **asdict(self.merge_results.get(object_type, MergeResult())),
+                }
+                for object_type, staged_count in self.staged_counts.items()
+            },
+            "peak_rss_mb": self.get_peak_rss_mb(),
+        }
 
 
 class IngestionController:
@@ -57,9 +117,13 @@ class IngestionController:
       * attribute groups from a JSON/YAML file
       * data objects (tables & columns) with attributes from trino
 
-    * this controller should also provide a mutex via the ingestion process table to lock the staging tables
+    * staging rows are scoped by ingestion process ID, and merges take an advisory lock per target table,
+      so ingestion jobs for different sources or platforms can run concurrently
     """
 
+    def __init__(self):
+        self.config: IngestionControllerConfig = IngestionControllerConfig.load()
+
     @staticmethod
     def _get_database() -> Database:
         database: Database = Database()
@@ -85,13 +149,25 @@ class IngestionController:
     def ingest(
         self,
         connector_name: str,
-        object_type: ObjectTypeEnum,
+        object_types: list[ObjectTypeEnum],
         platform: str,
         deactivate_omitted: bool = True,
+        delta: bool = False,
     ) -> None:
+        """
+        The source is acquired once, and every object type is staged from the same pass
+        over it and merged in a single ingestion process, e.g principals and their attributes
+        from one LDAP search. Parents are merged before their attributes
+
+        With delta, only records changed since the last completed ingestion are retrieved
+        from connectors which support it, and omitted records are only deactivated within
+        the connector's delta_scopes. The first delta run, or a run without a stored watermark, is a full ingestion
+        """
         logger.info("Starting ingestion process")
 
-        # TODO create mutex - in ingestion process table?
+        # parents before attributes, in the order the enum declares them
+        object_types = sorted(set(object_types), key=list(ObjectTypeEnum).index)
+
         database: Database = self._get_database()
 
         # create connector
@@ -99,68 +175,299 @@ class IngestionController:
             connector_name=connector_name
         )
 
-        # create controller
-        controller = self._get_controller(object_type=object_type)
+        # create controllers
+        controllers: dict[ObjectTypeEnum, BaseIngestionController] = {
+            object_type: self._get_controller(object_type=object_type)
+            for object_type in object_types
+        }
 
-        # load data into connector
-        connector.acquire_data(platform=platform)
+        if delta:
+            with database.Session.begin() as session:
+                connector.since_watermark = (
+                    IngestionProcessRepository.get_last_watermark(
+                        session=session,
+                        source=connector_name,
+                        platform=platform,
+                        object_types=object_types,
+                    )
+                )
+
+        stats: IngestionStats = IngestionStats(
+            staged_counts={object_type: 0 for object_type in object_types}
+        )
 
-        # create the process id & truncate staging
+        # create the process id, staged rows are tagged with it
         process_id: int = self._initialise_ingestion_process(
-            database=database, connector_name=connector_name, object_types=[object_type]
+            database=database,
+            connector_name=connector_name,
+            object_types=object_types,
+            platform=platform,
         )
 
-        # ingest into staging
-        with database.Session.begin() as session:
-            try:
-                logger.info(f"Starting retrieve")
-                dios: list[BaseDio] = controller.retrieve(
-                    connector=connector,
+        try:
+            # load data into connector
+            start_time: float = time.perf_counter()
+            connector.acquire_data(platform=platform)
+            stats.add_phase(phase="acquire", start_time=start_time)
+
+            if connector.since_watermark:
+                logger.info(
+                    f"Starting delta ingestion since watermark {connector.since_watermark}"
                 )
 
-                # stage
-                logger.info(f"Starting stage")
-                controller.stage(session, dios)
+            self._stage(
+                database=database,
+                connector=connector,
+                controllers=controllers,
+                ingestion_process_id=process_id,
+                stats=stats,
+            )
+            self._merge(
+                database=database,
+                connector=connector,
+                controllers=controllers,
+                ingestion_process_id=process_id,
+                deactivate_omitted=deactivate_omitted,
+                stats=stats,
+                source=connector_name,
+                platform=platform,
+            )
+        except Exception as e:
+            logger.error(f"Ingestion failed with error: {str(e)}")
+            # the failed transaction was rolled back, so the failure is recorded in a new one
+            with database.Session.begin() as session:
+                PrincipalRepository.delete_staging_tables(
+                    session=session, ingestion_process_id=process_id
+                )
+                ResourceRepository.delete_staging_tables(
+                    session=session, ingestion_process_id=process_id
+                )
+                IngestionProcessRepository.fail_process(
+                    session=session,
+                    ingestion_process_id=process_id,
+                    log=str(e),
+                    metrics=stats.to_metrics(),
+                )
                 session.commit()
-                logger.info(f"Commited data into staging table")
-            except Exception as e:
-                logger.error(f"Ingestion failed with error: {str(e)}")
-                raise
-                # TODO return error code
+            raise
+
+    def _stage(
+        self,
+        database: Database,
+        connector: ConnectorBase,
+        controllers: dict[ObjectTypeEnum, BaseIngestionController],
+        ingestion_process_id: int,
+        stats: IngestionStats,
+    ) -> None:
+        with database.Session.begin() as session:
+            # batches are pulled from the connector while they are staged,
+            # the time spent waiting for the next batch is the retrieve phase
+            logger.info(f"Starting retrieve and stage")
+            dio_batches: dict[ObjectTypeEnum, list[BaseDio]]
+            for dio_batches in self._time_retrieve(
+                batches=connector.get_batches(object_types=list(controllers)),
+                stats=stats,
+            ):
+                start_time: float = time.perf_counter()
+                row_count: int = 0
+                for object_type, dio_batch in dio_batches.items():
+                    staged_count: int = controllers[object_type].stage(
+                        session, ingestion_process_id, [dio_batch]
+                    )
+                    stats.staged_counts[object_type] += staged_count
+                    row_count += staged_count
+                stats.add_phase(
+                    phase="stage", start_time=start_time, row_count=row_count
+                )
+            session.commit()
+            self._log_phase(phase="retrieve", phase_stats=stats.phases.get("retrieve"))
+            self._log_phase(phase="stage", phase_stats=stats.phases.get("stage"))
+            logger.info(f"Commited data into staging table")
+
+    def _merge(
+        self,
+        database: Database,
+        connector: ConnectorBase,
+        controllers: dict[ObjectTypeEnum, BaseIngestionController],
+        ingestion_process_id: int,
+        deactivate_omitted: bool,
+        stats: IngestionStats,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> None:
+        # a delta only contains changed records, so only records within the
+        # scopes the connector fully re-pulled can be deactivated
+        deactivate_scopes: list[str] | None = None
+        if connector.since_watermark:
+            deactivate_scopes = connector.delta_scopes
+            deactivate_omitted = deactivate_omitted and bool(deactivate_scopes)
+
+        # with a merge chunk size, staging is compared with the main tables one key range
+        # at a time, in short transactions which leave the main tables as they are. The final
+        # transaction then only merges the changed rows, so readers and OPA bundles see the
+        # whole run or nothing, while it holds row locks on far fewer rows
+        merge_chunk_size: int = int(self.config.merge_chunk_size)
+        if merge_chunk_size:
+            for object_type, controller in controllers.items():
+                start_time: float = time.perf_counter()
+                stats.merge_results[object_type] = self._mark_changed_chunked(
+                    database=database,
+                    controller=controller,
+                    ingestion_process_id=ingestion_process_id,
+                    chunk_size=merge_chunk_size,
+                )
+                stats.add_phase(
+                    phase="merge",
+                    start_time=start_time,
+                    row_count=stats.staged_counts[object_type],
+                )
 
         # merge into main tables
         with database.Session.begin() as session:
-            try:
-                # merge
-                logger.info(f"Starting merge")
-                controller.merge(
+            for object_type, controller in controllers.items():
+                logger.info(f"Starting merge of {object_type.value}")
+                start_time = time.perf_counter()
+                merge_result: MergeResult = controller.merge(
                     session=session,
-                    ingestion_process_id=process_id,
-                    deactivate_omitted=deactivate_omitted,
+                    ingestion_process_id=ingestion_process_id,
+                    changed_only=bool(merge_chunk_size),
                 )
-
-            finally:
-                # close ingestion process
+                if merge_chunk_size:
+                    merge_result += stats.merge_results[object_type]
+                stats.merge_results[object_type] = merge_result
+                stats.add_phase(
+                    phase="merge",
+                    start_time=start_time,
+                    row_count=(
+                        0 if merge_chunk_size else stats.staged_counts[object_type]
+                    ),
+                )
+                if deactivate_omitted:
+                    start_time = time.perf_counter()
+                    deactivated: int = controller.deactivate(
+                        session=session,
+                        ingestion_process_id=ingestion_process_id,
+                        deactivate_scopes=deactivate_scopes,
+                        source=source,
+                        platform=platform,
+                    )
+                    merge_result.deactivated = deactivated
+                    stats.add_phase(
+                        phase="deactivate", start_time=start_time, row_count=deactivated
+                    )
                 logger.info(
-                    f"Completing ingestion process with process ID: {process_id}"
+                    f"Merged {object_type.value}: {merge_result.inserted} inserted, "
+                    f"{merge_result.updated} updated, {merge_result.unchanged} unchanged, "
+                    f"{merge_result.deactivated} deactivated"
                 )
-                IngestionProcessRepository.complete_process(
-                    session=session, ingestion_process_id=process_id
+            self._log_phase(phase="merge", phase_stats=stats.phases.get("merge"))
+            self._log_phase(
+                phase="deactivate", phase_stats=stats.phases.get("deactivate")
+            )
+
+            # the next delta run continues from here, keep the previous mark if nothing changed
+            watermark: str | None = (
+                connector.high_watermark or connector.since_watermark
+            )
+            if watermark:
+                IngestionProcessRepository.set_watermark(
+                    session=session,
+                    ingestion_process_id=ingestion_process_id,
+                    watermark=watermark,
+                )
+
+            # invalidate cached bundles once the merge commits
+            BundleRevisionRepository.create(
+                session=session, source=f"ingestion:{ingestion_process_id}"
+            )
+
+            # other processes may still be staging, so only this process's rows are removed
+            PrincipalRepository.delete_staging_tables(
+                session=session, ingestion_process_id=ingestion_process_id
+            )
+            ResourceRepository.delete_staging_tables(
+                session=session, ingestion_process_id=ingestion_process_id
+            )
+
+            # close ingestion process
+            logger.info(
+                f"Completing ingestion process with process ID: {ingestion_process_id}"
+            )
+            IngestionProcessRepository.complete_process(
+                session=session,
+                ingestion_process_id=ingestion_process_id,
+                metrics=stats.to_metrics(),
+            )
+            session.commit()
+
+    @staticmethod
+    def _time_retrieve(
+        batches: Iterable[dict[ObjectTypeEnum, list[BaseDio]]], stats: IngestionStats
+    ) -> Iterator[dict[ObjectTypeEnum, list[BaseDio]]]:
+        iterator: Iterator[dict[ObjectTypeEnum, list[BaseDio]]] = iter(batches)
+        while True:
+            start_time: float = time.perf_counter()
+            dio_batches: dict[ObjectTypeEnum, list[BaseDio]] | None = next(
+                iterator, None
+            )
+            if dio_batches is None:
+                stats.add_phase(phase="retrieve", start_time=start_time)
+                return
+            stats.add_phase(
+                phase="retrieve",
+                start_time=start_time,
+                row_count=sum(len(dio_batch) for dio_batch in dio_batches.values()),
+            )
+            yield dio_batches
+
+    @staticmethod
+    def _mark_changed_chunked(
+        database: Database,
+        controller: BaseIngestionController,
+        ingestion_process_id: int,
+        chunk_size: int,
+    ) -> MergeResult:
+        with database.Session.begin() as session:
+            key_ranges: list[KeyRange] = controller.get_merge_key_ranges(
+                session=session,
+                ingestion_process_id=ingestion_process_id,
+                chunk_size=chunk_size,
+            )
+
+        merge_result: MergeResult = MergeResult()
+        for chunk_number, key_range in enumerate(key_ranges, start=1):
+            with database.Session.begin() as session:
+                merge_result += controller.mark_changed(
+                    session=session,
+                    ingestion_process_id=ingestion_process_id,
+                    key_range=key_range,
                 )
                 session.commit()
+            logger.info(f"Compared chunk {chunk_number} of {len(key_ranges)}")
+        return merge_result
+
+    @staticmethod
+    def _log_phase(phase: str, phase_stats: PhaseStats | None) -> None:
+        if phase_stats is None:
+            return
+        logger.info(
+            f"Completed {phase} of {phase_stats.row_count} rows in {phase_stats.seconds:.2f}s "
+            f"({phase_stats.rows_per_second:.0f} rows/s)"
+        )
 
     @staticmethod
     def _initialise_ingestion_process(
-        database: Database, connector_name: str, object_types: list[ObjectTypeEnum]
+        database: Database,
+        connector_name: str,
+        object_types: list[ObjectTypeEnum],
+        platform: str = None,
     ) -> int:
         with database.Session.begin() as session:
-            PrincipalRepository.truncate_staging_tables(session=session)
-            ResourceRepository.truncate_staging_tables(session=session)
-
             process_id: int = IngestionProcessRepository.create(
                 session=session,
                 source=connector_name,
                 object_types=object_types,
+                platform=platform,
             )
             session.commit()
 
@@ -0,0 +1,6 @@
+from app_config import AppConfigModelBase
+
+
+class IngestionControllerConfig(AppConfigModelBase):
+    CONFIG_PREFIX: str = "ingestion_controller"
+    merge_chunk_size: str = "0"
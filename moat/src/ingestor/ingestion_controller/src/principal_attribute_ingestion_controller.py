@@ -1,12 +1,16 @@
+from typing import Iterable
+
 from app_logger import Logger, get_logger
-from ingestor.connectors import ConnectorBase
 from ingestor.models import (
+    DioBatch,
     PrincipalAttributeDio,
 )
 from models import (
     PrincipalAttributeStagingDbo,
 )
 from repositories import (
+    KeyRange,
+    MergeResult,
     PrincipalRepository,
 )
 
@@ -17,36 +21,71 @@ logger: Logger = get_logger("ingestor.controller.principal_attributes")
 
 class PrincipalAttributeIngestionController(BaseIngestionController):
 
-    def retrieve(self, connector: ConnectorBase) -> list[PrincipalAttributeDio]:
-        principal_attr_dios: list[PrincipalAttributeDio] = (
-            connector.get_principal_attributes()
+    def stage(
+        self,
+        session,
+        ingestion_process_id: int,
+        principal_attr_dio_batches: Iterable[
+            list[PrincipalAttributeDio] | DioBatch[PrincipalAttributeDio]
+        ],
+    ) -> int:
+        fields: list[str] = ["fq_name", "attribute_key", "attribute_value"]
+        row_count: int = PrincipalRepository.bulk_insert(
+            session=session,
+            model=PrincipalAttributeStagingDbo,
+            columns=["ingestion_process_id", *fields],
+            rows=self.get_staging_rows(
+                ingestion_process_id=ingestion_process_id,
+                dio_batches=principal_attr_dio_batches,
+                fields=fields,
+            ),
         )
-        logger.info(
-            f"Retrieved {len(principal_attr_dios)} principal attributes from connector"
+        logger.info(f"Staged {row_count} principal attributes")
+        return row_count
+
+    def get_merge_key_ranges(
+        self, session, ingestion_process_id: int, chunk_size: int
+    ) -> list[KeyRange]:
+        return PrincipalRepository.get_merge_key_ranges(
+            session=session,
+            source_model=PrincipalAttributeStagingDbo,
+            merge_key=PrincipalAttributeStagingDbo.MERGE_KEYS[0],
+            ingestion_process_id=ingestion_process_id,
+            chunk_size=chunk_size,
+        )
+
+    def mark_changed(
+        self, session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return PrincipalRepository.mark_changed_attributes_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
         )
-        return principal_attr_dios
-
-    def stage(self, session, principal_attr_dios: list[PrincipalAttributeDio]) -> None:
-        stgs: list[PrincipalAttributeStagingDbo] = []
-        for dio in principal_attr_dios:
-            stg: PrincipalAttributeStagingDbo = PrincipalAttributeStagingDbo()
-            stg.fq_name = dio.fq_name
-            stg.attribute_key = dio.attribute_key
-            stg.attribute_value = dio.attribute_value
-            stgs.append(stg)
-        session.add_all(stgs)
-        logger.info(f"Staged {len(stgs)} principall attributes")
 
     def merge(
-        self, session, ingestion_process_id: int, deactivate_omitted: bool = False
-    ) -> None:
+        self, session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
         logger.info("Starting merge process for principal attributes")
-        PrincipalRepository.merge_attributes_staging(
-            session=session, ingestion_process_id=ingestion_process_id
+        return PrincipalRepository.merge_attributes_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
 
-        logger.info(f"Starting merge deactivate process for principal attributes")
-        if deactivate_omitted:
-            PrincipalRepository.merge_attributes_deactivate_staging(
-                session=session, ingestion_process_id=ingestion_process_id
-            )
+    def deactivate(
+        self,
+        session,
+        ingestion_process_id: int,
+        deactivate_scopes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
+        logger.info("Starting merge deactivate process for principal attributes")
+        return PrincipalRepository.merge_attributes_deactivate_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=deactivate_scopes,
+            source=source,
+            platform=platform,
+        )
@@ -1,12 +1,16 @@
+from typing import Iterable
+
 from app_logger import Logger, get_logger
-from ingestor.connectors import ConnectorBase
 from ingestor.models import (
+    DioBatch,
     PrincipalDio,
 )
 from models import (
     PrincipalStagingDbo,
 )
 from repositories import (
+    KeyRange,
+    MergeResult,
     PrincipalRepository,
 )
 
@@ -17,34 +21,69 @@ logger: Logger = get_logger("ingestor.controller.principal")
 
 class PrincipalIngestionController(BaseIngestionController):
 
-    def retrieve(self, connector: ConnectorBase) -> list[PrincipalDio]:
-        principal_dios: list[PrincipalDio] = connector.get_principals()
-        logger.info(f"Retrieved {len(principal_dios)} principals from connector")
-        return principal_dios
-
-    def stage(self, session, principal_dios: list[PrincipalDio]) -> None:
-        principal_stgs: list[PrincipalStagingDbo] = []
-        for principal_dio in principal_dios:
-            principal_stg: PrincipalStagingDbo = PrincipalStagingDbo()
-            principal_stg.fq_name = principal_dio.fq_name
-            principal_stg.first_name = principal_dio.first_name
-            principal_stg.last_name = principal_dio.last_name
-            principal_stg.user_name = principal_dio.user_name
-            principal_stg.email = principal_dio.email
-            principal_stgs.append(principal_stg)
-        session.add_all(principal_stgs)
-        logger.info(f"Staged {len(principal_stgs)} principals")
+    def stage(
+        self,
+        session,
+        ingestion_process_id: int,
+        principal_dio_batches: Iterable[list[PrincipalDio] | DioBatch[PrincipalDio]],
+    ) -> int:
+        fields: list[str] = ["fq_name", "first_name", "last_name", "user_name", "email"]
+        row_count: int = PrincipalRepository.bulk_insert(
+            session=session,
+            model=PrincipalStagingDbo,
+            columns=["ingestion_process_id", *fields],
+            rows=self.get_staging_rows(
+                ingestion_process_id=ingestion_process_id,
+                dio_batches=principal_dio_batches,
+                fields=fields,
+            ),
+        )
+        logger.info(f"Staged {row_count} principals")
+        return row_count
+
+    def get_merge_key_ranges(
+        self, session, ingestion_process_id: int, chunk_size: int
+    ) -> list[KeyRange]:
+        return PrincipalRepository.get_merge_key_ranges(
+            session=session,
+            source_model=PrincipalStagingDbo,
+            merge_key=PrincipalStagingDbo.MERGE_KEYS[0],
+            ingestion_process_id=ingestion_process_id,
+            chunk_size=chunk_size,
+        )
+
+    def mark_changed(
+        self, session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return PrincipalRepository.mark_changed_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
+        )
 
     def merge(
-        self, session, ingestion_process_id: int, deactivate_omitted: bool = False
-    ) -> None:
+        self, session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
         logger.info("Starting merge process for principals")
-        PrincipalRepository.merge_staging(
-            session=session, ingestion_process_id=ingestion_process_id
+        return PrincipalRepository.merge_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
 
-        logger.info(f"Starting merge deactivate process for principals")
-        if deactivate_omitted:
-            PrincipalRepository.merge_deactivate_staging(
-                session=session, ingestion_process_id=ingestion_process_id
-            )
+    def deactivate(
+        self,
+        session,
+        ingestion_process_id: int,
+        deactivate_scopes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
+        logger.info("Starting merge deactivate process for principals")
+        return PrincipalRepository.merge_deactivate_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=deactivate_scopes,
+            source=source,
+            platform=platform,
+        )
@@ -1,12 +1,16 @@
+from typing import Iterable
+
 from app_logger import Logger, get_logger
-from ingestor.connectors import ConnectorBase
 from ingestor.models import (
+    DioBatch,
     ResourceAttributeDio,
 )
 from models import (
     ResourceAttributeStagingDbo,
 )
 from repositories import (
+    KeyRange,
+    MergeResult,
     ResourceRepository,
 )
 
@@ -17,37 +21,71 @@ logger: Logger = get_logger("ingestor.controller.resource_attribute")
 
 class ResourceAttributeIngestionController(BaseIngestionController):
 
-    def retrieve(self, connector: ConnectorBase) -> list[ResourceAttributeDio]:
-        resource_attr_dios: list[ResourceAttributeDio] = (
-            connector.get_resource_attributes()
+    def stage(
+        self,
+        session,
+        ingestion_process_id: int,
+        dio_batches: Iterable[
+            list[ResourceAttributeDio] | DioBatch[ResourceAttributeDio]
+        ],
+    ) -> int:
+        fields: list[str] = ["fq_name", "attribute_key", "attribute_value"]
+        row_count: int = ResourceRepository.bulk_insert(
+            session=session,
+            model=ResourceAttributeStagingDbo,
+            columns=["ingestion_process_id", *fields],
+            rows=self.get_staging_rows(
+                ingestion_process_id=ingestion_process_id,
+                dio_batches=dio_batches,
+                fields=fields,
+            ),
+        )
+        logger.info(f"Staged {row_count} resource attributes")
+        return row_count
+
+    def get_merge_key_ranges(
+        self, session, ingestion_process_id: int, chunk_size: int
+    ) -> list[KeyRange]:
+        return ResourceRepository.get_merge_key_ranges(
+            session=session,
+            source_model=ResourceAttributeStagingDbo,
+            merge_key=ResourceAttributeStagingDbo.MERGE_KEYS[0],
+            ingestion_process_id=ingestion_process_id,
+            chunk_size=chunk_size,
+        )
+
+    def mark_changed(
+        self, session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return ResourceRepository.mark_changed_attributes_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
         )
-        logger.info(f"Retrieved {len(resource_attr_dios)} resources")
-        return resource_attr_dios
-
-    def stage(self, session, dios: list[ResourceAttributeDio]) -> None:
-        resource_attr_stgs: list[ResourceAttributeStagingDbo] = []
-
-        for dio in dios:
-            do_stg: ResourceAttributeStagingDbo = ResourceAttributeStagingDbo(
-                fq_name=dio.fq_name,
-                attribute_key=dio.attribute_key,
-                attribute_value=dio.attribute_value,
-            )
-            resource_attr_stgs.append(do_stg)
-        session.add_all(resource_attr_stgs)
-        logger.info(f"Staged {len(resource_attr_stgs)} resources")
 
     def merge(
-        self, session, ingestion_process_id: int, deactivate_omitted: bool = False
-    ) -> None:
+        self, session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
         logger.info("Starting merge process for resource attributes")
-
-        ResourceRepository.merge_attributes_staging(
-            session=session, ingestion_process_id=ingestion_process_id
+        return ResourceRepository.merge_attributes_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
 
-        logger.info(f"Starting merge deactivate process for principals")
-        if deactivate_omitted:
-            ResourceRepository.merge_attributes_deactivate_staging(
-                session=session, ingestion_process_id=ingestion_process_id
-            )
+    def deactivate(
+        self,
+        session,
+        ingestion_process_id: int,
+        deactivate_scopes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
+        logger.info("Starting merge deactivate process for resource attributes")
+        return ResourceRepository.merge_attributes_deactivate_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=deactivate_scopes,
+            source=source,
+            platform=platform,
+        )
@@ -1,13 +1,16 @@
+from typing import Iterable
+
 from app_logger import Logger, get_logger
-from ingestor.connectors import ConnectorBase
 from ingestor.models import (
-    BaseDio,
+    DioBatch,
     ResourceDio,
 )
 from models import (
     ResourceStagingDbo,
 )
 from repositories import (
+    KeyRange,
+    MergeResult,
     ResourceRepository,
 )
 
@@ -18,34 +21,69 @@ logger: Logger = get_logger("ingestor.controller.resource")
 
 class ResourceIngestionController(BaseIngestionController):
 
-    def retrieve(self, connector: ConnectorBase) -> list[BaseDio]:
-        resource_dios: list[ResourceDio] = connector.get_resources()
-        logger.info(f"Retrieved {len(resource_dios)} resources")
-        return resource_dios
+    def stage(
+        self,
+        session,
+        ingestion_process_id: int,
+        dio_batches: Iterable[list[ResourceDio] | DioBatch[ResourceDio]],
+    ) -> int:
+        fields: list[str] = ["fq_name", "platform", "object_type"]
+        row_count: int = ResourceRepository.bulk_insert(
+            session=session,
+            model=ResourceStagingDbo,
+            columns=["ingestion_process_id", *fields],
+            rows=self.get_staging_rows(
+                ingestion_process_id=ingestion_process_id,
+                dio_batches=dio_batches,
+                fields=fields,
+            ),
+        )
+        logger.info(f"Staged {row_count} resources")
+        return row_count
 
-    def stage(self, session, dios: list[ResourceDio]) -> None:
-        resource_stgs: list[ResourceStagingDbo] = []
+    def get_merge_key_ranges(
+        self, session, ingestion_process_id: int, chunk_size: int
+    ) -> list[KeyRange]:
+        return ResourceRepository.get_merge_key_ranges(
+            session=session,
+            source_model=ResourceStagingDbo,
+            merge_key=ResourceStagingDbo.MERGE_KEYS[0],
+            ingestion_process_id=ingestion_process_id,
+            chunk_size=chunk_size,
+        )
 
-        for resource_dio in dios:
-            do_stg: ResourceStagingDbo = ResourceStagingDbo(
-                fq_name=resource_dio.fq_name,
-                platform=resource_dio.platform,
-                object_type=resource_dio.object_type,
-            )
-            resource_stgs.append(do_stg)
-        session.add_all(resource_stgs)
-        logger.info(f"Staged {len(resource_stgs)} resources")
+    def mark_changed(
+        self, session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return ResourceRepository.mark_changed_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
+        )
 
     def merge(
-        self, session, ingestion_process_id: int, deactivate_omitted: bool = False
-    ) -> None:
-        logger.info("Starting merge process for principals")
-        ResourceRepository.merge_staging(
-            session=session, ingestion_process_id=ingestion_process_id
+        self, session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        logger.info("Starting merge process for resources")
+        return ResourceRepository.merge_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
 
-        logger.info(f"Starting merge deactivate process for principals")
-        if deactivate_omitted:
-            ResourceRepository.merge_deactivate_staging(
-                session=session, ingestion_process_id=ingestion_process_id
-            )
+    def deactivate(
+        self,
+        session,
+        ingestion_process_id: int,
+        deactivate_scopes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
+        logger.info("Starting merge deactivate process for resources")
+        return ResourceRepository.merge_deactivate_staging(
+            session=session,
+            ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=deactivate_scopes,
+            source=source,
+            platform=platform,
+        )
@@ -1,18 +1,22 @@
 from unittest import mock
 
+import pytest
+
 from database import Database
-from ingestor.connectors import ConnectorFactory
+from ingestor.connectors import ConnectorBase, ConnectorFactory
 from ingestor.models import PrincipalAttributeDio, PrincipalDio
 from models import (
+    IngestionProcessDbo,
     ObjectTypeEnum,
     PrincipalDbo,
 )
-from repositories import IngestionProcessRepository, PrincipalRepository
+from repositories import IngestionProcessRepository, MergeResult, PrincipalRepository
 
 from ..src.ingestion_controller import IngestionController
 
 
-class TestConnector:
+class TestConnector(ConnectorBase):
+    __test__ = False
     NAME = "test"
 
     def acquire_data(self, platform: str) -> None:
@@ -76,14 +80,14 @@ def test_ingest(database_empty: Database):
         # bring in users
         ingestion_controller.ingest(
             connector_name="test",
-            object_type=ObjectTypeEnum.PRINCIPAL,
+            object_types=[ObjectTypeEnum.PRINCIPAL],
             platform="test",
         )
 
         # bring in attributes
         ingestion_controller.ingest(
             connector_name="test",
-            object_type=ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+            object_types=[ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
             platform="test",
         )
         assert mock_create_by_name.call_count == 2
@@ -110,7 +114,7 @@ def test_ingest(database_empty: Database):
         assert bob.user_name == "bobiscool34"
 
         assert len(bob.attributes) == 2
-        assert [a.attribute_value for a in bob.attributes] == [
+        assert sorted([a.attribute_value for a in bob.attributes]) == [
             "bobs",
             "mechanics",
         ]
@@ -126,3 +130,327 @@ def test_ingest(database_empty: Database):
         for principal in principals:
             for attribute in principal.attributes:
                 assert attribute.ingestion_process_id == 2
+
+
+class SinglePassTestConnector(ConnectorBase):
+    __test__ = False
+
+    def get_principals(self) -> list[PrincipalDio]:
+        return [
+            PrincipalDio(
+                fq_name="grace.hopper",
+                first_name="grace",
+                last_name="hopper",
+                email="grace@bob.net",
+                user_name="grace",
+                platform="test",
+            )
+        ]
+
+    def get_principal_attributes(self) -> list[PrincipalAttributeDio]:
+        return [
+            PrincipalAttributeDio(
+                fq_name="grace.hopper",
+                attribute_key="group",
+                attribute_value="admirals",
+                platform="test",
+            )
+        ]
+
+
+def test_ingest_object_types(database_empty: Database):
+    ingestion_controller = IngestionController()
+    connector: SinglePassTestConnector = SinglePassTestConnector()
+
+    with mock.patch.object(
+        ConnectorFactory, "create_by_name", return_value=connector
+    ), mock.patch.object(
+        connector, "acquire_data", wraps=connector.acquire_data
+    ) as mock_acquire_data:
+        # attributes are listed first, but are merged after their principals
+        ingestion_controller.ingest(
+            connector_name="single_pass_test",
+            object_types=[
+                ObjectTypeEnum.PRINCIPAL_ATTRIBUTE,
+                ObjectTypeEnum.PRINCIPAL,
+            ],
+            platform="test",
+            deactivate_omitted=False,
+        )
+        mock_acquire_data.assert_called_once()
+
+    with database_empty.Session.begin() as session:
+        # one process covers both object types
+        _, ingestion_processes = IngestionProcessRepository.get_all(session=session)
+        ingestion_process = ingestion_processes[-1]
+        assert ingestion_process.object_type == "principal,principal_attribute"
+        assert ingestion_process.status == "complete"
+
+        grace: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="grace"
+        )
+        assert grace.ingestion_process_id == ingestion_process.ingestion_process_id
+        assert [
+            (a.attribute_value, a.ingestion_process_id) for a in grace.attributes
+        ] == [("admirals", ingestion_process.ingestion_process_id)]
+
+
+class DeltaTestConnector(ConnectorBase):
+    """
+    Returns both users on a full run, and only the changed user since watermark "2"
+    """
+
+    __test__ = False
+
+    def get_principals(self) -> list[PrincipalDio]:
+        principals: list[PrincipalDio] = [
+            PrincipalDio(
+                fq_name="ada.lovelace",
+                first_name="ada",
+                last_name="lovelace",
+                email="ada@bob.net",
+                user_name="ada",
+                platform="delta",
+            ),
+            PrincipalDio(
+                fq_name="alan.turing",
+                first_name="alan",
+                last_name="turing",
+                email="alan@bob.net",
+                user_name="alan",
+                platform="delta",
+            ),
+        ]
+        if self.since_watermark == "2":
+            self.high_watermark = "3"
+            principals[0].last_name = "king"
+            return principals[:1]
+
+        self.high_watermark = "2"
+        return principals
+
+
+def test_ingest_delta(database_empty: Database):
+    ingestion_controller = IngestionController()
+    connectors: list[DeltaTestConnector] = [DeltaTestConnector(), DeltaTestConnector()]
+
+    with mock.patch.object(ConnectorFactory, "create_by_name", side_effect=connectors):
+        # no watermark is stored yet, so this is a full run
+        ingestion_controller.ingest(
+            connector_name="delta_test",
+            object_types=[ObjectTypeEnum.PRINCIPAL],
+            platform="delta",
+            delta=True,
+        )
+        assert connectors[0].since_watermark is None
+
+        ingestion_controller.ingest(
+            connector_name="delta_test",
+            object_types=[ObjectTypeEnum.PRINCIPAL],
+            platform="delta",
+            delta=True,
+        )
+        assert connectors[1].since_watermark == "2"
+
+    with database_empty.Session.begin() as session:
+        assert (
+            IngestionProcessRepository.get_last_watermark(
+                session=session,
+                source="delta_test",
+                platform="delta",
+                object_types=[ObjectTypeEnum.PRINCIPAL],
+            )
+            == "3"
+        )
+
+        ada: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="ada"
+        )
+        assert ada.last_name == "king"
+        assert ada.active
+
+        # alan was omitted from the delta, but is not deactivated
+        alan: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="alan"
+        )
+        assert alan.last_name == "turing"
+        assert alan.active
+
+
+def test_ingest_merge_chunked(database_empty: Database):
+    ingestion_controller = IngestionController()
+    ingestion_controller.config.merge_chunk_size = "1"
+    mark_changed_chunked_unpatched = IngestionController._mark_changed_chunked
+
+    def mark_changed_chunked(**kwargs) -> MergeResult:
+        merge_result: MergeResult = mark_changed_chunked_unpatched(**kwargs)
+        # the compared chunks are committed, but nothing is published before the final merge
+        with database_empty.Session.begin() as session:
+            assert (
+                session.query(PrincipalDbo)
+                .filter(
+                    PrincipalDbo.ingestion_process_id == kwargs["ingestion_process_id"]
+                )
+                .count()
+                == 0
+            )
+        return merge_result
+
+    with mock.patch.object(
+        ConnectorFactory, "create_by_name", return_value=TestConnector()
+    ), mock.patch.object(
+        IngestionController,
+        "_mark_changed_chunked",
+        side_effect=mark_changed_chunked,
+    ) as mock_mark_changed_chunked:
+        ingestion_controller.ingest(
+            connector_name="test",
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
+            platform="chunked",
+        )
+        assert mock_mark_changed_chunked.call_count == 2
+
+    with database_empty.Session.begin() as session:
+        bob: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="bobiscool34"
+        )
+        assert bob.active
+        assert sorted([a.attribute_value for a in bob.attributes]) == [
+            "bobs",
+            "mechanics",
+        ]
+
+
+class FailingTestConnector(TestConnector):
+    __test__ = False
+
+    def get_principals(self) -> list[PrincipalDio]:
+        raise ConnectionError("source went away")
+
+
+def test_ingest_metrics(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory, "create_by_name", return_value=TestConnector()
+    ):
+        ingestion_controller.ingest(
+            connector_name="test",
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
+            platform="metrics",
+        )
+
+    with mock.patch.object(
+        ConnectorFactory, "create_by_name", return_value=FailingTestConnector()
+    ):
+        with pytest.raises(ConnectionError):
+            ingestion_controller.ingest(
+                connector_name="test",
+                object_types=[ObjectTypeEnum.PRINCIPAL],
+                platform="metrics",
+            )
+
+    with database_empty.Session.begin() as session:
+        completed, failed = IngestionProcessRepository.get_recent(
+            session=session, limit=2, platform="metrics"
+        )[::-1]
+
+        assert completed.status == "complete"
+        assert completed.log is None
+        assert set(completed.metrics["phases"]) >= {
+            "acquire",
+            "retrieve",
+            "stage",
+            "merge",
+            "deactivate",
+        }
+        assert completed.metrics["phases"]["stage"]["row_count"] == 5
+        assert completed.metrics["object_types"]["principal"]["staged"] == 2
+        assert completed.metrics["object_types"]["principal_attribute"]["staged"] == 3
+        assert completed.metrics["peak_rss_mb"] > 0
+
+        assert failed.status == "failed"
+        assert failed.log == "source went away"
+        assert failed.completed_at is not None
+        assert failed.metrics["object_types"]["principal"]["staged"] == 0
+
+
+def test_ingest_sources(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory,
+        "create_by_name",
+        side_effect=[SinglePassTestConnector(), TestConnector()],
+    ):
+        ingestion_controller.ingest(
+            connector_name="other_source",
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
+            platform="test",
+        )
+        ingestion_controller.ingest(
+            connector_name="test",
+            object_types=[ObjectTypeEnum.PRINCIPAL, ObjectTypeEnum.PRINCIPAL_ATTRIBUTE],
+            platform="test",
+        )
+
+    with database_empty.Session.begin() as session:
+        grace: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="grace"
+        )
+
+        # the run of another source leaves grace and her attributes active
+        assert grace.active
+        assert [a.active for a in grace.attributes] == [True]
+
+
+class LegacyTestConnector(ConnectorBase):
+    __test__ = False
+
+    def get_principals(self) -> list[PrincipalDio]:
+        return [
+            PrincipalDio(
+                fq_name="ada.lovelace",
+                first_name="ada",
+                last_name="lovelace",
+                email="ada@bob.net",
+                user_name="ada",
+                platform="test",
+            )
+        ]
+
+
+def test_ingest_deactivates_before_platform(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory,
+        "create_by_name",
+        side_effect=[LegacyTestConnector(), TestConnector()],
+    ):
+        ingestion_controller.ingest(
+            connector_name="legacy",
+            object_types=[ObjectTypeEnum.PRINCIPAL],
+            platform="test",
+        )
+
+        # ada was written before the platform of ingestion processes was recorded
+        with database_empty.Session.begin() as session:
+            ada: PrincipalDbo = PrincipalRepository.get_by_username(
+                session=session, user_name="ada"
+            )
+            session.query(IngestionProcessDbo).filter(
+                IngestionProcessDbo.ingestion_process_id == ada.ingestion_process_id
+            ).update({IngestionProcessDbo.platform: None})
+
+        ingestion_controller.ingest(
+            connector_name="legacy",
+            object_types=[ObjectTypeEnum.PRINCIPAL],
+            platform="test",
+        )
+
+    with database_empty.Session.begin() as session:
+        ada: PrincipalDbo = PrincipalRepository.get_by_username(
+            session=session, user_name="ada"
+        )
+        assert not ada.active
@@ -1,10 +1,14 @@
+from typing import Iterator
 from unittest import mock
 
+from clients import RowBatch, TrinoClient
 from database import Database
-from ingestor.connectors import ConnectorFactory
-from ingestor.models import ResourceAttributeDio, ResourceDio
+from ingestor.connectors import ConnectorBase, ConnectorFactory
+from ingestor.connectors.dbapi_connector import DBAPIConnector
+from ingestor.models import DioBatch, ResourceAttributeDio, ResourceDio
 from models import (
     ObjectTypeEnum,
+    ResourceAttributeDbo,
     ResourceDbo,
 )
 from repositories import IngestionProcessRepository, ResourceRepository
@@ -12,7 +16,8 @@ from repositories import IngestionProcessRepository, ResourceRepository
 from ..src.ingestion_controller import IngestionController
 
 
-class TestConnector:
+class TestConnector(ConnectorBase):
+    __test__ = False
     NAME = "test"
 
     def acquire_data(self, platform: str) -> None:
@@ -71,14 +76,14 @@ def test_ingest(database_empty: Database):
         # bring in users
         ingestion_controller.ingest(
             connector_name="test",
-            object_type=ObjectTypeEnum.RESOURCE,
+            object_types=[ObjectTypeEnum.RESOURCE],
             platform="test",
         )
 
         # bring in attributes
         ingestion_controller.ingest(
             connector_name="test",
-            object_type=ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+            object_types=[ObjectTypeEnum.RESOURCE_ATTRIBUTE],
             platform="test",
         )
         assert mock_create_by_name.call_count == 2
@@ -119,3 +124,267 @@ def test_ingest(database_empty: Database):
         for resource in resources:
             for attribute in resource.attributes:
                 assert attribute.ingestion_process_id == 2
+
+
+class DeltaTestConnector(ConnectorBase):
+    """
+    Returns all tables on a full run, and only the changed hr schema on a delta
+    """
+
+    __test__ = False
+
+    def get_resources(self) -> list[ResourceDio]:
+        if self.since_watermark:
+            self.high_watermark = "v2"
+            self.delta_scopes = ["datalake.hr."]
+            fq_names: list[str] = ["datalake.hr.employees"]
+        else:
+            self.high_watermark = "v1"
+            fq_names: list[str] = [
+                "datalake.hr.employees",
+                "datalake.hr.payroll",
+                "datalake.sales.orders",
+            ]
+        return [
+            ResourceDio(fq_name=fq_name, object_type="table", platform="delta")
+            for fq_name in fq_names
+        ]
+
+
+def test_ingest_delta_scopes(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory,
+        "create_by_name",
+        side_effect=[DeltaTestConnector(), DeltaTestConnector()],
+    ):
+        for _ in range(2):
+            ingestion_controller.ingest(
+                connector_name="delta_test",
+                object_types=[ObjectTypeEnum.RESOURCE],
+                platform="delta",
+                delta=True,
+            )
+
+    with database_empty.Session.begin() as session:
+        _, resources = ResourceRepository.get_all(session=session)
+        active: dict[str, bool] = {
+            r.fq_name: r.active for r in resources if r.fq_name.startswith("datalake.")
+        }
+
+    # payroll was dropped from the re-pulled hr schema, sales was not re-pulled
+    assert active == {
+        "datalake.hr.employees": True,
+        "datalake.hr.payroll": False,
+        "datalake.sales.orders": True,
+    }
+
+
+class DioBatchTestConnector(ConnectorBase):
+    """
+    Yields resources and their attributes as columnar DioBatches
+    """
+
+    __test__ = False
+
+    def get_resource_batches(self) -> Iterator[DioBatch[ResourceDio]]:
+        yield DioBatch(
+            dio_type=ResourceDio,
+            columns={
+                "fq_name": ["datalake.sales.orders", "datalake.sales.customers"],
+                "platform": ["batch", "batch"],
+                "object_type": ["table", "table"],
+            },
+        )
+        yield DioBatch(
+            dio_type=ResourceDio,
+            columns={
+                "fq_name": ["datalake.hr.employees"],
+                "platform": ["batch"],
+                "object_type": ["view"],
+            },
+        )
+
+    def get_resource_attribute_batches(
+        self,
+    ) -> Iterator[DioBatch[ResourceAttributeDio]]:
+        batch: DioBatch[ResourceAttributeDio] = DioBatch(dio_type=ResourceAttributeDio)
+        batch.append("datalake.sales.customers", "batch", "pii", "true")
+        batch.append("datalake.hr.employees", "batch", "pii", "true")
+        yield batch
+
+
+def test_ingest_dio_batches(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory, "create_by_name", return_value=DioBatchTestConnector()
+    ):
+        ingestion_controller.ingest(
+            connector_name="test",
+            object_types=[ObjectTypeEnum.RESOURCE, ObjectTypeEnum.RESOURCE_ATTRIBUTE],
+            platform="batch",
+        )
+
+    with database_empty.Session.begin() as session:
+        _, resources = ResourceRepository.get_all(session=session)
+        assert sorted(
+            (r.fq_name, r.object_type, sorted(a.attribute_key for a in r.attributes))
+            for r in resources
+            if r.platform == "batch"
+        ) == [
+            ("datalake.hr.employees", "view", ["pii"]),
+            ("datalake.sales.customers", "table", ["pii"]),
+            ("datalake.sales.orders", "table", []),
+        ]
+
+
+class PlatformTestConnector(ConnectorBase):
+    """
+    Returns one table per platform, with its attribute
+    """
+
+    __test__ = False
+
+    def get_resources(self) -> list[ResourceDio]:
+        return [
+            ResourceDio(
+                fq_name=f"{self.platform}.db.table",
+                object_type="table",
+                platform=self.platform,
+            )
+        ]
+
+    def get_resource_attributes(self) -> list[ResourceAttributeDio]:
+        return [
+            ResourceAttributeDio(
+                fq_name=f"{self.platform}.db.table",
+                attribute_key="owner",
+                attribute_value=self.platform,
+                platform=self.platform,
+            )
+        ]
+
+
+def test_ingest_platforms(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    with mock.patch.object(
+        ConnectorFactory,
+        "create_by_name",
+        side_effect=[PlatformTestConnector(), PlatformTestConnector()],
+    ):
+        for platform in ["platform_a", "platform_b"]:
+            ingestion_controller.ingest(
+                connector_name="test",
+                object_types=[
+                    ObjectTypeEnum.RESOURCE,
+                    ObjectTypeEnum.RESOURCE_ATTRIBUTE,
+                ],
+                platform=platform,
+            )
+
+    with database_empty.Session.begin() as session:
+        _, resources = ResourceRepository.get_all(session=session)
+        active: dict[str, tuple] = {
+            r.fq_name: (r.active, [a.active for a in r.attributes])
+            for r in resources
+            if r.platform in ["platform_a", "platform_b"]
+        }
+
+    # the platform_b run leaves the rows of platform_a active
+    assert active == {
+        "platform_a.db.table": (True, [True]),
+        "platform_b.db.table": (True, [True]),
+    }
+
+
+def test_ingest_dbapi_resource_attributes(database_empty: Database):
+    ingestion_controller = IngestionController()
+
+    # the left join returns a resource without attributes with null attribute columns
+    def mock_select_rows(*args, **kwargs):
+        yield RowBatch(
+            columns=["fq_name", "object_type", "attribute_key", "attribute_value"],
+            rows=[
+                ["dbapi.db.tagged", "table", "owner", "sales"],
+                ["dbapi.db.untagged", "table", None, None],
+            ],
+        )
+
+    with mock.patch.object(TrinoClient, "select_rows", side_effect=mock_select_rows):
+        with mock.patch.object(
+            ConnectorFactory, "create_by_name", return_value=DBAPIConnector()
+        ):
+            ingestion_controller.ingest(
+                connector_name="dbapi",
+                object_types=[ObjectTypeEnum.RESOURCE],
+                platform="dbapi",
+            )
+        # attributes alone, twice, do not stage rows for resources without attributes
+        for _ in range(2):
+            with mock.patch.object(
+                ConnectorFactory, "create_by_name", return_value=DBAPIConnector()
+            ):
+                ingestion_controller.ingest(
+                    connector_name="dbapi",
+                    object_types=[ObjectTypeEnum.RESOURCE_ATTRIBUTE],
+                    platform="dbapi",
+                )
+
+    with database_empty.Session.begin() as session:
+        attributes: list[ResourceAttributeDbo] = (
+            session.query(ResourceAttributeDbo)
+            .filter(ResourceAttributeDbo.fq_name.startswith("dbapi."))
+            .all()
+        )
+        assert [(a.fq_name, a.attribute_key, a.active) for a in attributes] == [
+            ("dbapi.db.tagged", "owner", True)
+        ]
+
+
+def test_ingest_dbapi_delta_without_schema_query(database_empty: Database):
+    ingestion_controller = IngestionController()
+    tables: list[str] = []
+
+    def mock_select_rows(query: str, *args, **kwargs):
+        if query == "select fingerprints":
+            yield RowBatch(
+                columns=["schema_name", "fingerprint"],
+                rows=[["fullpull.db", str(len(tables))]],
+            )
+            return
+        yield RowBatch(
+            columns=["fq_name", "object_type"],
+            rows=[[table, "table"] for table in tables],
+        )
+
+    # the second run no longer finds the dropped table
+    for run_tables in [
+        ["fullpull.db.kept", "fullpull.db.dropped"],
+        ["fullpull.db.kept"],
+    ]:
+        tables[:] = run_tables
+        connector: DBAPIConnector = DBAPIConnector()
+        connector.config.schema_fingerprint_query = "select fingerprints"
+        connector.config.data_object_schema_query = None
+        with mock.patch.object(
+            TrinoClient, "select_rows", side_effect=mock_select_rows
+        ), mock.patch.object(
+            ConnectorFactory, "create_by_name", return_value=connector
+        ):
+            ingestion_controller.ingest(
+                connector_name="dbapi",
+                object_types=[ObjectTypeEnum.RESOURCE],
+                platform="fullpull",
+                delta=True,
+            )
+
+    # without a per-schema query the delta is a full pull, which deactivates as one
+    with database_empty.Session.begin() as session:
+        _, resources = ResourceRepository.get_all(session=session)
+        assert {r.fq_name: r.active for r in resources if r.platform == "fullpull"} == {
+            "fullpull.db.kept": True,
+            "fullpull.db.dropped": False,
+        }
@@ -1,3 +1,4 @@
 from .src.base_dio import BaseDio
+from .src.dio_batch import DioBatch
 from .src.principal_dio import PrincipalAttributeDio, PrincipalDio
 from .src.resource_dio import ResourceAttributeDio, ResourceDio
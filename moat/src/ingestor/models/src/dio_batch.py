@@ -0,0 +1,62 @@
+from dataclasses import fields
+from typing import Generic, Iterable, Iterator, TypeVar
+
+from .base_dio import BaseDio
+
+T = TypeVar("T", bound=BaseDio)
+
+
+class DioBatch(Generic[T]):
+    """
+    A batch of DIOs of one type, stored as one list per field rather than one object per row
+    Iterating builds the DIOs on the fly, so it can be used wherever a list of DIOs is expected,
+    while stagers read the columns directly
+    """
+
+    __slots__ = ("dio_type", "columns")
+
+    def __init__(self, dio_type: type[T], columns: dict[str, list] | None = None):
+        self.dio_type: type[T] = dio_type
+        self.columns: dict[str, list] = {field.name: [] for field in fields(dio_type)}
+        if columns:
+            unknown: set[str] = set(columns) - set(self.columns)
+            if unknown:
+                raise ValueError(
+                    f"{dio_type.__name__} has no fields {', '.join(sorted(unknown))}"
+                )
+            self.columns.update(columns)
+        if len({len(column) for column in self.columns.values()}) > 1:
+            raise ValueError("All columns of a batch must have the same length")
+
+    @classmethod
+    def from_dios(cls, dio_type: type[T], dios: Iterable[T]) -> "DioBatch[T]":
+        batch: DioBatch[T] = cls(dio_type=dio_type)
+        for dio in dios:
+            batch.append(*(getattr(dio, name) for name in batch.columns))
+        return batch
+
+    def append(self, *values) -> None:
+        """
+        Appends a row, values are given in the order of the DIO's fields
+        """
+        for column, value in zip(self.columns.values(), values, strict=True):
+            column.append(value)
+
+    def column(self, name: str) -> list:
+        return self.columns[name]
+
+    def rows(self, names: list[str]) -> Iterator[tuple]:
+        return zip(*(self.columns[name] for name in names))
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def __iter__(self) -> Iterator[T]:
+        for values in zip(*self.columns.values()):
+            yield self.dio_type(*values)
+
+    def __getitem__(self, index: int) -> T:
+        return self.dio_type(*(column[index] for column in self.columns.values()))
+
+    def __repr__(self) -> str:
+        return f"DioBatch({self.dio_type.__name__}, {len(self)} rows)"
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from .base_dio import BaseDio
 
 
-@dataclass
+@dataclass(slots=True)
 class PrincipalDio(BaseDio):
     first_name: str
     last_name: str
@@ -11,7 +11,7 @@ class PrincipalDio(BaseDio):
     email: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PrincipalAttributeDio(BaseDio):
     attribute_key: str
     attribute_value: str
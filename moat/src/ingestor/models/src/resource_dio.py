@@ -3,12 +3,12 @@ from dataclasses import dataclass
 from .base_dio import BaseDio
 
 
-@dataclass
+@dataclass(slots=True)
 class ResourceDio(BaseDio):
     object_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ResourceAttributeDio(BaseDio):
     attribute_key: str
     attribute_value: str
@@ -0,0 +1,72 @@
+import pytest
+
+from ..src.dio_batch import DioBatch
+from ..src.resource_dio import ResourceAttributeDio, ResourceDio
+
+
+def test_dio_batch():
+    batch: DioBatch[ResourceAttributeDio] = DioBatch(dio_type=ResourceAttributeDio)
+    batch.append("datalake.sales.orders", "trino", "pii", "false")
+    batch.append("datalake.hr.employees", "trino", "pii", "true")
+
+    # rows are stored column by column, in the order of the DIO's fields
+    assert len(batch) == 2
+    assert batch.column("fq_name") == ["datalake.sales.orders", "datalake.hr.employees"]
+    assert list(batch.rows(["fq_name", "attribute_value"])) == [
+        ("datalake.sales.orders", "false"),
+        ("datalake.hr.employees", "true"),
+    ]
+
+    # DIOs are built when iterated or indexed
+    assert list(batch) == [
+        ResourceAttributeDio(
+            fq_name="datalake.sales.orders",
+            platform="trino",
+            attribute_key="pii",
+            attribute_value="false",
+        ),
+        ResourceAttributeDio(
+            fq_name="datalake.hr.employees",
+            platform="trino",
+            attribute_key="pii",
+            attribute_value="true",
+        ),
+    ]
+    assert batch[1].attribute_value == "true"
+
+    with pytest.raises(ValueError):
+        batch.append("datalake.hr.payroll", "trino")
+
+
+def test_dio_batch_columns():
+    dios: list[ResourceDio] = [
+        ResourceDio(
+            fq_name="datalake.sales.orders", platform="trino", object_type="table"
+        ),
+        ResourceDio(
+            fq_name="datalake.sales.v_orders", platform="trino", object_type="view"
+        ),
+    ]
+    batch: DioBatch[ResourceDio] = DioBatch(
+        dio_type=ResourceDio,
+        columns={
+            "fq_name": ["datalake.sales.orders", "datalake.sales.v_orders"],
+            "platform": ["trino", "trino"],
+            "object_type": ["table", "view"],
+        },
+    )
+    assert list(batch) == dios
+    assert list(DioBatch.from_dios(dio_type=ResourceDio, dios=dios)) == dios
+
+    # columns must be fields of the DIO, and all of the same length
+    with pytest.raises(ValueError):
+        DioBatch(dio_type=ResourceDio, columns={"attribute_key": []})
+    with pytest.raises(ValueError):
+        DioBatch(dio_type=ResourceDio, columns={"fq_name": ["datalake.sales.orders"]})
+
+
+def test_dio_slots():
+    dio: ResourceDio = ResourceDio(
+        fq_name="datalake.sales.orders", platform="trino", object_type="table"
+    )
+    assert not hasattr(dio, "__dict__")
@@ -6,6 +6,7 @@ from .src.dtos.attribute_dto import AttributeDto
 from .src.dtos.principal_dto import PrincipalDto
 
 from .src.dbos.ingestion_process_dbo import IngestionProcessDbo
+from .src.dbos.bundle_revision_dbo import BundleRevisionDbo
 from .src.object_type_enum import ObjectTypeEnum
 
 # principals
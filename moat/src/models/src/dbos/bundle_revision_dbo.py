@@ -0,0 +1,16 @@
+from database import BaseModel
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql.functions import current_timestamp
+
+
+class BundleRevisionDbo(BaseModel):
+    """
+    Append-only log of changes to the data served in OPA bundles
+    The highest bundle_revision_id is the current content revision
+    """
+
+    __tablename__ = "bundle_revisions"
+
+    bundle_revision_id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String)  # ingestion, scim etc
+    created_at = Column(DateTime(timezone=True), server_default=current_timestamp())
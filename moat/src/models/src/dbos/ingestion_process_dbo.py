@@ -1,5 +1,5 @@
 from database import BaseModel
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import JSON, Column, DateTime, Integer, String
 
 
 class IngestionProcessDbo(BaseModel):
@@ -8,7 +8,12 @@ class IngestionProcessDbo(BaseModel):
     ingestion_process_id = Column(Integer, primary_key=True, autoincrement=True)
     source = Column(String)  # trino, postgres, ldap etc
     object_type = Column(String)  # tag, object, principal, group
+    platform = Column(String)
+    watermark = Column(
+        String
+    )  # high-water mark for delta ingestion, e.g modifyTimestamp
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
-    status = Column(String, default="running")
-    log = Column(String)
+    status = Column(String, default="in_progress")  # in_progress, complete, failed
+    log = Column(String)  # the error of a failed run
+    metrics = Column(JSON)  # phase timings, row counts and peak RSS, see IngestionStats
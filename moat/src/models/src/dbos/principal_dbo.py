@@ -1,6 +1,7 @@
 from database import BaseModel
-from sqlalchemy import Column, DateTime, Integer, String, JSON
+from sqlalchemy import Column, DateTime, Index, Integer, String, JSON
 from sqlalchemy.orm import Mapped, relationship
+from sqlalchemy.sql import text
 from sqlalchemy.sql.functions import current_timestamp
 from sqlalchemy.dialects.postgresql import ARRAY
 from .common_mixin_dbo import IngestionDboMixin
@@ -8,6 +9,15 @@ from .common_mixin_dbo import IngestionDboMixin
 
 class PrincipalDbo(IngestionDboMixin, BaseModel):
     __tablename__ = "principals"
+    __table_args__ = (
+        Index("ix_principals_fq_name", "fq_name"),
+        Index("ix_principals_user_name", "user_name"),
+        Index("ix_principals_source_uid", "source_uid"),
+        # deactivation only checks active rows against staging
+        Index(
+            "ix_principals_active_fq_name", "fq_name", postgresql_where=text("active")
+        ),
+    )
 
     principal_id: int = Column(Integer, primary_key=True, autoincrement=True)
     fq_name: str = Column(String)
@@ -36,6 +46,10 @@ class PrincipalDbo(IngestionDboMixin, BaseModel):
 
 class PrincipalGroupDbo(IngestionDboMixin, BaseModel):
     __tablename__ = "principal_groups"
+    __table_args__ = (
+        Index("ix_principal_groups_fq_name", "fq_name"),
+        Index("ix_principal_groups_source_uid", "source_uid"),
+    )
 
     principal_group_id = Column(Integer, primary_key=True, autoincrement=True)
     fq_name = Column(String())
@@ -47,6 +61,18 @@ class PrincipalGroupDbo(IngestionDboMixin, BaseModel):
 
 class PrincipalAttributeDbo(IngestionDboMixin, BaseModel):
     __tablename__ = "principal_attributes"
+    __table_args__ = (
+        Index(
+            "ix_principal_attributes_fq_name_attribute_key", "fq_name", "attribute_key"
+        ),
+        Index(
+            "ix_principal_attributes_active_merge_keys",
+            "fq_name",
+            "attribute_key",
+            "attribute_value",
+            postgresql_where=text("active"),
+        ),
+    )
 
     principal_attribute_id: int = Column(Integer, primary_key=True, autoincrement=True)
     fq_name: str = Column(String)
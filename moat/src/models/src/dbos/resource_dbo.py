@@ -1,11 +1,26 @@
 from database import BaseModel
 from models.src.dbos.common_mixin_dbo import IngestionDboMixin
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlalchemy.orm import Mapped, relationship
+from sqlalchemy.sql import text
 
 
 class ResourceDbo(IngestionDboMixin, BaseModel):
     __tablename__ = "resources"
+    __table_args__ = (
+        Index("ix_resources_fq_name", "fq_name"),
+        Index("ix_resources_platform_fq_name", "platform", "fq_name"),
+        # bundles read active resources by platform, deactivation checks active rows against staging
+        Index(
+            "ix_resources_active_platform_fq_name",
+            "platform",
+            "fq_name",
+            postgresql_where=text("active"),
+        ),
+        Index(
+            "ix_resources_active_fq_name", "fq_name", postgresql_where=text("active")
+        ),
+    )
 
     id: int = Column(Integer, primary_key=True, autoincrement=True)
     fq_name: str = Column(String)
@@ -23,6 +38,18 @@ class ResourceDbo(IngestionDboMixin, BaseModel):
 
 class ResourceAttributeDbo(IngestionDboMixin, BaseModel):
     __tablename__ = "resource_attributes"
+    __table_args__ = (
+        Index(
+            "ix_resource_attributes_fq_name_attribute_key", "fq_name", "attribute_key"
+        ),
+        Index(
+            "ix_resource_attributes_active_merge_keys",
+            "fq_name",
+            "attribute_key",
+            "attribute_value",
+            postgresql_where=text("active"),
+        ),
+    )
 
     id: int = Column(Integer, primary_key=True, autoincrement=True)
     fq_name: str = Column(String)
@@ -1,16 +1,32 @@
 from database import BaseModel
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, Index, Integer, String
 
 
 class PrincipalStagingDbo(BaseModel):
     __tablename__ = "principals_staging"
+    __table_args__ = (
+        Index(
+            "ix_principals_staging_ingestion_process_id_fq_name",
+            "ingestion_process_id",
+            "fq_name",
+        ),
+        # staged rows only live until their merge commits, so they skip the WAL (see d35ce0938c5a)
+        {"prefixes": ["UNLOGGED"]},
+    )
 
     MERGE_KEYS: list[str] = ["fq_name"]
     UPDATE_COLS: list[str] = ["first_name", "last_name", "user_name", "email"]
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    id: int = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    ingestion_process_id: int = Column(Integer)
     fq_name: str = Column(String)
     first_name: str = Column(String)
     last_name: str = Column(String)
     user_name: str = Column(String)
     email: str = Column(String)
+    # set by a chunked merge on the rows which the final merge inserts or updates
+    changed: bool = Column(Boolean)
@@ -1,26 +1,60 @@
 from database import BaseModel
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, Index, Integer, String
 
 
 class ResourceStagingDbo(BaseModel):
     __tablename__ = "resources_stg"
+    __table_args__ = (
+        Index(
+            "ix_resources_stg_ingestion_process_id_fq_name",
+            "ingestion_process_id",
+            "fq_name",
+        ),
+        # staged rows only live until their merge commits, so they skip the WAL (see d35ce0938c5a)
+        {"prefixes": ["UNLOGGED"]},
+    )
 
     MERGE_KEYS: list[str] = ["fq_name"]
     UPDATE_COLS: list[str] = ["platform", "object_type"]
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    id: int = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    ingestion_process_id: int = Column(Integer)
     fq_name: str = Column(String)
     platform: str = Column(String)
     object_type: str = Column(String)
+    # set by a chunked merge on the rows which the final merge inserts or updates
+    changed: bool = Column(Boolean)
 
 
 class ResourceAttributeStagingDbo(BaseModel):
     __tablename__ = "resource_attributes_stg"
-
-    MERGE_KEYS: list[str] = ["fq_name", "attribute_key"]
-    UPDATE_COLS: list[str] = ["attribute_key", "attribute_value"]
-
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    __table_args__ = (
+        Index(
+            "ix_resource_attributes_stg_process_id_fq_name_attribute_key",
+            "ingestion_process_id",
+            "fq_name",
+            "attribute_key",
+        ),
+        # staged rows only live until their merge commits, so they skip the WAL (see d35ce0938c5a)
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    # attributes are multi-valued, e.g one ad_group attribute per group
+    MERGE_KEYS: list[str] = ["fq_name", "attribute_key", "attribute_value"]
+    UPDATE_COLS: list[str] = []
+
+    id: int = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    ingestion_process_id: int = Column(Integer)
     fq_name: str = Column(String)
     attribute_key: str = Column(String)
     attribute_value: str = Column(String)
+    # set by a chunked merge on the rows which the final merge inserts or updates
+    changed: bool = Column(Boolean)
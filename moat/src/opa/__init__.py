@@ -1,2 +1,7 @@
-from .bundle_generator import BundleGenerator
+from .bundle_generator import BundleCache, BundleGenerator, CachedBundle
+from .decision_log_spool import (
+    DecisionLogSpool,
+    DecisionLogSpoolFullError,
+    DecisionLogSpoolWriter,
+)
 from .opa_client import OpaClient
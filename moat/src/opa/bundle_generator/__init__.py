@@ -1 +1,2 @@
+from .src.bundle_cache import BundleCache, CachedBundle
 from .src.bundle_generator import BundleGenerator
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from app_logger import Logger, get_logger
+
+from .bundle_generator import BundleGenerator
+from .bundle_generator_config import BundleGeneratorConfig
+
+logger: Logger = get_logger("opa.bundle_cache")
+
+
+@dataclass
+class CachedBundle:
+    etag: str
+    revision: int
+    content: bytes
+
+
+class BundleCache:
+    """
+    Holds the most recently built bundle for each platform in memory
+
+    Bundles are keyed by the data revision (see BundleRevisionRepository) and a fingerprint
+    of the static rego files, which together form the ETag served to OPA.
+    A new revision replaces the cached bundle for the platform on the next request.
+
+    Builds are serialised per platform so that a fleet of OPAs polling after a revision
+    change triggers a single build rather than one per request
+    """
+
+    def __init__(self):
+        config: BundleGeneratorConfig = BundleGeneratorConfig.load()
+        self.policy_fingerprint: str = BundleCache.get_policy_fingerprint(
+            static_rego_file_path=config.static_rego_file_path
+        )
+        self._bundles: dict[str, CachedBundle] = {}
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def get_policy_fingerprint(static_rego_file_path: str) -> str:
+        sha = hashlib.sha256()
+        for file in BundleGenerator.get_static_rego_files(static_rego_file_path):
+            sha.update(file.encode("utf-8"))
+            with open(os.path.join(static_rego_file_path, file), "rb") as f:
+                sha.update(f.read())
+        return sha.hexdigest()[:12]
+
+    def get_etag(self, platform: str, revision: int) -> str:
+        return f"{platform}-{revision}-{self.policy_fingerprint}"
+
+    def get(self, platform: str, revision: int) -> CachedBundle | None:
+        cached_bundle: CachedBundle | None = self._bundles.get(platform)
+        if cached_bundle and cached_bundle.etag == self.get_etag(platform, revision):
+            return cached_bundle
+        return None
+
+    def get_or_build(
+        self, platform: str, revision: int, build: Callable[[], bytes]
+    ) -> CachedBundle:
+        cached_bundle: CachedBundle | None = self.get(platform, revision)
+        if cached_bundle:
+            return cached_bundle
+
+        with self._get_build_lock(platform):
+            # another request may have built it while we waited
+            cached_bundle = self.get(platform, revision)
+            if cached_bundle:
+                return cached_bundle
+
+            logger.info(f"Building bundle for platform {platform} revision {revision}")
+            cached_bundle = CachedBundle(
+                etag=self.get_etag(platform, revision),
+                revision=revision,
+                content=build(),
+            )
+            self._bundles[platform] = cached_bundle
+            return cached_bundle
+
+    def _get_build_lock(self, platform: str) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(platform, threading.Lock())
@@ -1,90 +1,129 @@
-import json
 import os
 import re
-import shutil
-import subprocess
-import uuid
+import tempfile
 from dataclasses import dataclass
+from itertools import groupby
+from typing import IO, Iterable, Iterator
 
 from app_logger import Logger, get_logger
 from repositories import PrincipalRepository, ResourceRepository
+from sqlalchemy import Row
 
 from .bundle_generator_config import BundleGeneratorConfig
+from .bundle_writer import BundleWriter
 
 logger: Logger = get_logger("opa.bundle_generator")
 
 
 @dataclass
 class Bundle:
-    @property
-    def path(self) -> str:
-        return os.path.join(self.directory, self.filename)
+    file: IO[bytes]
+    revision: str
 
-    directory: str
-    filename: str
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
 
 
 class BundleGenerator:
-    def __init__(self, session, platform: str, bundle_name: str):
+    ROOTS: list[str] = ["trino", "moat/trino"]
+
+    # bundles larger than this are spooled to disk in temp_directory
+    SPOOL_MAX_SIZE: int = 64 * 1024 * 1024
+
+    def __init__(self, session, platform: str, bundle_name: str, revision: str = ""):
         self.session = session
         self.platform = platform
         self.bundle_name = bundle_name
+        self.revision = revision
 
         config: BundleGeneratorConfig = BundleGeneratorConfig().load()
-        self.bundle_directory: str = f"{config.temp_directory}/{uuid.uuid4()}"
-        self.data_directory: str = f"{self.bundle_directory}/{bundle_name}"
+        self.temp_directory: str | None = config.temp_directory
         self.static_rego_file_path: str = config.static_rego_file_path
-
-        self.data_file_path: str = os.path.join(
-            self.bundle_directory, f"{bundle_name}", "data.json"
-        )
-        self.manifest_file_path: str = os.path.join(self.bundle_directory, ".manifest")
+        self.page_size: int = int(config.page_size)
+        self.bundle_file: IO[bytes] | None = None
 
     def __enter__(self) -> Bundle:
-        os.makedirs(os.path.join(self.data_directory), exist_ok=True)
-
-        # Copy all .rego files from static_rego_file_path to bundle_directory
-        [
-            shutil.copy(
-                os.path.join(self.static_rego_file_path, file), self.bundle_directory
-            )
-            for file in os.listdir(self.static_rego_file_path)
-            if re.match(rf"(?!.*_test.rego).*\.rego", file)
-        ]
+        self.bundle_file = tempfile.SpooledTemporaryFile(
+            max_size=BundleGenerator.SPOOL_MAX_SIZE, dir=self.temp_directory
+        )
 
-        # write the data file
-        with open(self.data_file_path, "w") as f:
-            f.write(
-                json.dumps(
-                    BundleGenerator.generate_data_object(
-                        session=self.session, platform=self.platform
-                    )
-                )
+        with BundleWriter(fileobj=self.bundle_file) as writer:
+            # data documents are nested under the bundle name, as opa build does for <bundle_name>/data.json
+            writer.write_stream(
+                path="data.json",
+                chunks=BundleGenerator.generate_data_json(
+                    session=self.session,
+                    platform=self.platform,
+                    bundle_name=self.bundle_name,
+                    page_size=self.page_size,
+                ),
+                temp_directory=self.temp_directory,
             )
 
-        # write the manifest file to scope the bundle
-        with open(self.manifest_file_path, "w") as f:
-            f.write(json.dumps({"roots": ["trino", "moat/trino"]}))
+            for file in BundleGenerator.get_static_rego_files(
+                self.static_rego_file_path
+            ):
+                with open(os.path.join(self.static_rego_file_path, file), "rb") as f:
+                    writer.write_module(path=file, raw=f.read())
 
-        # build the bundle
-        result = subprocess.run(
-            ["opa", "build", "-b", "."],  # TODO optimise
-            capture_output=True,
-            text=True,
-            cwd=self.bundle_directory,
-        )
-        if result.returncode != 0:
-            raise ValueError(
-                f"OPA bundler failed with exit code {result.returncode}, Output: {result.stdout}, Error: {result.stderr}"
-            )
+            # the manifest scopes the bundle
+            writer.write_manifest(revision=self.revision, roots=BundleGenerator.ROOTS)
 
         logger.info(
-            f"Generated bundle with output: {result.stdout}  Error: {result.stderr}"
+            f"Generated bundle for platform {self.platform} with revision {self.revision}"
         )
-        return Bundle(directory=self.bundle_directory, filename="bundle.tar.gz")
+        self.bundle_file.seek(0)
+        return Bundle(file=self.bundle_file, revision=self.revision)
 
     def __exit__(self, *args):
-        shutil.rmtree(self.bundle_directory, ignore_errors=True)
+        if self.bundle_file:
+            self.bundle_file.close()
+
+    @staticmethod
+    def get_static_rego_files(static_rego_file_path: str) -> list[str]:
+        return sorted(
+            file
+            for file in os.listdir(static_rego_file_path)
+            if re.match(rf"(?!.*_test.rego).*\.rego", file)
+        )
+
+    @staticmethod
+    def generate_data_json(
+        session, platform: str, bundle_name: str, page_size: int
+    ) -> Iterator[bytes]:
+        """
+        Generates data.json incrementally, so only one page of resources or principals is held in memory
+        The output is identical to BundleWriter.encode_json({bundle_name: generate_data_object(...)})
+        """
+
+        def encode_list(items: Iterator[dict]) -> Iterator[bytes]:
+            yield b"["
+            for index, item in enumerate(items):
+                if index > 0:
+                    yield b","
+                yield BundleWriter.encode_json(item).rstrip(b"\n")
+            yield b"]"
+
+        # keys are written in sorted order, as encode_json does
+        yield BundleWriter.encode_json({bundle_name: {}}).removesuffix(b"{}}\n")
+        yield b'{"data_objects":'
+        yield from encode_list(
+            BundleGenerator._iterate_data_objects(
+                rows=ResourceRepository.stream_all_by_platform_with_attributes(
+                    session=session, platform=platform, page_size=page_size
+                )
+            )
+        )
+        yield b',"principals":'
+        yield from encode_list(
+            BundleGenerator._iterate_principals(
+                rows=PrincipalRepository.stream_all_with_attributes(
+                    session=session, page_size=page_size
+                )
+            )
+        )
+        yield b"}}\n"
 
     @staticmethod
     def generate_data_object(session, platform: str) -> dict:
@@ -100,57 +139,84 @@ class BundleGenerator:
         return {"data_objects": data_objects, "principals": principals}
 
     @staticmethod
-    def _generate_principals_in_data_object(session) -> list[dict]:
-        principal_count, principals = PrincipalRepository.get_all(session=session)
-        logger.info(f"Retrieved {principal_count} principals from the DB")
-
-        principals_dict: list[dict] = []
-        for principal in principals:
-            principals_dict.append(
-                {
-                    "name": principal.user_name,
-                    "attributes": [
-                        {"key": a.attribute_key, "value": a.attribute_value}
-                        for a in principal.attributes
-                    ],
-                }
+    def _generate_principals_in_data_object(
+        session, page_size: int = 1000
+    ) -> list[dict]:
+        principals: list[dict] = list(
+            BundleGenerator._iterate_principals(
+                rows=PrincipalRepository.stream_all_with_attributes(
+                    session=session, page_size=page_size
+                )
             )
-        return principals_dict
+        )
+        logger.info(f"Retrieved {len(principals)} principals from the DB")
+        return principals
 
     @staticmethod
-    def _generate_data_objects_in_data_object(session, platform: str) -> list[dict]:
+    def _iterate_principals(
+        rows: Iterable[Row[tuple[int, str, str, str]]],
+    ) -> Iterator[dict]:
+        """
+        Takes (principal_id, user_name, attribute_key, attribute_value) rows ordered by principal,
+        and yields one principal with its attributes per consecutive group of rows
+        """
+        for _, principal_rows in groupby(rows, key=lambda row: row.principal_id):
+            principal_rows: list[Row] = list(principal_rows)
+            yield {
+                "name": principal_rows[0].user_name,
+                "attributes": BundleGenerator._get_attributes(rows=principal_rows),
+            }
+
+    @staticmethod
+    def _generate_data_objects_in_data_object(
+        session, platform: str, page_size: int = 1000
+    ) -> list[dict]:
         """
         Takes the resources of type "table" from the DB and returns a nested data object optimized for OPA
         """
-        data_objects: list[dict] = []
-        repo: ResourceRepository = ResourceRepository()
+        data_objects: list[dict] = list(
+            BundleGenerator._iterate_data_objects(
+                rows=ResourceRepository.stream_all_by_platform_with_attributes(
+                    session=session, platform=platform, page_size=page_size
+                )
+            )
+        )
+        logger.info(f"Retrieved {len(data_objects)} tables for platform {platform}")
+        return data_objects
 
-        count, resources = repo.get_all_by_platform(session=session, platform=platform)
-        logger.info(f"Retrieved {count} resources for platform {platform}")
+    @staticmethod
+    def _iterate_data_objects(
+        rows: Iterable[Row[tuple[int, str, str, str, str]]],
+    ) -> Iterator[dict]:
+        """
+        Takes (id, fq_name, object_type, attribute_key, attribute_value) rows ordered by fq_name,
+        and groups columns under their table. A table is only yielded once all of its columns are seen
+        """
+        data_object: dict | None = None
 
         # resources are ordered, so the first record will be a table, then columns for that table
-        for resource in resources:
+        for _, resource_rows in groupby(rows, key=lambda row: row.id):
+            resource_rows: list[Row] = list(resource_rows)
+            fq_name: str = resource_rows[0].fq_name
+            object_type: str = resource_rows[0].object_type
+
             # Split the fully qualified name to extract database, schema, and table
-            if resource.object_type == "table":
-                database, schema, table = resource.fq_name.split(".")
-                data_objects.append(
-                    {
-                        "object": {
-                            "database": database,
-                            "schema": schema,
-                            "table": table,
-                        },
-                        "attributes": [
-                            {"key": a.attribute_key, "value": a.attribute_value}
-                            for a in resource.attributes
-                        ],
-                    }
-                )
+            if object_type == "table":
+                if data_object:
+                    yield data_object
+
+                database, schema, table = fq_name.split(".")
+                data_object = {
+                    "object": {
+                        "database": database,
+                        "schema": schema,
+                        "table": table,
+                    },
+                    "attributes": BundleGenerator._get_attributes(rows=resource_rows),
+                }
 
-            if resource.object_type == "column":
-                # the last one will be the one we want to append to, due to ordering
-                data_object: dict = data_objects[-1]
-                column_name: str = re.search(r"([^.]*$)", resource.fq_name).group(1)
+            if object_type == "column":
+                column_name: str = re.search(r"([^.]*$)", fq_name).group(1)
 
                 if not data_object.get("columns"):
                     data_object["columns"] = []
@@ -158,11 +224,20 @@ class BundleGenerator:
                 data_object["columns"].append(
                     {
                         "name": column_name,
-                        "attributes": [
-                            {"key": a.attribute_key, "value": a.attribute_value}
-                            for a in resource.attributes
-                        ],
+                        "attributes": BundleGenerator._get_attributes(
+                            rows=resource_rows
+                        ),
                     }
                 )
 
-        return data_objects
+        if data_object:
+            yield data_object
+
+    @staticmethod
+    def _get_attributes(rows: list[Row]) -> list[dict]:
+        # an entity without attributes is a single outer joined row with no attribute
+        return [
+            {"key": row.attribute_key, "value": row.attribute_value}
+            for row in rows
+            if row.attribute_key is not None
+        ]
@@ -5,3 +5,4 @@ class BundleGeneratorConfig(AppConfigModelBase):
     CONFIG_PREFIX: str = "bundle_generator"
     temp_directory: str = None
     static_rego_file_path: str = "opa/trino"
+    page_size: str = "1000"
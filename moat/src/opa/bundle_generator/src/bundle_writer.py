@@ -0,0 +1,96 @@
+import gzip
+import io
+import json
+import tarfile
+import tempfile
+from typing import IO, Iterable
+
+
+class BundleWriter:
+    """
+    Writes an OPA bundle (gzipped tarball) to a file object, without the `opa` binary
+
+    The layout matches `opa build -b`:
+      /data.json    all data documents, nested under their path in the bundle
+      /<name>.rego  policy modules
+      /.manifest    revision and roots
+
+    Usage:
+
+    with BundleWriter(fileobj=f) as writer:
+        writer.write_data(data={"trino": {...}})
+        writer.write_module(path="common.rego", raw=b"package moat.trino ...")
+        writer.write_manifest(revision="1", roots=["trino"])
+    """
+
+    def __init__(self, fileobj: IO[bytes]):
+        # mtime is fixed so that the same content always produces the same bytes
+        self._gzip_file: gzip.GzipFile = gzip.GzipFile(
+            fileobj=fileobj, mode="wb", mtime=0
+        )
+        self._tar_file: tarfile.TarFile = tarfile.open(
+            fileobj=self._gzip_file, mode="w", format=tarfile.USTAR_FORMAT
+        )
+
+    def __enter__(self) -> "BundleWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self._tar_file.close()
+        self._gzip_file.close()
+
+    @staticmethod
+    def encode_json(value) -> bytes:
+        """
+        Encodes a value the way OPA (go encoding/json) writes data.json and .manifest:
+        compact, sorted keys, HTML characters escaped, trailing newline
+        Escaping after dumping is safe as these characters can only occur inside strings
+        """
+        encoded: str = (
+            json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+            .replace("<", "\\u003c")
+            .replace(">", "\\u003e")
+            .replace("&", "\\u0026")
+            .replace("\u2028", "\\u2028")
+            .replace("\u2029", "\\u2029")
+        )
+        return f"{encoded}\n".encode("utf-8")
+
+    def write_file(self, path: str, fileobj: IO[bytes], size: int) -> None:
+        tar_info: tarfile.TarInfo = tarfile.TarInfo(name=f"/{path.lstrip('/')}")
+        tar_info.size = size
+        tar_info.mode = 0o600
+        tar_info.mtime = 0
+        self._tar_file.addfile(tar_info, fileobj)
+
+    def write_bytes(self, path: str, content: bytes) -> None:
+        self.write_file(path=path, fileobj=io.BytesIO(content), size=len(content))
+
+    def write_stream(
+        self, path: str, chunks: Iterable[bytes], temp_directory: str = None
+    ) -> None:
+        """
+        Writes a file whose size is not known up front, e.g. a data.json generated incrementally
+        The tar header needs the size, so chunks are spooled to a temporary file first
+        """
+        with tempfile.TemporaryFile(dir=temp_directory) as spool_file:
+            for chunk in chunks:
+                spool_file.write(chunk)
+            size: int = spool_file.tell()
+            spool_file.seek(0)
+            self.write_file(path=path, fileobj=spool_file, size=size)
+
+    def write_data(self, data: dict) -> None:
+        self.write_bytes(path="data.json", content=BundleWriter.encode_json(data))
+
+    def write_module(self, path: str, raw: bytes) -> None:
+        self.write_bytes(path=path, content=raw)
+
+    def write_manifest(self, revision: str, roots: list[str]) -> None:
+        self.write_bytes(
+            path=".manifest",
+            content=BundleWriter.encode_json({"revision": revision, "roots": roots}),
+        )
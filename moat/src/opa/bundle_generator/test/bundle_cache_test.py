@@ -0,0 +1,36 @@
+from unittest import mock
+
+from ..src.bundle_cache import BundleCache
+
+
+def test_get_or_build():
+    bundle_cache: BundleCache = BundleCache()
+    build: mock.MagicMock = mock.MagicMock(side_effect=[b"bundle-1", b"bundle-2"])
+
+    bundle = bundle_cache.get_or_build(platform="trino", revision=1, build=build)
+    assert bundle.content == b"bundle-1"
+    assert bundle.etag == f"trino-1-{bundle_cache.policy_fingerprint}"
+
+    # same revision is served from the cache
+    bundle = bundle_cache.get_or_build(platform="trino", revision=1, build=build)
+    assert bundle.content == b"bundle-1"
+    assert build.call_count == 1
+
+    # new revision replaces the cached bundle
+    bundle = bundle_cache.get_or_build(platform="trino", revision=2, build=build)
+    assert bundle.content == b"bundle-2"
+    assert build.call_count == 2
+    assert bundle_cache.get(platform="trino", revision=1) is None
+
+
+def test_get_policy_fingerprint(tmp_path):
+    (tmp_path / "common.rego").write_text("package moat.trino")
+    (tmp_path / "common_test.rego").write_text("package moat.trino_test")
+    fingerprint: str = BundleCache.get_policy_fingerprint(str(tmp_path))
+
+    # test files are not part of the bundle
+    (tmp_path / "common_test.rego").write_text("package moat.trino_test_2")
+    assert BundleCache.get_policy_fingerprint(str(tmp_path)) == fingerprint
+
+    (tmp_path / "common.rego").write_text("package moat.trino_2")
+    assert BundleCache.get_policy_fingerprint(str(tmp_path)) != fingerprint
@@ -1,20 +1,26 @@
 import json
-import os
-import subprocess
+import tarfile
 
 from database import Database
+from sqlalchemy import event
 
 from ..src.bundle_generator import BundleGenerator
 
 
-def test_generate_bundle(tmp_path, database: Database):
+def test_generate_bundle(database: Database):
     with database.Session() as session:
         with BundleGenerator(
-            session=session, platform="trino", bundle_name="trino"
+            session=session, platform="trino", bundle_name="trino", revision="rev-1"
         ) as bundle:
-            subprocess.run(["tar", "-xf", bundle.path], cwd=tmp_path)
-        bundle_files: list[str] = sorted(os.listdir(tmp_path))
-        assert bundle_files == [".manifest", "common.rego", "data.json"]
+            with tarfile.open(fileobj=bundle.file, mode="r:gz") as tar_file:
+                bundle_files: list[str] = sorted(tar_file.getnames())
+                manifest: dict = json.load(tar_file.extractfile("/.manifest"))
+                data: dict = json.load(tar_file.extractfile("/data.json"))
+
+        assert bundle_files == ["/.manifest", "/common.rego", "/data.json"]
+        assert manifest == {"revision": "rev-1", "roots": ["trino", "moat/trino"]}
+        assert list(data.keys()) == ["trino"]
+        assert list(data["trino"].keys()) == ["data_objects", "principals"]
 
 
 def test_generate_data_object(database: Database):
@@ -68,3 +74,47 @@ def test_generate_data_objects_in_data_object(database: Database):
     assert sorted(actual, key=lambda e: e.get("object").get("table")) == sorted(
         expected, key=lambda e: e.get("object").get("table")
     )
+
+
+def test_generate_data_json(database: Database):
+    with database.Session() as session:
+        expected: dict = BundleGenerator.generate_data_object(
+            session=session, platform="trino"
+        )
+
+        # a small page size forces several round trips to the server-side cursor
+        actual_json: bytes = b"".join(
+            BundleGenerator.generate_data_json(
+                session=session, platform="trino", bundle_name="trino", page_size=2
+            )
+        )
+
+    assert actual_json.endswith(b"}}\n")
+    actual: dict = json.loads(actual_json)
+    assert list(actual.keys()) == ["trino"]
+    assert list(actual["trino"].keys()) == ["data_objects", "principals"]
+    assert actual["trino"]["data_objects"] == expected["data_objects"]
+    assert sorted(actual["trino"]["principals"], key=lambda e: e["name"]) == sorted(
+        expected["principals"], key=lambda e: e["name"]
+    )
+
+
+def test_generate_data_json_query_count(database: Database):
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with database.Session() as session:
+            b"".join(
+                BundleGenerator.generate_data_json(
+                    session=session, platform="trino", bundle_name="trino", page_size=2
+                )
+            )
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+
+    # one query for resources and one for principals, regardless of the number of rows
+    assert len(statements) == 2
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+
+import pytest
+
+from ..src.bundle_writer import BundleWriter
+
+REGO_FILE_PATH: str = "moat/test/test_data/rego/common.rego"
+DATA: dict = {
+    "trino": {
+        "data_objects": [
+            {
+                "object": {
+                    "database": "datalake",
+                    "schema": "hr",
+                    "table": "employees",
+                },
+                "attributes": [{"key": "HR", "value": "Privacy & <Restricted>"}],
+            }
+        ],
+        "principals": [
+            {"name": "ahmet.akyüz", "attributes": [{"key": "ad_group", "value": "x"}]}
+        ],
+    }
+}
+
+
+def write_bundle(revision: str) -> bytes:
+    fileobj: io.BytesIO = io.BytesIO()
+    with BundleWriter(fileobj=fileobj) as writer:
+        writer.write_data(data=DATA)
+        with open(REGO_FILE_PATH, "rb") as f:
+            writer.write_module(path="common.rego", raw=f.read())
+        writer.write_manifest(revision=revision, roots=["trino", "moat/trino"])
+    return fileobj.getvalue()
+
+
+def read_bundle(content: bytes) -> dict[str, bytes]:
+    with tarfile.open(fileobj=io.BytesIO(content), mode="r:gz") as tar_file:
+        return {
+            member.name: tar_file.extractfile(member).read()
+            for member in tar_file.getmembers()
+            if member.isfile()
+        }
+
+
+def test_encode_json():
+    assert BundleWriter.encode_json({"b": 1, "a": ["<&>"]}) == (
+        b'{"a":["\\u003c\\u0026\\u003e"],"b":1}\n'
+    )
+    assert BundleWriter.encode_json({"name": "ahmet.akyüz"}) == (
+        '{"name":"ahmet.akyüz"}\n'.encode("utf-8")
+    )
+
+
+def test_write_bundle():
+    content: bytes = write_bundle(revision="rev-1")
+    files: dict[str, bytes] = read_bundle(content)
+
+    # same ordering as opa build
+    assert list(files.keys()) == ["/data.json", "/common.rego", "/.manifest"]
+    assert json.loads(files["/data.json"]) == DATA
+    assert json.loads(files["/.manifest"]) == {
+        "revision": "rev-1",
+        "roots": ["trino", "moat/trino"],
+    }
+    with open(REGO_FILE_PATH, "rb") as f:
+        assert files["/common.rego"] == f.read()
+
+    # output is reproducible, so the same content always has the same bytes
+    assert write_bundle(revision="rev-1") == content
+
+
+def test_write_stream():
+    fileobj: io.BytesIO = io.BytesIO()
+    with BundleWriter(fileobj=fileobj) as writer:
+        writer.write_stream(path="data.json", chunks=iter([b'{"trino":', b"{}}\n"]))
+
+    assert read_bundle(fileobj.getvalue()) == {"/data.json": b'{"trino":{}}\n'}
+
+
+@pytest.mark.skipif(shutil.which("opa") is None, reason="opa binary not installed")
+def test_write_bundle_matches_opa_build(tmp_path):
+    os.makedirs(tmp_path / "trino")
+    with open(tmp_path / "trino" / "data.json", "w") as f:
+        json.dump(DATA["trino"], f)
+    shutil.copy(REGO_FILE_PATH, tmp_path)
+    with open(tmp_path / ".manifest", "w") as f:
+        json.dump({"roots": ["trino", "moat/trino"]}, f)
+
+    subprocess.run(
+        ["opa", "build", "-b", ".", "--revision", "rev-1"],
+        cwd=tmp_path,
+        check=True,
+        capture_output=True,
+    )
+    with open(tmp_path / "bundle.tar.gz", "rb") as f:
+        expected: dict[str, bytes] = read_bundle(f.read())
+
+    actual: dict[str, bytes] = read_bundle(write_bundle(revision="rev-1"))
+
+    assert sorted(actual.keys()) == sorted(expected.keys())
+    assert actual["/data.json"] == expected["/data.json"]
+    assert actual["/common.rego"] == expected["/common.rego"]
+
+    # opa may add optional keys (e.g. rego_version) to the manifest
+    expected_manifest: dict = json.loads(expected["/.manifest"])
+    assert json.loads(actual["/.manifest"]) == {
+        "revision": expected_manifest["revision"],
+        "roots": expected_manifest["roots"],
+    }
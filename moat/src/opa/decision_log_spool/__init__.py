@@ -0,0 +1,5 @@
+from .src.decision_log_spool import (
+    DecisionLogSpool,
+    DecisionLogSpoolFullError,
+    DecisionLogSpoolWriter,
+)
@@ -0,0 +1,308 @@
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+
+from app_logger import Logger, get_logger
+from database import Database
+from repositories import DecisionLogInsertResult, DecisionLogRepository
+from sqlalchemy import text
+
+from .decision_log_spool_config import DecisionLogSpoolConfig
+
+logger: Logger = get_logger("opa.decision_log_spool")
+
+
+class DecisionLogSpoolFullError(Exception):
+    pass
+
+
+class DecisionLogSpool:
+    """
+    A durable on-disk queue of decision log uploads, between the decision log API and the database
+
+    Uploads are kept as OPA sent them (gzipped JSON arrays), one file per upload:
+      tmp/      files being written
+      ready/    complete uploads, moved here by an atomic rename once written and synced
+      claimed/  uploads being written to the database by a drainer
+      failed/   uploads which could not be read or written, kept for inspection
+
+    Drainers claim a file by renaming it into claimed/, so several threads or processes can
+    drain the same spool. A file is only removed once its decision logs are committed, and claims
+    left behind by a drainer which died are returned to ready/ after the claim timeout
+
+    When a batch fails to write while the database is available, each upload is written on its
+    own, so one bad upload does not hold back the others. An upload which fails is returned to
+    ready/ with its attempt count in its name, <time>-<id>.<attempts>.json.gz, and is moved to
+    failed/ after max_attempts
+    """
+
+    def __init__(self, directory: str = None):
+        self.config: DecisionLogSpoolConfig = DecisionLogSpoolConfig.load()
+        self.directory: str = directory or self.config.directory
+        self.max_bytes: int = int(self.config.max_bytes)
+        self.batch_size: int = int(self.config.batch_size)
+        self.max_attempts: int = int(self.config.max_attempts)
+        for path in [
+            self.tmp_path,
+            self.ready_path,
+            self.claimed_path,
+            self.failed_path,
+        ]:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(DecisionLogSpoolConfig.load().directory)
+
+    @property
+    def tmp_path(self) -> str:
+        return os.path.join(self.directory, "tmp")
+
+    @property
+    def ready_path(self) -> str:
+        return os.path.join(self.directory, "ready")
+
+    @property
+    def claimed_path(self) -> str:
+        return os.path.join(self.directory, "claimed")
+
+    @property
+    def failed_path(self) -> str:
+        return os.path.join(self.directory, "failed")
+
+    def get_size(self) -> int:
+        """
+        The bytes of uploads waiting to be written, ready or claimed
+        """
+        size: int = 0
+        for path in [self.ready_path, self.claimed_path]:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        size += entry.stat().st_size
+                    except FileNotFoundError:
+                        # removed by a drainer since it was listed
+                        pass
+        return size
+
+    def put(self, payload: bytes) -> str:
+        """
+        Spools an upload, and returns its file name once it is durably on disk
+        Raises DecisionLogSpoolFullError when the spool would exceed max_bytes
+        """
+        if self.get_size() + len(payload) > self.max_bytes:
+            raise DecisionLogSpoolFullError(
+                f"Decision log spool {self.directory} is full ({self.max_bytes} bytes)"
+            )
+
+        # names sort in arrival order, so uploads are drained oldest first
+        file_name: str = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json.gz"
+        tmp_file_path: str = os.path.join(self.tmp_path, file_name)
+        with open(tmp_file_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_file_path, os.path.join(self.ready_path, file_name))
+        self._fsync_directory(self.ready_path)
+        return file_name
+
+    def drain_batch(self, database: Database) -> int:
+        """
+        Claims uploads, oldest first, until batch_size decision logs are read, writes them in one
+        transaction and removes the uploads. Returns the number of decision logs read from the
+        uploads written, including duplicates and rejected ones, 0 once nothing was written.
+        Writing an upload again skips the decision logs already stored.
+        If the batch fails and the database is unavailable, the uploads are returned to ready/ and
+        the error is raised, otherwise each upload is written on its own
+        """
+        uploads: dict[str, list[dict]] = {}
+        decision_log_count: int = 0
+        for file_name in sorted(os.listdir(self.ready_path)):
+            if decision_log_count >= self.batch_size:
+                break
+            if not self._claim(file_name=file_name):
+                continue
+            try:
+                uploads[file_name] = self._read(file_name=file_name)
+            except (OSError, EOFError, ValueError) as e:
+                logger.error(f"Moving unreadable decision log upload {file_name}: {e}")
+                self._fail(file_name=file_name)
+                continue
+            decision_log_count += len(uploads[file_name])
+
+        if not uploads:
+            return 0
+
+        try:
+            self._write(
+                database=database,
+                file_names=list(uploads),
+                decision_logs=[d for logs in uploads.values() for d in logs],
+            )
+            return decision_log_count
+        except Exception as e:
+            if not self._is_database_available(database=database):
+                for file_name in uploads:
+                    self._release(file_name=file_name)
+                raise
+            logger.warning(
+                f"Failed to write a batch of {len(uploads)} decision log uploads, "
+                f"writing them one at a time: {e}"
+            )
+
+        decision_log_count = 0
+        for file_name, decision_logs in uploads.items():
+            try:
+                self._write(
+                    database=database,
+                    file_names=[file_name],
+                    decision_logs=decision_logs,
+                )
+                decision_log_count += len(decision_logs)
+            except Exception as e:
+                logger.error(f"Failed to write decision log upload {file_name}: {e}")
+                self._retry(file_name=file_name)
+        return decision_log_count
+
+    def drain(self, database: Database) -> int:
+        """
+        Drains batches until the spool is empty or a batch writes nothing, and returns the number
+        of decision logs written
+        """
+        count: int = 0
+        while batch_count := self.drain_batch(database=database):
+            count += batch_count
+        return count
+
+    def recover_stale_claims(self) -> int:
+        """
+        Returns claims older than the claim timeout to ready/, e.g. from a drainer which was killed
+        """
+        stale_before: float = time.time() - int(self.config.claim_timeout)
+        count: int = 0
+        for file_name in os.listdir(self.claimed_path):
+            try:
+                if (
+                    os.stat(os.path.join(self.claimed_path, file_name)).st_mtime
+                    < stale_before
+                ):
+                    self._release(file_name=file_name)
+                    count += 1
+            except FileNotFoundError:
+                pass
+        if count:
+            logger.warning(f"Returned {count} stale decision log claims to the spool")
+        return count
+
+    def _write(
+        self, database: Database, file_names: list[str], decision_logs: list[dict]
+    ) -> None:
+        with database.Session.begin() as session:
+            result: DecisionLogInsertResult = DecisionLogRepository.create_bulk(
+                session=session, decision_logs=decision_logs
+            )
+            session.commit()
+
+        for file_name in file_names:
+            os.remove(os.path.join(self.claimed_path, file_name))
+        logger.info(
+            f"Wrote {result.accepted} decision logs from {len(file_names)} uploads, "
+            f"{result.duplicate} duplicates and {result.rejected} rejected"
+        )
+
+    @staticmethod
+    def _is_database_available(database: Database) -> bool:
+        try:
+            with database.Session.begin() as session:
+                session.execute(text("select 1"))
+            return True
+        except Exception:
+            return False
+
+    def _claim(self, file_name: str) -> bool:
+        claimed_file_path: str = os.path.join(self.claimed_path, file_name)
+        try:
+            os.rename(os.path.join(self.ready_path, file_name), claimed_file_path)
+        except FileNotFoundError:
+            # claimed by another drainer
+            return False
+        # the claim timeout runs from when it was claimed, not when it was spooled
+        os.utime(claimed_file_path)
+        return True
+
+    def _release(self, file_name: str) -> None:
+        os.rename(
+            os.path.join(self.claimed_path, file_name),
+            os.path.join(self.ready_path, file_name),
+        )
+
+    def _retry(self, file_name: str) -> None:
+        # <time>-<id>.json.gz on the first attempt, <time>-<id>.<attempts>.json.gz after
+        parts: list[str] = file_name.split(".")
+        attempts: int = (int(parts[1]) if len(parts) == 4 else 0) + 1
+        if attempts >= self.max_attempts:
+            logger.error(
+                f"Moving decision log upload {file_name} after {attempts} failed attempts"
+            )
+            self._fail(file_name=file_name)
+            return
+        os.rename(
+            os.path.join(self.claimed_path, file_name),
+            os.path.join(self.ready_path, f"{parts[0]}.{attempts}.json.gz"),
+        )
+
+    def _fail(self, file_name: str) -> None:
+        os.rename(
+            os.path.join(self.claimed_path, file_name),
+            os.path.join(self.failed_path, file_name),
+        )
+
+    def _read(self, file_name: str) -> list[dict]:
+        with gzip.open(os.path.join(self.claimed_path, file_name), "rb") as f:
+            decision_logs = json.load(f)
+        if not isinstance(decision_logs, list):
+            raise ValueError("Decision log upload is not a list")
+        return decision_logs
+
+    @staticmethod
+    def _fsync_directory(path: str) -> None:
+        # makes the rename itself durable
+        fd: int = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class DecisionLogSpoolWriter(threading.Thread):
+    """
+    Drains the spool into the database, then polls it every poll_interval seconds
+    Runs as a daemon thread of the API server, or in the foreground of the CLI worker
+    """
+
+    def __init__(self, spool: DecisionLogSpool, database: Database):
+        super().__init__(name="decision_log_spool_writer", daemon=True)
+        self.spool: DecisionLogSpool = spool
+        self.database: Database = database
+        self.poll_interval: float = float(spool.config.poll_interval)
+        self.stopped: threading.Event = threading.Event()
+
+    def run_once(self) -> int:
+        self.spool.recover_stale_claims()
+        return self.spool.drain(database=self.database)
+
+    def run(self) -> None:
+        logger.info(f"Writing decision logs from {self.spool.directory}")
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # e.g the database is unavailable, uploads stay spooled until the next poll
+                logger.error(f"Failed to write spooled decision logs: {e}")
+            self.stopped.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self.stopped.set()
@@ -0,0 +1,12 @@
+from app_config import AppConfigModelBase
+
+
+class DecisionLogSpoolConfig(AppConfigModelBase):
+    CONFIG_PREFIX: str = "decision_log_spool"
+    directory: str = None
+    max_bytes: str = "1073741824"
+    batch_size: str = "10000"
+    poll_interval: str = "1"
+    claim_timeout: str = "300"
+    max_attempts: str = "3"
+    writer_threads: str = "1"
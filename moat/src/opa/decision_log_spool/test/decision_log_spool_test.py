@@ -0,0 +1,141 @@
+import gzip
+import json
+import os
+from unittest import mock
+
+import pytest
+from database import Database
+from models import DecisionLogDbo
+from repositories import DecisionLogRepository
+
+from ..src.decision_log_spool import (
+    DecisionLogSpool,
+    DecisionLogSpoolFullError,
+    DecisionLogSpoolWriter,
+)
+
+
+def make_upload(decision_ids: list[str], user: str = "alice") -> bytes:
+    return gzip.compress(
+        json.dumps(
+            [
+                {
+                    "decision_id": decision_id,
+                    "path": "moat/trino/allow",
+                    "input": {
+                        "action": {"operation": "ExecuteQuery"},
+                        "context": {"identity": {"user": user}},
+                    },
+                    "result": True,
+                    "timestamp": "2025-09-04T22:53:16.320877389Z",
+                }
+                for decision_id in decision_ids
+            ]
+        ).encode("utf-8")
+    )
+
+
+def get_decision_log_ids(database: Database) -> list[str]:
+    with database.Session.begin() as session:
+        return sorted(d.decision_log_id for d in session.query(DecisionLogDbo).all())
+
+
+def test_put_and_drain(database_empty: Database, tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    spool.batch_size = 3
+    spool.put(payload=make_upload(["spool-1", "spool-2"]))
+    spool.put(payload=make_upload(["spool-3", "spool-4"]))
+    spool.put(payload=make_upload(["spool-5"]))
+
+    assert len(os.listdir(spool.ready_path)) == 3
+    assert os.listdir(spool.tmp_path) == []
+    assert spool.get_size() > 0
+
+    # the first batch takes uploads until it has at least batch_size decision logs
+    assert spool.drain_batch(database=database_empty) == 4
+    assert len(os.listdir(spool.ready_path)) == 1
+    assert spool.drain(database=database_empty) == 1
+
+    assert spool.get_size() == 0
+    assert os.listdir(spool.claimed_path) == []
+    assert get_decision_log_ids(database=database_empty) == [
+        "spool-1",
+        "spool-2",
+        "spool-3",
+        "spool-4",
+        "spool-5",
+    ]
+
+
+def test_put_full(tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    upload: bytes = make_upload(["full-1"])
+    spool.max_bytes = len(upload) * 2
+
+    spool.put(payload=upload)
+    spool.put(payload=upload)
+    with pytest.raises(DecisionLogSpoolFullError):
+        spool.put(payload=upload)
+    assert len(os.listdir(spool.ready_path)) == 2
+
+
+def test_drain_unreadable_upload(database_empty: Database, tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    spool.put(payload=b"not gzip")
+    spool.put(payload=make_upload(["unreadable-1"]))
+
+    # the unreadable upload is set aside, the rest are written
+    assert spool.drain(database=database_empty) == 1
+    assert len(os.listdir(spool.failed_path)) == 1
+    assert "unreadable-1" in get_decision_log_ids(database=database_empty)
+
+
+def test_drain_write_failure(database_empty: Database, tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    spool.put(payload=make_upload(["retry-1"]))
+
+    with mock.patch.object(
+        DecisionLogRepository, "create_bulk", side_effect=RuntimeError("db is down")
+    ), mock.patch.object(
+        DecisionLogSpool, "_is_database_available", return_value=False
+    ):
+        with pytest.raises(RuntimeError):
+            spool.drain_batch(database=database_empty)
+
+    # the upload is returned to the spool and written on the next drain
+    assert len(os.listdir(spool.ready_path)) == 1
+    assert os.listdir(spool.claimed_path) == []
+    assert DecisionLogSpoolWriter(spool=spool, database=database_empty).run_once() == 1
+    assert "retry-1" in get_decision_log_ids(database=database_empty)
+
+
+def test_drain_failing_upload(database_empty: Database, tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    spool.max_attempts = 2
+    spool.put(payload=make_upload(["failing-1"], user="nul\u0000"))
+    spool.put(payload=make_upload(["failing-2"]))
+
+    # the batch fails on the NUL, the other upload is still written on its own
+    assert spool.drain_batch(database=database_empty) == 1
+    assert "failing-2" in get_decision_log_ids(database=database_empty)
+    assert [f.split(".")[1] for f in os.listdir(spool.ready_path)] == ["1"]
+
+    # the failing upload is set aside after max_attempts, instead of blocking the spool
+    assert spool.drain_batch(database=database_empty) == 0
+    assert os.listdir(spool.ready_path) == []
+    assert os.listdir(spool.claimed_path) == []
+    assert len(os.listdir(spool.failed_path)) == 1
+    assert "failing-1" not in get_decision_log_ids(database=database_empty)
+
+
+def test_recover_stale_claims(tmp_path):
+    spool: DecisionLogSpool = DecisionLogSpool(directory=str(tmp_path))
+    file_name: str = spool.put(payload=make_upload(["stale-1"]))
+    assert spool._claim(file_name=file_name)
+
+    # a fresh claim belongs to a running drainer
+    assert spool.recover_stale_claims() == 0
+
+    os.utime(os.path.join(spool.claimed_path, file_name), (0, 0))
+    assert spool.recover_stale_claims() == 1
+    assert os.listdir(spool.ready_path) == [file_name]
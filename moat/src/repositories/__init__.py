@@ -1,6 +1,10 @@
-from .src.decision_log_repository import DecisionLogRepository
+from .src.bundle_revision_repository import BundleRevisionRepository
+from .src.decision_log_repository import (
+    DecisionLogInsertResult,
+    DecisionLogRepository,
+)
 from .src.ingestion_process_repository import IngestionProcessRepository
 
 from .src.principal_repository import PrincipalRepository
-from .src.repository_base import RepositoryBase
+from .src.repository_base import KeyRange, MergeResult, RepositoryBase
 from .src.resource_repository import ResourceRepository
@@ -0,0 +1,31 @@
+from models import BundleRevisionDbo
+from sqlalchemy import func
+
+from .repository_base import RepositoryBase
+
+
+class BundleRevisionRepository(RepositoryBase):
+
+    @staticmethod
+    def get_current_revision(session) -> int:
+        """
+        Returns the latest revision, or 0 if the data has never changed
+        Index-only lookup on the primary key, cheap enough to run on every bundle request
+        """
+        revision: int | None = session.query(
+            func.max(BundleRevisionDbo.bundle_revision_id)
+        ).scalar()
+        return revision or 0
+
+    @staticmethod
+    def create(session, source: str) -> int:
+        """
+        Records a change to bundle data, invalidating cached bundles
+        Should be called in the same transaction as the change itself
+        """
+        bundle_revision_dbo: BundleRevisionDbo = BundleRevisionDbo()
+        bundle_revision_dbo.source = source
+
+        session.add(bundle_revision_dbo)
+        session.flush()
+        return bundle_revision_dbo.bundle_revision_id
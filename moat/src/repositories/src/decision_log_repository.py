@@ -1,14 +1,24 @@
+from dataclasses import dataclass
 from datetime import datetime
+from textwrap import dedent
 from typing import Tuple
 
 from app_logger import Logger, get_logger
 from models import DecisionLogDbo
+from sqlalchemy.sql import text
 
 from .repository_base import RepositoryBase
 
 logger: Logger = get_logger("repositories.decision_log")
 
 
+@dataclass
+class DecisionLogInsertResult:
+    accepted: int = 0
+    duplicate: int = 0
+    rejected: int = 0
+
+
 class DecisionLogRepository(RepositoryBase):
 
     @staticmethod
@@ -39,43 +49,96 @@ class DecisionLogRepository(RepositoryBase):
         )
 
     @staticmethod
-    def create_bulk(session, decision_logs: list[dict]):
-        decision_log_dbos: list[DecisionLogDbo] = []
+    def create_bulk(session, decision_logs: list[dict]) -> DecisionLogInsertResult:
+        """
+        Copies the decision logs into a temporary table and inserts them from there, skipping
+        decision log IDs already stored, so a batch OPA retries is not rejected as a whole.
+        Returns how many decision logs were inserted, skipped as duplicates, and rejected
+        as invalid or ignored
+        """
+        result: DecisionLogInsertResult = DecisionLogInsertResult()
+        rows: list[dict] = []
         for decision_log in decision_logs:
             try:
-                decision_log_dbos.append(
-                    DecisionLogRepository.create(decision_log=decision_log)
-                )
-            except AttributeError as e:
+                rows.append(DecisionLogRepository.get_row(decision_log=decision_log))
+            except (AttributeError, KeyError, TypeError) as e:
+                result.rejected += 1
                 logger.error(
                     f"Decision log failed to create: {decision_log} with error: {e}"
                 )
             except ValueError as e:
+                result.rejected += 1
                 logger.info(f"Ignoring decision log: {decision_log} because: {e}")
+        if not rows:
+            return result
 
-        session.add_all(decision_log_dbos)
+        # table and column are reserved words, so columns are quoted
+        columns: list[str] = [c.name for c in DecisionLogDbo.__table__.columns]
+        column_list: str = ", ".join(f'"{column}"' for column in columns)
+        session.execute(
+            text(
+                "create temp table decision_logs_load (like decision_logs) on commit drop"
+            )
+        )
+        driver_connection = session.connection().connection.driver_connection
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(
+                f"copy decision_logs_load ({column_list}) from stdin"
+            ) as copy:
+                for row in rows:
+                    copy.write_row([row[column] for column in columns])
+        result.accepted = session.execute(
+            text(
+                dedent(
+                    f"""
+                insert into decision_logs ({column_list})
+                select {column_list} from decision_logs_load
+                on conflict (decision_log_id) do nothing
+                """
+                )
+            )
+        ).rowcount
+        session.execute(text("drop table decision_logs_load"))
+        result.duplicate = len(rows) - result.accepted
+
+        logger.info(
+            f"Inserted {result.accepted} decision logs, skipped {result.duplicate} duplicates "
+            f"and rejected {result.rejected}"
+        )
+        return result
 
     @staticmethod
     def create(decision_log: dict) -> DecisionLogDbo:
+        return DecisionLogDbo(
+            **DecisionLogRepository.get_row(decision_log=decision_log)
+        )
+
+    @staticmethod
+    def get_row(decision_log: dict) -> dict:
+        """
+        The decision_logs column values of an OPA decision log
+        """
         # drop query logs, we dont want them
         if "query" in decision_log:
             raise ValueError("Query decision logs are not to be ingested")
+        if not decision_log.get("decision_id"):
+            raise KeyError("decision_id")
 
         _input: dict = decision_log.get("input", {})
         action: dict = _input.get("action", {})
         context: dict = _input.get("context", {})
         resource: dict = action.get("resource", {})
 
-        decision_log_dbo = DecisionLogDbo()
-        decision_log_dbo.decision_log_id = decision_log.get("decision_id")
-        decision_log_dbo.path = decision_log.get("path", "")
-        decision_log_dbo.operation = action.get("operation", "")
-        decision_log_dbo.username = context.get("identity", {}).get("user", "")
-        decision_log_dbo.timestamp = datetime.fromisoformat(
-            decision_log.get("timestamp")
+        row: dict = dict.fromkeys(
+            [c.name for c in DecisionLogDbo.__table__.columns], None
         )
+        row["decision_log_id"] = decision_log.get("decision_id")
+        row["path"] = decision_log.get("path", "")
+        row["operation"] = action.get("operation", "")
+        row["username"] = context.get("identity", {}).get("user", "")
+        row["timestamp"] = datetime.fromisoformat(decision_log.get("timestamp"))
 
-        if decision_log_dbo.operation in [
+        if row["operation"] in [
             "GetColumnMask",
             "SelectFromColumns",
             "FilterTables",
@@ -95,20 +158,18 @@ class DecisionLogRepository(RepositoryBase):
                 | resource.get("table", {})
                 | resource.get("schema", {})
             )
-            decision_log_dbo.database = data_object.get("catalogName", "")
-            decision_log_dbo.schema = data_object.get("schemaName", "")
-            decision_log_dbo.table = data_object.get("tableName", "")
-            decision_log_dbo.column = data_object.get("columnName", None) or ", ".join(
+            row["database"] = data_object.get("catalogName", "")
+            row["schema"] = data_object.get("schemaName", "")
+            row["table"] = data_object.get("tableName", "")
+            row["column"] = data_object.get("columnName", None) or ", ".join(
                 data_object.get("columns", [])
             )
-        elif decision_log_dbo.operation in ["AccessCatalog", "FilterCatalogs"]:
-            decision_log_dbo.database = resource.get("catalog", {}).get("name", "")
+        elif row["operation"] in ["AccessCatalog", "FilterCatalogs"]:
+            row["database"] = resource.get("catalog", {}).get("name", "")
 
         # result can be an object or a bool
         if isinstance(decision_log.get("result", False), bool):
-            decision_log_dbo.permitted = decision_log.get("result", None)
+            row["permitted"] = decision_log.get("result", None)
         else:
-            decision_log_dbo.expression = decision_log.get("result", {}).get(
-                "expression", ""
-            )
-        return decision_log_dbo
+            row["expression"] = decision_log.get("result", {}).get("expression", "")
+        return row
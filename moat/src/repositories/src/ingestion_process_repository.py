@@ -15,10 +15,12 @@ class IngestionProcessRepository(RepositoryBase):
         return query.count(), query.all()
 
     @staticmethod
-    def create(session, object_types: list[ObjectTypeEnum], source: str) -> int:
+    def create(
+        session, object_types: list[ObjectTypeEnum], source: str, platform: str = None
+    ) -> int:
         ingestion_process_dbo: IngestionProcessDbo = IngestionProcessDbo()
         ingestion_process_dbo.source = source
-        ingestion_process_dbo.status = "in_progress"
+        ingestion_process_dbo.platform = platform
         ingestion_process_dbo.started_at = datetime.datetime.now(datetime.UTC)
         ingestion_process_dbo.object_type = ",".join([o.value for o in object_types])
 
@@ -36,7 +38,59 @@ class IngestionProcessRepository(RepositoryBase):
         return ingestion_process_dbo
 
     @staticmethod
-    def complete_process(session, ingestion_process_id: int) -> None:
+    def get_last_watermark(
+        session, source: str, platform: str, object_types: list[ObjectTypeEnum]
+    ) -> str | None:
+        """
+        Returns the high-water mark of the latest completed ingestion of these object types
+        from this source and platform, or None if there is none
+        """
+        ingestion_process_dbo: IngestionProcessDbo = (
+            session.query(IngestionProcessDbo)
+            .filter(
+                IngestionProcessDbo.source == source,
+                IngestionProcessDbo.platform == platform,
+                IngestionProcessDbo.object_type
+                == ",".join([o.value for o in object_types]),
+                IngestionProcessDbo.status == "complete",
+                IngestionProcessDbo.watermark.is_not(None),
+            )
+            .order_by(IngestionProcessDbo.ingestion_process_id.desc())
+            .first()
+        )
+        return ingestion_process_dbo.watermark if ingestion_process_dbo else None
+
+    @staticmethod
+    def set_watermark(session, ingestion_process_id: int, watermark: str) -> None:
+        ingestion_process_dbo: IngestionProcessDbo = (
+            IngestionProcessRepository.get_by_id(
+                session=session, ingestion_process_id=ingestion_process_id
+            )
+        )
+        ingestion_process_dbo.watermark = watermark
+
+    @staticmethod
+    def get_recent(
+        session, limit: int, source: str = None, platform: str = None
+    ) -> list[IngestionProcessDbo]:
+        """
+        Returns the latest ingestion processes, newest first, optionally for one source and platform
+        """
+        query: Query = session.query(IngestionProcessDbo)
+        if source:
+            query = query.filter(IngestionProcessDbo.source == source)
+        if platform:
+            query = query.filter(IngestionProcessDbo.platform == platform)
+        return (
+            query.order_by(IngestionProcessDbo.ingestion_process_id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def complete_process(
+        session, ingestion_process_id: int, metrics: dict = None
+    ) -> None:
         ingestion_process_dbo: IngestionProcessDbo = (
             IngestionProcessRepository.get_by_id(
                 session=session, ingestion_process_id=ingestion_process_id
@@ -44,3 +98,18 @@ class IngestionProcessRepository(RepositoryBase):
         )
         ingestion_process_dbo.status = "complete"
         ingestion_process_dbo.completed_at = datetime.datetime.now(datetime.UTC)
+        ingestion_process_dbo.metrics = metrics
+
+    @staticmethod
+    def fail_process(
+        session, ingestion_process_id: int, log: str, metrics: dict = None
+    ) -> None:
+        ingestion_process_dbo: IngestionProcessDbo = (
+            IngestionProcessRepository.get_by_id(
+                session=session, ingestion_process_id=ingestion_process_id
+            )
+        )
+        ingestion_process_dbo.status = "failed"
+        ingestion_process_dbo.completed_at = datetime.datetime.now(datetime.UTC)
+        ingestion_process_dbo.log = log
+        ingestion_process_dbo.metrics = metrics
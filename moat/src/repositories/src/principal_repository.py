@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from models import (
     PrincipalAttributeDbo,
@@ -6,27 +6,60 @@ from models import (
     PrincipalDbo,
     PrincipalStagingDbo,
 )
+from sqlalchemy import Row, and_
 from sqlalchemy.orm import Query
 from sqlalchemy.sql import text
 
-from .repository_base import RepositoryBase
+from .repository_base import KeyRange, MergeResult, RepositoryBase
 
 
 class PrincipalRepository(RepositoryBase):
 
     @staticmethod
-    def truncate_staging_tables(session) -> None:
-        for model in [PrincipalStagingDbo, PrincipalAttributeStagingDbo]:
-            session.execute(text(f"truncate {model.__tablename__}"))
-            session.execute(
-                text(f"alter sequence {model.__tablename__}_id_seq restart with 1")
-            )
+    def delete_staging_tables(session, ingestion_process_id: int) -> None:
+        RepositoryBase.delete_staging(
+            session=session,
+            models=[PrincipalStagingDbo, PrincipalAttributeStagingDbo],
+            ingestion_process_id=ingestion_process_id,
+        )
 
     @staticmethod
     def get_all(session) -> Tuple[int, list[PrincipalDbo]]:
         query: Query = session.query(PrincipalDbo)
         return query.count(), query.all()
 
+    @staticmethod
+    def stream_all_with_attributes(
+        session, page_size: int
+    ) -> Iterator[Row[tuple[int, str, str, str]]]:
+        """
+        Returns (principal_id, user_name, attribute_key, attribute_value) rows in a single query,
+        fetching page_size rows at a time using a server-side cursor
+        Rows are ordered by principal, and principals without attributes have a single row with None attributes
+        Only active principals and attributes are returned, deactivated rows are history
+        """
+        query: Query = (
+            session.query(
+                PrincipalDbo.principal_id,
+                PrincipalDbo.user_name,
+                PrincipalAttributeDbo.attribute_key,
+                PrincipalAttributeDbo.attribute_value,
+            )
+            .outerjoin(
+                PrincipalAttributeDbo,
+                and_(
+                    PrincipalAttributeDbo.fq_name == PrincipalDbo.fq_name,
+                    PrincipalAttributeDbo.active,
+                ),
+            )
+            .filter(PrincipalDbo.active)
+            .order_by(
+                PrincipalDbo.principal_id, PrincipalAttributeDbo.principal_attribute_id
+            )
+            .yield_per(page_size)
+        )
+        return iter(query)
+
     @staticmethod
     def get_by_id(session, principal_id: int) -> PrincipalDbo:
         principal: PrincipalDbo = (
@@ -55,47 +88,101 @@ class PrincipalRepository(RepositoryBase):
         return principal
 
     @staticmethod
-    def merge_staging(session, ingestion_process_id: int) -> int:
-        merge_stmt: str = PrincipalRepository._get_merge_statement(
+    def mark_changed_staging(
+        session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return PrincipalRepository.mark_changed(
+            session=session,
             source_model=PrincipalStagingDbo,
             target_model=PrincipalDbo,
             merge_keys=PrincipalStagingDbo.MERGE_KEYS,
             update_cols=PrincipalStagingDbo.UPDATE_COLS,
             ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
+        )
+
+    @staticmethod
+    def merge_staging(
+        session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        return PrincipalRepository.merge(
+            session=session,
+            source_model=PrincipalStagingDbo,
+            target_model=PrincipalDbo,
+            merge_keys=PrincipalStagingDbo.MERGE_KEYS,
+            update_cols=PrincipalStagingDbo.UPDATE_COLS,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
-        result = session.execute(text(merge_stmt))
-        return result.rowcount
 
     @staticmethod
-    def merge_deactivate_staging(session, ingestion_process_id: int) -> int:
+    def merge_deactivate_staging(
+        session,
+        ingestion_process_id: int,
+        fq_name_prefixes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
         merge_stmt: str = PrincipalRepository._get_merge_deactivate_statement(
             source_model=PrincipalStagingDbo,
             target_model=PrincipalDbo,
             merge_keys=PrincipalStagingDbo.MERGE_KEYS,
             ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=fq_name_prefixes,
+            source=source,
+            platform=platform,
         )
+        PrincipalRepository.lock_merge_target(session=session, model=PrincipalDbo)
         result = session.execute(text(merge_stmt))
         return result.rowcount
 
     @staticmethod
-    def merge_attributes_staging(session, ingestion_process_id: int) -> int:
-        merge_stmt: str = PrincipalRepository._get_merge_statement(
+    def mark_changed_attributes_staging(
+        session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return PrincipalRepository.mark_changed(
+            session=session,
             source_model=PrincipalAttributeStagingDbo,
             target_model=PrincipalAttributeDbo,
             merge_keys=PrincipalAttributeStagingDbo.MERGE_KEYS,
             update_cols=PrincipalAttributeStagingDbo.UPDATE_COLS,
             ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
         )
-        result = session.execute(text(merge_stmt))
-        return result.rowcount
 
     @staticmethod
-    def merge_attributes_deactivate_staging(session, ingestion_process_id: int) -> int:
+    def merge_attributes_staging(
+        session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        return PrincipalRepository.merge(
+            session=session,
+            source_model=PrincipalAttributeStagingDbo,
+            target_model=PrincipalAttributeDbo,
+            merge_keys=PrincipalAttributeStagingDbo.MERGE_KEYS,
+            update_cols=PrincipalAttributeStagingDbo.UPDATE_COLS,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
+        )
+
+    @staticmethod
+    def merge_attributes_deactivate_staging(
+        session,
+        ingestion_process_id: int,
+        fq_name_prefixes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
         merge_stmt: str = PrincipalRepository._get_merge_deactivate_statement(
             source_model=PrincipalAttributeStagingDbo,
             target_model=PrincipalAttributeDbo,
             merge_keys=PrincipalAttributeStagingDbo.MERGE_KEYS,
             ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=fq_name_prefixes,
+            source=source,
+            platform=platform,
+        )
+        PrincipalRepository.lock_merge_target(
+            session=session, model=PrincipalAttributeDbo
         )
         result = session.execute(text(merge_stmt))
         return result.rowcount
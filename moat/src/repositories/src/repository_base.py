@@ -1,15 +1,37 @@
+from dataclasses import dataclass
+from itertools import islice
 from textwrap import dedent
-from typing import Tuple, Type
+from typing import Iterable, Tuple, Type
 
 from database import BaseModel
 from models import AttributeDto
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, insert, or_, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.inspection import inspect as sa_inspect
 from sqlalchemy.orm import ColumnProperty, Query, class_mapper
 from sqlalchemy.sql.elements import NamedColumn
 
 
+@dataclass
+class MergeResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+
+    def __add__(self, other: "MergeResult") -> "MergeResult":
+        return MergeResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            unchanged=self.unchanged + other.unchanged,
+            deactivated=self.deactivated + other.deactivated,
+        )
+
+
+# lower bound (inclusive) and upper bound (exclusive) of a merge key, None is unbounded
+KeyRange = Tuple[str | None, str | None]
+
+
 class RepositoryBase:
 
     def __init__(self) -> None:
@@ -65,6 +87,65 @@ class RepositoryBase:
             f"Column with name '{column_name}' does not exist in model: '{model}'"
         )
 
+    @staticmethod
+    def bulk_insert(
+        session,
+        model: Type[BaseModel],
+        columns: list[str],
+        rows: Iterable[tuple],
+        batch_size: int = 10000,
+    ) -> int:
+        """
+        Inserts rows (tuples in the order of columns) into the model's table, bypassing the ORM
+        Uses COPY FROM STDIN on psycopg connections, and falls back to executemany batches otherwise
+        Rows are streamed, so rows can be a generator of any length
+        """
+        connection = session.connection()
+        row_count: int = 0
+
+        if connection.dialect.driver == "psycopg":
+            driver_connection = connection.connection.driver_connection
+            with driver_connection.cursor() as cursor:
+                with cursor.copy(
+                    f"copy {model.__tablename__} ({', '.join(columns)}) from stdin"
+                ) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        row_count += 1
+            return row_count
+
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            session.execute(insert(model), [dict(zip(columns, row)) for row in batch])
+            row_count += len(batch)
+        return row_count
+
+    @staticmethod
+    def lock_merge_target(session, model: Type[BaseModel]) -> None:
+        """
+        Takes a transaction scoped advisory lock on the model's table, so concurrent ingestion
+        processes stage in parallel but merge into the same table one at a time
+        Locks are released on commit or rollback. Callers lock tables in the same order to avoid deadlocks
+        """
+        if session.connection().dialect.name != "postgresql":
+            return
+        session.execute(
+            text("select pg_advisory_xact_lock(hashtext(:lock_name))"),
+            {"lock_name": f"moat.merge.{model.__tablename__}"},
+        )
+
+    @staticmethod
+    def delete_staging(
+        session, models: list[Type[BaseModel]], ingestion_process_id: int
+    ) -> None:
+        """
+        Deletes an ingestion process's rows from the staging tables, leaving other processes' rows in place
+        """
+        for model in models:
+            session.query(model).filter(
+                model.ingestion_process_id == ingestion_process_id
+            ).delete(synchronize_session=False)
+
     @staticmethod
     def _get_all_with_search_and_pagination(
         session,
@@ -143,6 +224,83 @@ class RepositoryBase:
     def _get_pagination_query(query: Query, page_number: int, page_size: int):
         return query.slice(page_number * page_size, (page_number + 1) * page_size)
 
+    @staticmethod
+    def _get_merge_source(
+        source_model: type[BaseModel],
+        merge_keys: list[str],
+        ingestion_process_id: int,
+        key_range: KeyRange | None = None,
+        changed_only: bool = False,
+    ) -> str:
+        """
+        The process's staging rows, with one row per merge key. When a key was staged
+        more than once, the last staged row wins
+        With a key_range, only rows whose first merge key is in the range are included
+        With changed_only, only the rows marked as changed by mark_changed are included
+        """
+        merge_keys_str: str = ", ".join(merge_keys)
+        where_clause: str = f"ingestion_process_id = {ingestion_process_id}"
+        if changed_only:
+            where_clause += " and changed"
+        if key_range:
+            lower_bound, upper_bound = key_range
+            if lower_bound is not None:
+                where_clause += (
+                    f" and {merge_keys[0]} >= {RepositoryBase._quote(lower_bound)}"
+                )
+            if upper_bound is not None:
+                where_clause += (
+                    f" and {merge_keys[0]} < {RepositoryBase._quote(upper_bound)}"
+                )
+        return (
+            f"select distinct on ({merge_keys_str}) * from {source_model.__tablename__} "
+            f"where {where_clause} "
+            f"order by {merge_keys_str}, id desc"
+        )
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        # quotes a value as a string literal
+        return "'" + value.replace("'", "''") + "'"
+
+    @staticmethod
+    def get_merge_key_ranges(
+        session,
+        source_model: type[BaseModel],
+        merge_key: str,
+        ingestion_process_id: int,
+        chunk_size: int,
+    ) -> list[KeyRange]:
+        """
+        Splits the process's staging rows into ranges of the merge key with about chunk_size keys each,
+        so a large merge can be prepared in several short transactions. Rows with a NULL key are in no range
+        """
+        lower_bounds: list[str] = list(
+            session.execute(
+                text(
+                    dedent(
+                        f"""
+                        select {merge_key} from (
+                            select {merge_key}, row_number() over (order by {merge_key}) as row_number
+                            from (
+                                select distinct {merge_key} from {source_model.__tablename__}
+                                where ingestion_process_id = :ingestion_process_id
+                                and {merge_key} is not null
+                            ) merge_keys
+                        ) numbered_keys
+                        where (row_number - 1) % :chunk_size = 0
+                        order by {merge_key}
+                    """
+                    )
+                ),
+                {
+                    "ingestion_process_id": ingestion_process_id,
+                    "chunk_size": chunk_size,
+                },
+            ).scalars()
+        )
+        return list(zip(lower_bounds, lower_bounds[1:] + [None]))
+
     @staticmethod
     def _get_merge_statement(
         source_model: type[BaseModel],
@@ -150,38 +308,51 @@ class RepositoryBase:
         merge_keys: list[str],
         update_cols: list[str],
         ingestion_process_id: int,
+        changed_only: bool = False,
     ) -> str:
-        merge_key: str = merge_keys[0]  # HACK
+        """
+        Only rows whose update columns changed, or which were deactivated, are updated
+        IS DISTINCT FROM treats two NULLs as equal, so NULL columns do not cause rewrites
+        """
+        update_cols = [c for c in update_cols if c not in merge_keys]
+        insert_cols: list[str] = merge_keys + update_cols
+
+        on_stmt: str = " and ".join([f"src.{c} = tgt.{c}" for c in merge_keys])
 
-        matched_and_stmt: str = "and " + " or ".join(
-            [f"src.{c} <> tgt.{c}" for c in update_cols]
+        matched_and_stmt: str = (
+            f"and ({RepositoryBase._get_changed_condition(update_cols=update_cols)})"
         )
 
         update_stmt: str = (
             "update set "
-            + ", ".join([f"{c} = src.{c}" for c in update_cols])
-            + f", ingestion_process_id = {ingestion_process_id}"
+            + "".join([f"{c} = src.{c}, " for c in update_cols])
+            + f"ingestion_process_id = {ingestion_process_id}, active = true"
         )
 
         insert_stmt: str = (
-            "insert ("
-            + ", ".join([merge_key] + update_cols)
-            + ", ingestion_process_id)"
+            "insert (" + ", ".join(insert_cols) + ", ingestion_process_id)"
         )
         values_stmt: str = (
             "values ("
-            + ", ".join([f"src.{c}" for c in [merge_key] + update_cols])
+            + ", ".join([f"src.{c}" for c in insert_cols])
             + f", {ingestion_process_id})"
         )
 
+        merge_source: str = RepositoryBase._get_merge_source(
+            source_model=source_model,
+            merge_keys=merge_keys,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
+        )
+
         merge_statement: str = dedent(
             f"""
                         merge into {target_model.__tablename__} as tgt
                         using (
-                            select * from {source_model.__tablename__}
+                            {merge_source}
                         ) src
-                        on src.{merge_key} = tgt.{merge_key}
-                        when matched 
+                        on {on_stmt}
+                        when matched
                             {matched_and_stmt}
                         then
                             {update_stmt}
@@ -192,33 +363,264 @@ class RepositoryBase:
         )
         return merge_statement
 
+    @staticmethod
+    def _get_merge_count_statement(
+        source_model: type[BaseModel],
+        target_model: type[BaseModel],
+        merge_keys: list[str],
+        ingestion_process_id: int,
+        changed_only: bool = False,
+    ) -> str:
+        """
+        Counts the deduplicated staging rows, and those which the merge will insert
+        MERGE cannot return its actions before Postgres 17, so inserts are counted up front
+        """
+        on_stmt: str = " and ".join([f"src.{c} = tgt.{c}" for c in merge_keys])
+        merge_source: str = RepositoryBase._get_merge_source(
+            source_model=source_model,
+            merge_keys=merge_keys,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
+        )
+        return dedent(
+            f"""
+                select
+                    count(*) as staged_count,
+                    count(*) filter (
+                        where not exists (
+                            select 1 from {target_model.__tablename__} tgt where {on_stmt}
+                        )
+                    ) as insert_count
+                from (
+                    {merge_source}
+                ) src
+                """
+        )
+
+    @staticmethod
+    def _get_changed_condition(update_cols: list[str]) -> str:
+        # a matched target row is changed when an update column differs, or when it was deactivated
+        return " or ".join(
+            [f"src.{c} is distinct from tgt.{c}" for c in update_cols]
+            + ["tgt.active is not true"]
+        )
+
+    @staticmethod
+    def _get_mark_changed_statement(
+        source_model: type[BaseModel],
+        target_model: type[BaseModel],
+        merge_keys: list[str],
+        update_cols: list[str],
+        ingestion_process_id: int,
+        key_range: KeyRange | None = None,
+    ) -> str:
+        """
+        Marks the deduplicated staging rows which the merge would insert or update
+        The target table is only read, so no target rows are locked
+        """
+        update_cols = [c for c in update_cols if c not in merge_keys]
+        on_stmt: str = " and ".join([f"src.{c} = tgt.{c}" for c in merge_keys])
+        changed_stmt: str = RepositoryBase._get_changed_condition(
+            update_cols=update_cols
+        )
+        merge_source: str = RepositoryBase._get_merge_source(
+            source_model=source_model,
+            merge_keys=merge_keys,
+            ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
+        )
+        return dedent(
+            f"""
+                update {source_model.__tablename__} stg
+                set changed = true
+                from (
+                    {merge_source}
+                ) src
+                where stg.id = src.id
+                and not exists (
+                    select 1 from {target_model.__tablename__} tgt
+                    where {on_stmt}
+                    and not ({changed_stmt})
+                )
+                """
+        )
+
+    @staticmethod
+    def mark_changed(
+        session,
+        source_model: type[BaseModel],
+        target_model: type[BaseModel],
+        merge_keys: list[str],
+        update_cols: list[str],
+        ingestion_process_id: int,
+        key_range: KeyRange | None = None,
+    ) -> MergeResult:
+        """
+        Compares the process's staging rows, or only those within key_range, with the target table
+        and marks the rows to be inserted or updated, so a merge with changed_only applies just those.
+        Returns the unchanged count, the merge with changed_only returns the inserted and updated counts
+        Marking runs in short transactions while the target table stays as it is, so a large run
+        is published in one final transaction which only touches the changed rows
+        """
+        staged_count: int = session.execute(
+            text(
+                "select count(*) from ("
+                + RepositoryBase._get_merge_source(
+                    source_model=source_model,
+                    merge_keys=merge_keys,
+                    ingestion_process_id=ingestion_process_id,
+                    key_range=key_range,
+                )
+                + ") src"
+            )
+        ).scalar_one()
+        result = session.execute(
+            text(
+                RepositoryBase._get_mark_changed_statement(
+                    source_model=source_model,
+                    target_model=target_model,
+                    merge_keys=merge_keys,
+                    update_cols=update_cols,
+                    ingestion_process_id=ingestion_process_id,
+                    key_range=key_range,
+                )
+            )
+        )
+        return MergeResult(unchanged=staged_count - result.rowcount)
+
+    @staticmethod
+    def merge(
+        session,
+        source_model: type[BaseModel],
+        target_model: type[BaseModel],
+        merge_keys: list[str],
+        update_cols: list[str],
+        ingestion_process_id: int,
+        changed_only: bool = False,
+    ) -> MergeResult:
+        """
+        Merges the process's staging rows into the target table, and returns what changed
+        With changed_only, only the rows marked by mark_changed are merged
+        """
+        RepositoryBase.lock_merge_target(session=session, model=target_model)
+        staged_count, insert_count = session.execute(
+            text(
+                RepositoryBase._get_merge_count_statement(
+                    source_model=source_model,
+                    target_model=target_model,
+                    merge_keys=merge_keys,
+                    ingestion_process_id=ingestion_process_id,
+                    changed_only=changed_only,
+                )
+            )
+        ).one()
+        result = session.execute(
+            text(
+                RepositoryBase._get_merge_statement(
+                    source_model=source_model,
+                    target_model=target_model,
+                    merge_keys=merge_keys,
+                    update_cols=update_cols,
+                    ingestion_process_id=ingestion_process_id,
+                    changed_only=changed_only,
+                )
+            )
+        )
+        return MergeResult(
+            inserted=insert_count,
+            updated=result.rowcount - insert_count,
+            unchanged=staged_count - result.rowcount,
+        )
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        # escapes a value for use in a like pattern inside a string literal
+        return (
+            value.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+            .replace("'", "''")
+        )
+
     @staticmethod
     def _get_merge_deactivate_statement(
         source_model: type[BaseModel],
         target_model: type[BaseModel],
         merge_keys: list[str],
         ingestion_process_id: int,
+        fq_name_prefixes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
     ) -> str:
         """
         The merge delete statement actually executes an update
         The process ID is set and the record is marked as inactive
+        Only this process's staging rows are compared, other processes may be staging concurrently
 
         When the trigger proc is called on the update, the function
         should insert a row in the history table with the new proc id
         and delete the record from the target table
+
+        fq_name_prefixes limits deactivation to records under those prefixes,
+        for incremental runs which only staged part of the source
+
+        Only active records are checked, with an anti-join against this process's
+        staging rows, so inactive history is not scanned and nothing is sorted
+        Records with a NULL merge key never match a staging row, they are left as they are
+
+        With a source, only records of the same source and platform are deactivated, so a run for one
+        platform leaves the records of other platforms, and those created through SCIM, as they are.
+        Tables with a platform column are filtered on it, others on the source and platform of the
+        ingestion process which last wrote the record. Processes from before the platform was
+        recorded have a NULL platform, so they match any platform of their source
         """
-        merge_keys_str: str = ", ".join(merge_keys)
-        where_clause: str = " and ".join([f"tgt.{c} = src.{c}" for c in merge_keys])
+        where_clauses: list[str] = ["tgt.active"] + [
+            f"tgt.{c} is not null" for c in merge_keys
+        ]
+        if fq_name_prefixes:
+            where_clauses.append(
+                "("
+                + " or ".join(
+                    [
+                        f"tgt.fq_name like '{RepositoryBase._escape_like(p)}%'"
+                        for p in fq_name_prefixes
+                    ]
+                )
+                + ")"
+            )
+        if source is not None:
+            if "platform" in target_model.__table__.columns:
+                # = rather than is not distinct from, so the platform index can be used
+                where_clauses.append(
+                    "tgt.platform is null"
+                    if platform is None
+                    else f"tgt.platform = {RepositoryBase._quote(platform)}"
+                )
+            else:
+                platform_clause: str = "p.platform is null"
+                if platform is not None:
+                    quoted_platform: str = RepositoryBase._quote(platform)
+                    platform_clause = (
+                        f"(p.platform = {quoted_platform} or p.platform is null)"
+                    )
+                where_clauses.append(
+                    "exists (select 1 from ingestion_processes p"
+                    " where p.ingestion_process_id = tgt.ingestion_process_id"
+                    f" and p.source = {RepositoryBase._quote(source)}"
+                    f" and {platform_clause})"
+                )
+        where_clause: str = "\n                and ".join(where_clauses)
+        on_clause: str = " and ".join([f"src.{c} = tgt.{c}" for c in merge_keys])
 
         return dedent(
             f"""
                 update {target_model.__tablename__} tgt
                 set ingestion_process_id = {ingestion_process_id}, active = false
-                from (
-                    select {merge_keys_str} from {target_model.__tablename__}
-                    except
-                    select {merge_keys_str} from {source_model.__tablename__}
-                ) src
                 where {where_clause}
+                and not exists (
+                    select 1 from {source_model.__tablename__} src
+                    where src.ingestion_process_id = {ingestion_process_id}
+                    and {on_clause}
+                )
                 """
         )
@@ -1,16 +1,16 @@
-from typing import Tuple
+from typing import Iterator, Tuple
 
-from database import BaseModel
 from models import (
     ResourceAttributeStagingDbo,
     ResourceDbo,
     ResourceStagingDbo,
     ResourceAttributeDbo,
 )
+from sqlalchemy import Row, and_
 from sqlalchemy.orm import Query
 from sqlalchemy.sql import text
 
-from .repository_base import RepositoryBase
+from .repository_base import KeyRange, MergeResult, RepositoryBase
 
 
 class ResourceRepository(RepositoryBase):
@@ -24,11 +24,42 @@ class ResourceRepository(RepositoryBase):
     def get_all_by_platform(session, platform: str) -> Tuple[int, list[ResourceDbo]]:
         query: Query = (
             session.query(ResourceDbo)
-            .filter(ResourceDbo.platform == platform)
+            .filter(ResourceDbo.platform == platform, ResourceDbo.active)
             .order_by(ResourceDbo.fq_name)
         )
         return query.count(), query.all()
 
+    @staticmethod
+    def stream_all_by_platform_with_attributes(
+        session, platform: str, page_size: int
+    ) -> Iterator[Row[tuple[int, str, str, str, str]]]:
+        """
+        Returns (id, fq_name, object_type, attribute_key, attribute_value) rows in a single query,
+        fetching page_size rows at a time using a server-side cursor
+        Rows are ordered by fq_name, and resources without attributes have a single row with None attributes
+        Only active resources and attributes are returned, deactivated rows are history
+        """
+        query: Query = (
+            session.query(
+                ResourceDbo.id,
+                ResourceDbo.fq_name,
+                ResourceDbo.object_type,
+                ResourceAttributeDbo.attribute_key,
+                ResourceAttributeDbo.attribute_value,
+            )
+            .outerjoin(
+                ResourceAttributeDbo,
+                and_(
+                    ResourceAttributeDbo.fq_name == ResourceDbo.fq_name,
+                    ResourceAttributeDbo.active,
+                ),
+            )
+            .filter(ResourceDbo.platform == platform, ResourceDbo.active)
+            .order_by(ResourceDbo.fq_name, ResourceDbo.id, ResourceAttributeDbo.id)
+            .yield_per(page_size)
+        )
+        return iter(query)
+
     # TODO base class
     @staticmethod
     def get_by_id(session, resource_id: int) -> ResourceDbo:
@@ -37,63 +68,110 @@ class ResourceRepository(RepositoryBase):
         )
         return resource
 
-    # TODO base class
     @staticmethod
-    def truncate_staging_tables(session) -> None:
-        models: list[type[BaseModel]] = [
-            ResourceStagingDbo,
-            ResourceAttributeStagingDbo,
-        ]
-        session.execute(
-            text(f"truncate {','.join([model.__tablename__ for model in models])}")
+    def delete_staging_tables(session, ingestion_process_id: int) -> None:
+        RepositoryBase.delete_staging(
+            session=session,
+            models=[ResourceStagingDbo, ResourceAttributeStagingDbo],
+            ingestion_process_id=ingestion_process_id,
         )
-        for model in models:
-            session.execute(
-                text(f"alter sequence {model.__tablename__}_id_seq restart with 1")
-            )
 
     @staticmethod
-    def merge_staging(session, ingestion_process_id: int) -> int:
-        merge_stmt: str = RepositoryBase._get_merge_statement(
+    def mark_changed_staging(
+        session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return ResourceRepository.mark_changed(
+            session=session,
             source_model=ResourceStagingDbo,
             target_model=ResourceDbo,
             merge_keys=ResourceStagingDbo.MERGE_KEYS,
             update_cols=ResourceStagingDbo.UPDATE_COLS,
             ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
+        )
+
+    @staticmethod
+    def merge_staging(
+        session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        return ResourceRepository.merge(
+            session=session,
+            source_model=ResourceStagingDbo,
+            target_model=ResourceDbo,
+            merge_keys=ResourceStagingDbo.MERGE_KEYS,
+            update_cols=ResourceStagingDbo.UPDATE_COLS,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
         )
-        result = session.execute(text(merge_stmt))
-        return result.rowcount
 
     @staticmethod
-    def merge_deactivate_staging(session, ingestion_process_id: int) -> int:
+    def merge_deactivate_staging(
+        session,
+        ingestion_process_id: int,
+        fq_name_prefixes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
         merge_stmt: str = RepositoryBase._get_merge_deactivate_statement(
             source_model=ResourceStagingDbo,
             target_model=ResourceDbo,
             merge_keys=ResourceStagingDbo.MERGE_KEYS,
             ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=fq_name_prefixes,
+            source=source,
+            platform=platform,
         )
+        ResourceRepository.lock_merge_target(session=session, model=ResourceDbo)
         result = session.execute(text(merge_stmt))
         return result.rowcount
 
     @staticmethod
-    def merge_attributes_staging(session, ingestion_process_id: int) -> int:
-        merge_stmt: str = RepositoryBase._get_merge_statement(
+    def mark_changed_attributes_staging(
+        session, ingestion_process_id: int, key_range: KeyRange | None = None
+    ) -> MergeResult:
+        return ResourceRepository.mark_changed(
+            session=session,
             source_model=ResourceAttributeStagingDbo,
             target_model=ResourceAttributeDbo,
             merge_keys=ResourceAttributeStagingDbo.MERGE_KEYS,
             update_cols=ResourceAttributeStagingDbo.UPDATE_COLS,
             ingestion_process_id=ingestion_process_id,
+            key_range=key_range,
         )
-        result = session.execute(text(merge_stmt))
-        return result.rowcount
 
     @staticmethod
-    def merge_attributes_deactivate_staging(session, ingestion_process_id: int) -> int:
+    def merge_attributes_staging(
+        session, ingestion_process_id: int, changed_only: bool = False
+    ) -> MergeResult:
+        return ResourceRepository.merge(
+            session=session,
+            source_model=ResourceAttributeStagingDbo,
+            target_model=ResourceAttributeDbo,
+            merge_keys=ResourceAttributeStagingDbo.MERGE_KEYS,
+            update_cols=ResourceAttributeStagingDbo.UPDATE_COLS,
+            ingestion_process_id=ingestion_process_id,
+            changed_only=changed_only,
+        )
+
+    @staticmethod
+    def merge_attributes_deactivate_staging(
+        session,
+        ingestion_process_id: int,
+        fq_name_prefixes: list[str] | None = None,
+        source: str | None = None,
+        platform: str | None = None,
+    ) -> int:
         merge_stmt: str = RepositoryBase._get_merge_deactivate_statement(
             source_model=ResourceAttributeStagingDbo,
             target_model=ResourceAttributeDbo,
             merge_keys=ResourceAttributeStagingDbo.MERGE_KEYS,
             ingestion_process_id=ingestion_process_id,
+            fq_name_prefixes=fq_name_prefixes,
+            source=source,
+            platform=platform,
+        )
+        ResourceRepository.lock_merge_target(
+            session=session, model=ResourceAttributeDbo
         )
         result = session.execute(text(merge_stmt))
         return result.rowcount
@@ -0,0 +1,28 @@
+from database import Database
+
+from ..src.bundle_revision_repository import BundleRevisionRepository
+
+
+def test_create_and_get_current_revision(database_empty: Database) -> None:
+    with database_empty.Session.begin() as session:
+        assert BundleRevisionRepository.get_current_revision(session=session) == 0
+
+        revision: int = BundleRevisionRepository.create(session=session, source="scim")
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        assert (
+            BundleRevisionRepository.get_current_revision(session=session) == revision
+        )
+
+        next_revision: int = BundleRevisionRepository.create(
+            session=session, source="ingestion:1"
+        )
+        assert next_revision > revision
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        assert (
+            BundleRevisionRepository.get_current_revision(session=session)
+            == next_revision
+        )
@@ -1,9 +1,13 @@
 from datetime import datetime, timezone
 
 import pytest
+from database import Database
 from models import DecisionLogDbo
 
-from ..src.decision_log_repository import DecisionLogRepository
+from ..src.decision_log_repository import (
+    DecisionLogInsertResult,
+    DecisionLogRepository,
+)
 
 
 def test_create_execute_query() -> None:
@@ -481,3 +485,57 @@ def test_create_decision_log_with_query() -> None:
                 "req_id": 635,
             }
         )
+
+
+def make_decision_log(decision_id: str | None) -> dict:
+    return {
+        "decision_id": decision_id,
+        "path": "moat/trino/allow",
+        "input": {
+            "action": {"operation": "ExecuteQuery"},
+            "context": {"identity": {"user": "alice"}},
+        },
+        "result": True,
+        "timestamp": "2025-09-04T22:53:16.320877389Z",
+    }
+
+
+def test_create_bulk(database_empty: Database) -> None:
+    with database_empty.Session.begin() as session:
+        result: DecisionLogInsertResult = DecisionLogRepository.create_bulk(
+            session=session,
+            decision_logs=[
+                make_decision_log("bulk-1"),
+                make_decision_log("bulk-2"),
+                # repeated within the batch
+                make_decision_log("bulk-2"),
+                # query logs are ignored, logs without an ID or timestamp are invalid
+                make_decision_log("bulk-3") | {"query": "data.moat.trino"},
+                make_decision_log(None),
+                make_decision_log("bulk-4") | {"timestamp": None},
+            ],
+        )
+        session.commit()
+    assert result == DecisionLogInsertResult(accepted=2, duplicate=1, rejected=3)
+
+    # a retried batch only inserts the decision logs not stored yet
+    with database_empty.Session.begin() as session:
+        result = DecisionLogRepository.create_bulk(
+            session=session,
+            decision_logs=[make_decision_log("bulk-1"), make_decision_log("bulk-5")],
+        )
+        session.commit()
+    assert result == DecisionLogInsertResult(accepted=1, duplicate=1, rejected=0)
+
+    with database_empty.Session.begin() as session:
+        decision_logs: list[DecisionLogDbo] = (
+            session.query(DecisionLogDbo)
+            .filter(DecisionLogDbo.decision_log_id.like("bulk-%"))
+            .order_by(DecisionLogDbo.decision_log_id)
+            .all()
+        )
+        assert [(d.decision_log_id, d.username) for d in decision_logs] == [
+            ("bulk-1", "alice"),
+            ("bulk-2", "alice"),
+            ("bulk-5", "alice"),
+        ]
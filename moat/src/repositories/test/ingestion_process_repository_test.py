@@ -19,3 +19,20 @@ def create(database: Database) -> None:
         )
         assert ingestion_process_dbo.object_type == "principal,principal_attribute"
         assert ingestion_process_dbo.source == "ldap"
+
+
+def test_create_in_progress(database_empty: Database) -> None:
+    with database_empty.Session.begin() as session:
+        id: int = IngestionProcessRepository.create(
+            session=session, object_types=[ObjectTypeEnum.RESOURCE], source="dbapi"
+        )
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        ingestion_process_dbo: IngestionProcessDbo = (
+            IngestionProcessRepository.get_by_id(
+                session=session, ingestion_process_id=id
+            )
+        )
+        assert ingestion_process_dbo.status == "in_progress"
+        assert ingestion_process_dbo.completed_at is None
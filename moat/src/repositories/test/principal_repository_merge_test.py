@@ -5,6 +5,7 @@ from models import (
 )
 
 from ..src.principal_repository import PrincipalRepository
+from ..src.repository_base import MergeResult
 
 
 def test_merge_principals_staging(database_empty: Database) -> None:
@@ -14,6 +15,7 @@ def test_merge_principals_staging(database_empty: Database) -> None:
     with database_empty.Session.begin() as session:
         # populate staging table
         ps1: PrincipalStagingDbo = PrincipalStagingDbo()
+        ps1.ingestion_process_id = 1
         ps1.fq_name = "abigail.fleming"
         ps1.first_name = "Abigail"
         ps1.last_name = "Fleming"
@@ -22,6 +24,7 @@ def test_merge_principals_staging(database_empty: Database) -> None:
         session.add(ps1)
 
         ps2: PrincipalStagingDbo = PrincipalStagingDbo()
+        ps2.ingestion_process_id = 1
         ps2.fq_name = "boris.johnstone"
         ps2.first_name = "Boris"
         ps2.last_name = "Johnstone"
@@ -32,11 +35,13 @@ def test_merge_principals_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=1)
-        assert row_count == 2
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=1
+        )
+        assert merge_result == MergeResult(inserted=2, updated=0, unchanged=0)
 
         row_count: int = repo.merge_deactivate_staging(
-            session=session, ingestion_process_id=2
+            session=session, ingestion_process_id=1
         )
         assert row_count == 0
         session.commit()
@@ -56,8 +61,20 @@ def test_merge_principals_staging(database_empty: Database) -> None:
 
     # scenario 2: append to target tables
     with database_empty.Session.begin() as session:
-        # populate staging table
+        # populate staging table, the unchanged principals are staged again
+        for staged in session.query(PrincipalStagingDbo).all():
+            session.add(
+                PrincipalStagingDbo(
+                    ingestion_process_id=2,
+                    fq_name=staged.fq_name,
+                    first_name=staged.first_name,
+                    last_name=staged.last_name,
+                    user_name=staged.user_name,
+                    email=staged.email,
+                )
+            )
         ps3: PrincipalStagingDbo = PrincipalStagingDbo()
+        ps3.ingestion_process_id = 2
         ps3.fq_name = "frank.herbert"
         ps3.first_name = "Frank"
         ps3.last_name = "Herbert"
@@ -68,8 +85,10 @@ def test_merge_principals_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=2)
-        assert row_count == 1
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=2
+        )
+        assert merge_result == MergeResult(inserted=1, updated=0, unchanged=2)
 
         row_count: int = repo.merge_deactivate_staging(
             session=session, ingestion_process_id=2
@@ -89,11 +108,13 @@ def test_merge_principals_staging(database_empty: Database) -> None:
         principal: PrincipalDbo = repo.get_by_id(session=session, principal_id=1)
         assert principal.first_name == "Abigail"
 
-        # truncate staging table
-        repo.truncate_staging_tables(session=session)
+        # clear earlier processes from the staging table
+        repo.delete_staging_tables(session=session, ingestion_process_id=1)
+        repo.delete_staging_tables(session=session, ingestion_process_id=2)
 
         # populate staging table
         ps: PrincipalStagingDbo = PrincipalStagingDbo()
+        ps.ingestion_process_id = 3
         ps.fq_name = "abigail.fleming"
         ps.first_name = "Anne"
         ps.last_name = "Hathaway"
@@ -104,8 +125,10 @@ def test_merge_principals_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=3)
-        assert row_count == 1
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=3
+        )
+        assert merge_result == MergeResult(inserted=0, updated=1, unchanged=0)
 
         row_count: int = repo.merge_deactivate_staging(
             session=session, ingestion_process_id=3
@@ -128,3 +151,154 @@ def test_merge_principals_staging(database_empty: Database) -> None:
         assert repo.get_by_id(session=session, principal_id=1).active
         assert not repo.get_by_id(session=session, principal_id=2).active
         assert not repo.get_by_id(session=session, principal_id=3).active
+
+
+def test_merge_principals_staging_unchanged(database_empty: Database) -> None:
+    repo: PrincipalRepository = PrincipalRepository()
+
+    def stage(ingestion_process_id: int, fq_names: list[str]) -> None:
+        with database_empty.Session.begin() as session:
+            for fq_name in fq_names:
+                session.add(
+                    PrincipalStagingDbo(
+                        ingestion_process_id=ingestion_process_id,
+                        fq_name=fq_name,
+                        first_name="Grace",
+                        last_name="Hopper",
+                        user_name=fq_name,
+                        email=None,
+                    )
+                )
+            session.commit()
+
+    # the duplicate is merged once
+    stage(ingestion_process_id=11, fq_names=["grace.hopper", "grace.hopper"])
+    with database_empty.Session.begin() as session:
+        assert repo.merge_staging(
+            session=session, ingestion_process_id=11
+        ) == MergeResult(inserted=1)
+        session.commit()
+
+    # restaging the same row, with a NULL email, does not rewrite it
+    stage(ingestion_process_id=12, fq_names=["grace.hopper"])
+    with database_empty.Session.begin() as session:
+        assert repo.merge_staging(
+            session=session, ingestion_process_id=12
+        ) == MergeResult(unchanged=1)
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        grace: PrincipalDbo = repo.get_by_username(
+            session=session, user_name="grace.hopper"
+        )
+        assert grace.ingestion_process_id == 11
+
+        # a deactivated principal is reactivated when it is staged again
+        grace.active = False
+        session.commit()
+
+    stage(ingestion_process_id=13, fq_names=["grace.hopper"])
+    with database_empty.Session.begin() as session:
+        assert repo.merge_staging(
+            session=session, ingestion_process_id=13
+        ) == MergeResult(updated=1)
+        grace: PrincipalDbo = repo.get_by_username(
+            session=session, user_name="grace.hopper"
+        )
+        assert grace.active
+        assert grace.ingestion_process_id == 13
+
+
+def test_merge_principals_staging_chunked(database_empty: Database) -> None:
+    repo: PrincipalRepository = PrincipalRepository()
+    fq_names: list[str] = ["o'brien", "olga", "oscar", "otto", "owen"]
+
+    with database_empty.Session.begin() as session:
+        for fq_name in fq_names + ["olga"]:
+            session.add(
+                PrincipalStagingDbo(
+                    ingestion_process_id=21,
+                    fq_name=fq_name,
+                    first_name=fq_name,
+                    last_name="Chunk",
+                    user_name=fq_name,
+                )
+            )
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        key_ranges = repo.get_merge_key_ranges(
+            session=session,
+            source_model=PrincipalStagingDbo,
+            merge_key="fq_name",
+            ingestion_process_id=21,
+            chunk_size=2,
+        )
+    # duplicate keys are counted once, the last range is unbounded
+    assert key_ranges == [("o'brien", "oscar"), ("oscar", "owen"), ("owen", None)]
+
+    merge_result: MergeResult = MergeResult()
+    for key_range in key_ranges:
+        with database_empty.Session.begin() as session:
+            merge_result += repo.mark_changed_staging(
+                session=session, ingestion_process_id=21, key_range=key_range
+            )
+            session.commit()
+    assert merge_result == MergeResult()
+
+    # marking leaves the main table as it is, the changes are published by the final merge
+    with database_empty.Session.begin() as session:
+        assert (
+            session.query(PrincipalDbo)
+            .filter(PrincipalDbo.ingestion_process_id == 21)
+            .count()
+            == 0
+        )
+        merge_result += repo.merge_staging(
+            session=session, ingestion_process_id=21, changed_only=True
+        )
+        session.commit()
+    assert merge_result == MergeResult(inserted=5)
+
+    with database_empty.Session.begin() as session:
+        assert sorted(
+            p.fq_name
+            for p in session.query(PrincipalDbo).filter(
+                PrincipalDbo.ingestion_process_id == 21
+            )
+        ) == sorted(fq_names)
+
+
+def test_merge_principals_staging_changed_only(database_empty: Database) -> None:
+    repo: PrincipalRepository = PrincipalRepository()
+
+    # the run after test_merge_principals_staging_chunked, where only olga changed
+    with database_empty.Session.begin() as session:
+        for fq_name in ["o'brien", "olga", "oscar", "otto", "owen"]:
+            session.add(
+                PrincipalStagingDbo(
+                    ingestion_process_id=22,
+                    fq_name=fq_name,
+                    first_name=fq_name,
+                    last_name="Changed" if fq_name == "olga" else "Chunk",
+                    user_name=fq_name,
+                )
+            )
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        assert repo.mark_changed_staging(
+            session=session, ingestion_process_id=22
+        ) == MergeResult(unchanged=4)
+        session.commit()
+
+    with database_empty.Session.begin() as session:
+        assert repo.merge_staging(
+            session=session, ingestion_process_id=22, changed_only=True
+        ) == MergeResult(updated=1)
+        assert sorted(
+            p.fq_name
+            for p in session.query(PrincipalDbo).filter(
+                PrincipalDbo.ingestion_process_id == 22
+            )
+        ) == ["olga"]
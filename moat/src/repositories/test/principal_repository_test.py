@@ -8,24 +8,33 @@ from models import (
 from ..src.principal_repository import PrincipalRepository
 
 
-def test_truncate_staging(database: Database) -> None:
+def test_delete_staging(database: Database) -> None:
     repo: PrincipalRepository = PrincipalRepository()
 
     with database.Session.begin() as session:
-        session.add(PrincipalStagingDbo())
-        session.add(PrincipalAttributeStagingDbo())
+        for ingestion_process_id in [1, 2]:
+            session.add(PrincipalStagingDbo(ingestion_process_id=ingestion_process_id))
+            session.add(
+                PrincipalAttributeStagingDbo(ingestion_process_id=ingestion_process_id)
+            )
         session.commit()
 
     with database.Session.begin() as session:
-        assert session.query(PrincipalStagingDbo).count() == 1
-        assert session.query(PrincipalAttributeStagingDbo).count() == 1
+        assert session.query(PrincipalStagingDbo).count() == 2
+        assert session.query(PrincipalAttributeStagingDbo).count() == 2
 
-        repo.truncate_staging_tables(session=session)
+        repo.delete_staging_tables(session=session, ingestion_process_id=1)
         session.commit()
 
+    # the other process's rows are left in place
     with database.Session.begin() as session:
-        assert session.query(PrincipalStagingDbo).count() == 0
-        assert session.query(PrincipalAttributeStagingDbo).count() == 0
+        assert [
+            p.ingestion_process_id for p in session.query(PrincipalStagingDbo).all()
+        ] == [2]
+        assert [
+            a.ingestion_process_id
+            for a in session.query(PrincipalAttributeStagingDbo).all()
+        ] == [2]
 
 
 def test_get_all(database: Database) -> None:
@@ -56,3 +65,45 @@ def test_get_by_username(database: Database) -> None:
         assert principal.user_name == "alice"
         assert principal.first_name == "Alice"
         assert principal.last_name == "Cooper"
+
+
+def test_stream_all_with_attributes(database: Database) -> None:
+    with database.Session.begin() as session:
+        count, principals = PrincipalRepository.get_all(session=session)
+        attribute_count: int = sum(len(p.attributes) or 1 for p in principals)
+
+        rows: list = list(
+            PrincipalRepository.stream_all_with_attributes(session=session, page_size=2)
+        )
+
+    # one row per attribute, or a single row for principals without attributes
+    assert len(rows) == attribute_count
+    assert len({row.principal_id for row in rows}) == count
+    principal_ids: list[int] = [row.principal_id for row in rows]
+    assert principal_ids == sorted(principal_ids)
+
+
+def test_stream_all_with_attributes_skips_inactive(database: Database) -> None:
+    def set_active(active: bool) -> None:
+        with database.Session.begin() as session:
+            session.query(PrincipalDbo).filter(
+                PrincipalDbo.user_name == "alice"
+            ).update({"active": active})
+            session.commit()
+
+    set_active(False)
+    try:
+        with database.Session.begin() as session:
+            alice: PrincipalDbo = PrincipalRepository.get_by_username(
+                session=session, user_name="alice"
+            )
+            principal_ids: set[int] = {
+                row.principal_id
+                for row in PrincipalRepository.stream_all_with_attributes(
+                    session=session, page_size=2
+                )
+            }
+            assert alice.principal_id not in principal_ids
+            assert len(principal_ids) == 4
+    finally:
+        set_active(True)
@@ -1,5 +1,15 @@
 from textwrap import dedent
 
+from database import Database
+from models import (
+    PrincipalAttributeStagingDbo,
+    PrincipalStagingDbo,
+    ResourceAttributeStagingDbo,
+    ResourceStagingDbo,
+)
+from sqlalchemy import Column, MetaData, Table, create_engine, text
+from sqlalchemy.orm import Session
+
 from ..src.repository_base import RepositoryBase
 
 
@@ -17,13 +27,13 @@ def test_get_merge_statement():
             """
     merge into principals as tgt
     using (
-        select * from principals_staging
+        select distinct on (source_uid) * from principals_staging where ingestion_process_id = 1234 order by source_uid, id desc
     ) src
     on src.source_uid = tgt.source_uid
-    when matched 
-        and src.first_name <> tgt.first_name or src.last_name <> tgt.last_name or src.user_name <> tgt.user_name or src.email <> tgt.email
+    when matched
+        and (src.first_name is distinct from tgt.first_name or src.last_name is distinct from tgt.last_name or src.user_name is distinct from tgt.user_name or src.email is distinct from tgt.email or tgt.active is not true)
     then
-        update set first_name = src.first_name, last_name = src.last_name, user_name = src.user_name, email = src.email, ingestion_process_id = 1234
+        update set first_name = src.first_name, last_name = src.last_name, user_name = src.user_name, email = src.email, ingestion_process_id = 1234, active = true
     when not matched then
         insert (source_uid, first_name, last_name, user_name, email, ingestion_process_id)
         values (src.source_uid, src.first_name, src.last_name, src.user_name, src.email, 1234)
@@ -45,12 +55,14 @@ def test_get_merge_deactivate_statement():
             """
             update principals tgt
             set ingestion_process_id = 1, active = false
-            from (
-                select source_uid, id from principals
-                except
-                select source_uid, id from principals_staging
-            ) src
-            where tgt.source_uid = src.source_uid and tgt.id = src.id
+            where tgt.active
+            and tgt.source_uid is not null
+            and tgt.id is not null
+            and not exists (
+                select 1 from principals_staging src
+                where src.ingestion_process_id = 1
+                and src.source_uid = tgt.source_uid and src.id = tgt.id
+            )
         """
         )
         == RepositoryBase._get_merge_deactivate_statement(
@@ -60,3 +72,92 @@ def test_get_merge_deactivate_statement():
             ingestion_process_id=1,
         )
     )
+
+
+def test_get_merge_deactivate_statement_with_fq_name_prefixes():
+    assert (
+        dedent(
+            """
+            update principals tgt
+            set ingestion_process_id = 1, active = false
+            where tgt.active
+            and tgt.fq_name is not null
+            and (tgt.fq_name like 'datalake.hr.%' or tgt.fq_name like 'datalake.o''\\_brien.%')
+            and not exists (
+                select 1 from principals_staging src
+                where src.ingestion_process_id = 1
+                and src.fq_name = tgt.fq_name
+            )
+        """
+        )
+        == RepositoryBase._get_merge_deactivate_statement(
+            source_model=PrincipalStagingDboMock,
+            target_model=PrincipalDboMock,
+            merge_keys=["fq_name"],
+            ingestion_process_id=1,
+            fq_name_prefixes=["datalake.hr.", "datalake.o'_brien."],
+        )
+    )
+
+
+def test_staging_tables_are_unlogged(database_empty: Database):
+    staging_models: list = [
+        PrincipalStagingDbo,
+        PrincipalAttributeStagingDbo,
+        ResourceStagingDbo,
+        ResourceAttributeStagingDbo,
+    ]
+    with database_empty.Session.begin() as session:
+        for model in staging_models:
+            relpersistence: str = session.execute(
+                text("select relpersistence from pg_class where relname = :name"),
+                {"name": model.__tablename__},
+            ).scalar_one()
+            assert relpersistence == "u"
+
+
+def test_bulk_insert(database_empty: Database):
+    rows: list[tuple] = [
+        (f"datalake.hr.table_{i}", "trino", "table") for i in range(2500)
+    ]
+
+    with database_empty.Session.begin() as session:
+        row_count: int = RepositoryBase.bulk_insert(
+            session=session,
+            model=ResourceStagingDbo,
+            columns=["fq_name", "platform", "object_type"],
+            rows=(row for row in rows),
+        )
+        assert row_count == 2500
+
+    with database_empty.Session.begin() as session:
+        staged: list[ResourceStagingDbo] = (
+            session.query(ResourceStagingDbo).order_by(ResourceStagingDbo.id).all()
+        )
+        assert [(s.fq_name, s.platform, s.object_type) for s in staged] == rows
+        session.query(ResourceStagingDbo).delete()
+
+
+def test_bulk_insert_without_copy():
+    # drivers other than psycopg fall back to executemany batches
+    engine = create_engine("sqlite:///:memory:")
+    # the staging tables are UNLOGGED, which is postgres only, so sqlite gets a plain copy
+    Table(
+        ResourceStagingDbo.__tablename__,
+        MetaData(),
+        *[
+            Column(c.name, c.type, primary_key=c.primary_key)
+            for c in ResourceStagingDbo.__table__.columns
+        ],
+    ).create(engine)
+
+    with Session(engine) as session:
+        row_count: int = RepositoryBase.bulk_insert(
+            session=session,
+            model=ResourceStagingDbo,
+            columns=["fq_name", "platform", "object_type"],
+            rows=((f"datalake.hr.table_{i}", "trino", "table") for i in range(25)),
+            batch_size=10,
+        )
+        assert row_count == 25
+        assert session.query(ResourceStagingDbo).count() == 25
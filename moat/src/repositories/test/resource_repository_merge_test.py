@@ -1,6 +1,7 @@
 from database import Database
 from models import ResourceDbo, ResourceStagingDbo
 
+from ..src.repository_base import MergeResult
 from ..src.resource_repository import ResourceRepository
 
 
@@ -11,11 +12,13 @@ def test_merge_resources_staging(database_empty: Database) -> None:
     with database_empty.Session.begin() as session:
         # populate staging table
         rs1: ResourceStagingDbo = ResourceStagingDbo()
+        rs1.ingestion_process_id = 1
         rs1.fq_name = "resource1"
         rs1.platform = "trino"
         session.add(rs1)
 
         rs2: ResourceStagingDbo = ResourceStagingDbo()
+        rs2.ingestion_process_id = 1
         rs2.fq_name = "resource2"
         rs2.platform = "trino"
         session.add(rs2)
@@ -23,8 +26,10 @@ def test_merge_resources_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=1)
-        assert row_count == 2
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=1
+        )
+        assert merge_result == MergeResult(inserted=2, updated=0, unchanged=0)
         session.commit()
 
     # test it
@@ -47,6 +52,7 @@ def test_merge_resources_staging(database_empty: Database) -> None:
     with database_empty.Session.begin() as session:
         # populate staging table
         rs3: ResourceStagingDbo = ResourceStagingDbo()
+        rs3.ingestion_process_id = 2
         rs3.fq_name = "resource3"
         rs3.fq_name = "redshift"
         session.add(rs3)
@@ -54,8 +60,10 @@ def test_merge_resources_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=2)
-        assert row_count == 1
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=2
+        )
+        assert merge_result == MergeResult(inserted=1, updated=0, unchanged=0)
         session.commit()
 
     # test it
@@ -71,11 +79,13 @@ def test_merge_resources_staging(database_empty: Database) -> None:
         resource: ResourceDbo = repo.get_by_id(session=session, resource_id=1)
         assert resource.fq_name == "resource1"
 
-        # truncate staging table
-        repo.truncate_staging_tables(session=session)
+        # clear earlier processes from the staging table
+        repo.delete_staging_tables(session=session, ingestion_process_id=1)
+        repo.delete_staging_tables(session=session, ingestion_process_id=2)
 
         # populate staging table
         rs: ResourceStagingDbo = ResourceStagingDbo()
+        rs.ingestion_process_id = 3
         rs.fq_name = "resource1"
         rs.platform = "postgres"
         session.add(rs)
@@ -83,8 +93,10 @@ def test_merge_resources_staging(database_empty: Database) -> None:
 
     # merge it
     with database_empty.Session.begin() as session:
-        row_count: int = repo.merge_staging(session=session, ingestion_process_id=3)
-        assert row_count == 1
+        merge_result: MergeResult = repo.merge_staging(
+            session=session, ingestion_process_id=3
+        )
+        assert merge_result == MergeResult(inserted=0, updated=1, unchanged=0)
         session.commit()
 
     # test it
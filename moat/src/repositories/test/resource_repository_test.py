@@ -45,3 +45,63 @@ def test_get_all_by_platform(database: Database) -> None:
         assert isinstance(type_name_resource.attributes[0], ResourceAttributeDbo)
         assert type_name_resource.attributes[0].attribute_key == "IT"
         assert type_name_resource.attributes[0].attribute_value == "Restricted"
+
+
+def test_stream_all_by_platform_with_attributes(database: Database):
+    with database.Session.begin() as session:
+        count, resources = ResourceRepository.get_all_by_platform(
+            session=session, platform="trino"
+        )
+        attribute_count: int = sum(len(r.attributes) or 1 for r in resources)
+        fq_names: list[str] = [r.fq_name for r in resources]
+
+        rows: list = list(
+            ResourceRepository.stream_all_by_platform_with_attributes(
+                session=session, platform="trino", page_size=3
+            )
+        )
+
+    # one row per attribute, or a single row for resources without attributes
+    assert len(rows) == attribute_count
+    assert list(dict.fromkeys(row.fq_name for row in rows)) == fq_names
+
+
+def test_inactive_resources_are_not_read(database: Database):
+    def set_active(active: bool) -> None:
+        with database.Session.begin() as session:
+            session.query(ResourceDbo).filter(
+                ResourceDbo.fq_name == "datalake.logistics.shippers"
+            ).update({"active": active})
+            session.query(ResourceAttributeDbo).filter(
+                ResourceAttributeDbo.fq_name
+                == "datalake.sales.customer_markets.type_name"
+            ).update({"active": active})
+            session.commit()
+
+    set_active(False)
+    try:
+        with database.Session.begin() as session:
+            resource_count, resources = ResourceRepository.get_all_by_platform(
+                session=session, platform="trino"
+            )
+            fq_names: list[str] = [r.fq_name for r in resources]
+            rows: list = list(
+                ResourceRepository.stream_all_by_platform_with_attributes(
+                    session=session, platform="trino", page_size=3
+                )
+            )
+
+        assert resource_count == 13
+        assert "datalake.logistics.shippers" not in fq_names
+        assert "datalake.logistics.shippers" not in [row.fq_name for row in rows]
+
+        # the resource is still read, without its inactive attribute
+        type_name_rows: list = [
+            row
+            for row in rows
+            if row.fq_name == "datalake.sales.customer_markets.type_name"
+        ]
+        assert len(type_name_rows) == 1
+        assert type_name_rows[0].attribute_key is None
+    finally:
+        set_active(True)